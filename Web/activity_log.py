@@ -0,0 +1,325 @@
+import os
+import mmap
+from json import dumps as json_dumps, loads as json_loads, load as json_load, dump as json_dump
+from threading import Lock, Condition, Thread
+from typing import Final, Optional, List, Dict, Tuple, TypedDict, Iterator, Any
+
+
+# ========== Constants =========
+SEGMENT_SUFFIX: Final[str] = ".log"
+INDEX_SUFFIX: Final[str] = ".idx"
+SNAPSHOT_NAME: Final[str] = "snapshot.json"
+# Bytes of records per index entry
+INDEX_BLOCK_BYTES: Final[int] = 64 * 1024
+
+# (start offset, end offset, earliest time, latest time) of a run of records
+IndexBlock = Tuple[int, int, float, float]
+
+
+# ========== TypedDicts =========
+class LogRecord(TypedDict):
+    time: float
+    user_id: str
+    active_window: str
+
+
+class Snapshot(TypedDict):
+    segment: int
+    offset: int
+    state: Dict[str, Any]
+
+
+# ========== Classes =========
+class ActivityLog:
+    """
+    Append-only, segmented log of upload events.
+
+    Records are JSON lines. `append` only queues the encoded line; a background
+    thread writes everything queued since its last pass and fsyncs once per
+    group, so the request path never waits on the disk. Segment rotation is
+    decided at append time, which gives every record an exact (segment, offset)
+    position even before it is written. A snapshot stores the caller's state
+    together with that position, and recovery replays only what comes after it.
+    """
+    def __init__(self, directory: str, segment_bytes: int, flush_interval: float, retention: int) -> None:
+        self.directory: str = directory
+        self.segment_bytes: int = segment_bytes
+        self.flush_interval: float = flush_interval
+        self.retention: int = retention
+
+        self._segment: int = 0
+        self._offset: int = 0
+        self._pending: List[Tuple[int, bytes, float]] = []
+        self._file: Optional[Any] = None
+        self._index_file: Optional[Any] = None
+        self._file_segment: int = -1
+        self._closed: bool = True
+        self._lock: Final[Lock] = Lock()
+        self._wakeup: Final[Condition] = Condition(self._lock)
+        self._write_lock: Final[Lock] = Lock()
+        self._thread: Optional[Thread] = None
+
+    # ---------- Paths ----------
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:08d}{SEGMENT_SUFFIX}")
+
+    def _index_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:08d}{INDEX_SUFFIX}")
+
+    def segments(self) -> List[int]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit()
+        )
+
+    # ---------- Reading ----------
+    @staticmethod
+    def _lines(view: Any, start: int, end: int) -> Iterator[LogRecord]:
+        position: int = start
+        while position < end:
+            line_end: int = view.find(b"\n", position, end)
+            if line_end < 0:
+                # Torn write at the tail of a crashed segment
+                break
+            try:
+                yield json_loads(view[position:line_end])
+            except ValueError:
+                pass
+            position = line_end + 1
+
+    @staticmethod
+    def _matching_lines(view: Any, start: int, end: int, needle: bytes) -> Iterator[LogRecord]:
+        # Only lines containing `needle` are parsed; the caller checks the field itself
+        found: int = view.find(needle, start, end)
+        while found >= 0:
+            line_start: int = max(view.rfind(b"\n", start, found) + 1, start)
+            line_end: int = view.find(b"\n", found, end)
+            if line_end < 0:
+                break
+            try:
+                yield json_loads(view[line_start:line_end])
+            except ValueError:
+                pass
+            found = view.find(needle, line_end + 1, end)
+
+    @staticmethod
+    def _scan(path: str, offset: int = 0) -> Iterator[LogRecord]:
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            return
+        with file:
+            size: Final[int] = os.fstat(file.fileno()).st_size
+            if size <= offset:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                yield from ActivityLog._lines(view, offset, size)
+
+    def _blocks(self, segment: int) -> List[IndexBlock]:
+        """Indexed runs of `segment`, contiguous from offset 0."""
+        blocks: Final[List[IndexBlock]] = []
+        try:
+            with open(self._index_path(segment), 'rb') as file:
+                for line in file:
+                    try:
+                        start, end, earliest, latest = json_loads(line)
+                    except ValueError:
+                        break
+                    if start != (blocks[-1][1] if blocks else 0):
+                        break
+                    blocks.append((start, end, earliest, latest))
+        except FileNotFoundError:
+            pass
+        return blocks
+
+    def read(self, since: float, until: float, user_id: Optional[str] = None) -> Iterator[LogRecord]:
+        """Records timed within [since, until], of `user_id` only if given, in log order."""
+        needle: Final[Optional[bytes]] = (
+            b'"user_id": ' + json_dumps(user_id, ensure_ascii=False).encode('utf-8') if user_id is not None else None
+        )
+        for segment in self.segments():
+            try:
+                file = open(self._segment_path(segment), 'rb')
+            except FileNotFoundError:
+                continue
+            with file:
+                size: int = os.fstat(file.fileno()).st_size
+                if size == 0:
+                    continue
+                blocks: List[IndexBlock] = [block for block in self._blocks(segment) if block[1] <= size]
+                covered: int = blocks[-1][1] if blocks else 0
+                if covered < size:
+                    # Not indexed (yet): no time bounds known
+                    blocks.append((covered, size, float("-inf"), float("inf")))
+
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                    for start, end, earliest, latest in blocks:
+                        if latest < since or earliest > until:
+                            continue
+                        records: Iterator[LogRecord] = (
+                            ActivityLog._lines(view, start, end) if needle is None
+                            else ActivityLog._matching_lines(view, start, end, needle)
+                        )
+                        for record in records:
+                            if since <= record["time"] <= until and (user_id is None or record["user_id"] == user_id):
+                                yield record
+
+    def _load_snapshot(self) -> Optional[Snapshot]:
+        try:
+            with open(os.path.join(self.directory, SNAPSHOT_NAME), 'r', encoding='utf-8') as file:
+                return json_load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def recover(self) -> Tuple[Optional[Dict[str, Any]], Iterator[LogRecord]]:
+        """Latest snapshot state (if any) and the records logged after it."""
+        snapshot: Final[Optional[Snapshot]] = self._load_snapshot()
+
+        def tail() -> Iterator[LogRecord]:
+            for segment in self.segments():
+                if snapshot is not None and segment < snapshot["segment"]:
+                    continue
+                offset: int = snapshot["offset"] if snapshot is not None and segment == snapshot["segment"] else 0
+                yield from ActivityLog._scan(self._segment_path(segment), offset)
+
+        return (snapshot["state"] if snapshot is not None else None), tail()
+
+    # ---------- Writing ----------
+    def open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        existing: Final[List[int]] = self.segments()
+        snapshot: Final[Optional[Snapshot]] = self._load_snapshot()
+        # Never append behind a possibly torn tail: always start a fresh segment,
+        # also past one the snapshot names but that never reached the disk
+        self._segment = max(existing[-1] if existing else 0, snapshot["segment"] if snapshot is not None else 0) + 1
+        self._offset = 0
+        self._closed = False
+        self._thread = Thread(target=self._run, name="activity-log", daemon=True)
+        self._thread.start()
+
+    def append(self, record: LogRecord) -> None:
+        line: Final[bytes] = json_dumps(record, ensure_ascii=False).encode('utf-8') + b"\n"
+        with self._lock:
+            if self._closed:
+                return
+            if self._offset and self._offset + len(line) > self.segment_bytes:
+                self._segment += 1
+                self._offset = 0
+            self._pending.append((self._segment, line, record["time"]))
+            self._offset += len(line)
+
+    def position(self) -> Tuple[int, int]:
+        with self._lock:
+            return (self._segment, self._offset)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                self._wakeup.wait(self.flush_interval)
+                closed: bool = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                pending: Final[List[Tuple[int, bytes, float]]] = self._pending
+                self._pending = []
+            if not pending:
+                return
+
+            rotated: bool = False
+            start: int = 0
+            while start < len(pending):
+                segment: int = pending[start][0]
+                end: int = start
+                while end < len(pending) and pending[end][0] == segment:
+                    end += 1
+
+                if segment != self._file_segment:
+                    self._close_file()
+                    self._file = open(self._segment_path(segment), 'ab')
+                    self._index_file = open(self._index_path(segment), 'ab')
+                    self._file_segment = segment
+                    rotated = True
+
+                offset: int = self._file.tell()
+                self._file.write(b"".join(line for _, line, _ in pending[start:end]))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                # Indexed only once the records are durable; a lost index line just means a full search
+                self._index_file.write(ActivityLog._index_lines(offset, pending[start:end]))
+                self._index_file.flush()
+                start = end
+
+            if rotated:
+                self._prune()
+
+    @staticmethod
+    def _index_lines(offset: int, records: List[Tuple[int, bytes, float]]) -> bytes:
+        lines: Final[List[bytes]] = []
+        block_start: int = offset
+        earliest: float = float("inf")
+        latest: float = float("-inf")
+        for _, line, record_time in records:
+            earliest = min(earliest, record_time)
+            latest = max(latest, record_time)
+            offset += len(line)
+            if offset - block_start >= INDEX_BLOCK_BYTES:
+                lines.append(json_dumps([block_start, offset, earliest, latest]).encode('utf-8') + b"\n")
+                block_start, earliest, latest = offset, float("inf"), float("-inf")
+        if offset > block_start:
+            lines.append(json_dumps([block_start, offset, earliest, latest]).encode('utf-8') + b"\n")
+        return b"".join(lines)
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._file_segment = -1
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
+
+    def _prune(self) -> None:
+        # Keep segments still needed by the latest snapshot plus `retention` more
+        try:
+            with open(os.path.join(self.directory, SNAPSHOT_NAME), 'r', encoding='utf-8') as file:
+                needed: int = json_load(file)["segment"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return
+        segments: Final[List[int]] = self.segments()
+        for segment in segments[:max(len(segments) - self.retention, 0)]:
+            if segment >= needed:
+                break
+            for path in (self._segment_path(segment), self._index_path(segment)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def snapshot(self, state: Dict[str, Any], position: Tuple[int, int]) -> None:
+        """Persist `state`, which must reflect every record before `position`."""
+        # The records before `position` reach the disk before anything points past them
+        self.flush()
+        snapshot: Final[Snapshot] = {"segment": position[0], "offset": position[1], "state": state}
+        path: Final[str] = os.path.join(self.directory, SNAPSHOT_NAME)
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as file:
+            json_dump(snapshot, file, ensure_ascii=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(f"{path}.tmp", path)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join()
+        with self._write_lock:
+            self._close_file()
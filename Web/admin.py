@@ -1,12 +1,14 @@
 import sys
-from typing import Final, List, Union
+from time import monotonic
+from typing import Final, List, Optional, Union, Any
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLabel, QLineEdit, QPushButton, 
-                             QMessageBox, QStackedWidget, QListWidget,
-                             QListWidgetItem)
-from PyQt5.QtCore import Qt
+                             QMessageBox, QStackedWidget, QListView,
+                             QFileDialog, QProgressBar)
+from PyQt5.QtCore import Qt, QThread, QAbstractListModel, QModelIndex, pyqtSignal
 from PyQt5.QtGui import QFont
 import api
+from directory import UserIndex
 
 
 class AddUserWidget(QWidget):
@@ -155,6 +157,131 @@ class ChangeUserInfoWidget(QWidget):
             QMessageBox.critical(self, "Error", f"Failed to change user info: {str(e)}")
 
 
+class UsersModel(QAbstractListModel):
+    """
+    Lazily populated list of users.
+
+    Rows are handed to the view `BATCH` at a time through canFetchMore/fetchMore.
+    After the first load the model never rebuilds itself: DataManager change
+    notifications are applied row by row. They may come from any thread, so
+    they are forwarded through a queued signal and applied on the GUI thread.
+    """
+    BATCH: Final[int] = 200
+    changes_arrived = pyqtSignal(object)
+
+    def __init__(self, parent: Union[QWidget, None] = None) -> None:
+        super().__init__(parent)
+        self.users_index: UserIndex = UserIndex()
+        self.order: List[str] = []
+        self.query: str = ""
+        self.rows: List[str] = []
+        self.loaded: int = 0
+        self.listening: bool = False
+        self.changes_arrived.connect(self.apply_change, Qt.QueuedConnection)
+
+    def load(self) -> None:
+        self.beginResetModel()
+        users: Final[List[api.User]] = api.DataManager.get_data().get("users", [])
+        self.users_index = UserIndex()
+        self.users_index.load((user["id"], user["name"]) for user in users)
+        self.order = [user["id"] for user in users]
+        self._select()
+        self.endResetModel()
+        if not self.listening:
+            api.DataManager.add_listener(self.changes_arrived.emit)
+            self.listening = True
+
+    def _select(self) -> None:
+        self.rows = self.users_index.search(self.query) if self.query else list(self.order)
+        self.loaded = min(UsersModel.BATCH, len(self.rows))
+
+    def set_query(self, query: str) -> None:
+        self.beginResetModel()
+        self.query = query.strip()
+        self._select()
+        self.endResetModel()
+
+    # ---------- Qt model interface ----------
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self.loaded
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        return not parent.isValid() and self.loaded < len(self.rows)
+
+    def fetchMore(self, parent: QModelIndex) -> None:
+        if parent.isValid():
+            return
+        count: Final[int] = min(UsersModel.BATCH, len(self.rows) - self.loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid() or index.row() >= self.loaded:
+            return None
+        user_id: Final[str] = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            return f"User name: {self.users_index.names.get(user_id, '')}\nUser ID: {user_id}"
+        if role == Qt.UserRole:
+            return user_id
+        return None
+
+    # ---------- Incremental updates ----------
+    def _remove_row(self, user_id: str) -> None:
+        try:
+            row: Final[int] = self.rows.index(user_id)
+        except ValueError:
+            return
+        if row < self.loaded:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.rows[row]
+            self.loaded -= 1
+            self.endRemoveRows()
+        else:
+            del self.rows[row]
+
+    def _append_row(self, user_id: str) -> None:
+        if self.query and not self.users_index.matches(user_id, self.query):
+            return
+        if self.loaded == len(self.rows):
+            self.beginInsertRows(QModelIndex(), self.loaded, self.loaded)
+            self.rows.append(user_id)
+            self.loaded += 1
+            self.endInsertRows()
+        else:
+            self.rows.append(user_id)
+
+    def apply_change(self, change: api.UsersChange) -> None:
+        for user_id in change["removed"]:
+            self.users_index.remove(user_id)
+            if user_id in self.order:
+                self.order.remove(user_id)
+            self._remove_row(user_id)
+
+        for user in change["added"]:
+            if user["id"] in self.users_index.names:
+                continue
+            self.users_index.put(user["id"], user["name"])
+            self.order.append(user["id"])
+            self._append_row(user["id"])
+
+        for user_id in change["changed"]:
+            user: Optional[api.User] = api.DataManager.storage().get(user_id)
+            if user is None:
+                continue
+            self.users_index.put(user_id, user["name"])
+            if self.query and not self.users_index.matches(user_id, self.query):
+                self._remove_row(user_id)
+            elif user_id in self.rows:
+                row: int = self.rows.index(user_id)
+                if row < self.loaded:
+                    self.dataChanged.emit(self.index(row), self.index(row))
+            else:
+                self._append_row(user_id)
+
+
 class AllUsersWidget(QWidget):
     def __init__(self, parent: Union[QWidget, None] = None) -> None:
         super().__init__(parent)
@@ -168,58 +295,169 @@ class AllUsersWidget(QWidget):
         title.setAlignment(Qt.AlignCenter)
         title.setStyleSheet("font-size: 16px; font-weight: bold; margin: 10px;")
         
-        buttons_layout: Final[QHBoxLayout] = QHBoxLayout(self)
+        buttons_layout: Final[QHBoxLayout] = QHBoxLayout()
 
         refresh_button: Final[QPushButton] = QPushButton("Refresh")
-        refresh_button.clicked.connect(self.load_users)
+        refresh_button.clicked.connect(self.refresh_users)
 
         copy_id_button: Final[QPushButton] = QPushButton("Copy ID")
-        copy_id_button.clicked.connect(self.copy_id);
-        
-        self.users_list: QListWidget = QListWidget()
+        copy_id_button.clicked.connect(self.copy_id)
+
+        self.search_input: QLineEdit = QLineEdit()
+        self.search_input.setPlaceholderText("Search user name")
+        self.search_input.textChanged.connect(self.search)
+
+        self.count_label: QLabel = QLabel("")
+
+        self.users_model: UsersModel = UsersModel(self)
+        self.users_model.modelReset.connect(self.update_count)
+        self.users_model.rowsInserted.connect(self.update_count)
+        self.users_model.rowsRemoved.connect(self.update_count)
+
+        self.users_list: QListView = QListView()
+        self.users_list.setUniformItemSizes(True)
+        self.users_list.setModel(self.users_model)
         
         layout.addWidget(title)
         buttons_layout.addWidget(refresh_button)
         buttons_layout.addWidget(copy_id_button)
         layout.addLayout(buttons_layout)
+        layout.addWidget(self.search_input)
+        layout.addWidget(self.count_label)
         layout.addWidget(self.users_list)
     
     def copy_id(self) -> None:
-        selections: List[QListWidgetItem] = self.users_list.selectedItems()
+        selections: List[QModelIndex] = self.users_list.selectionModel().selectedIndexes()
 
         if len(selections) <= 0:
             QMessageBox().critical(self, "Error", "No selections found.")
             return
 
-        select_id: Final[str] = selections[0].text().split("\n")[1].split(":")[1].strip()
+        select_id: Final[str] = selections[0].data(Qt.UserRole)
         
         clipboard = QApplication.clipboard()
         clipboard.setText(select_id)
 
         QMessageBox().information(self, "Sucess", "Copy sucess.")
 
+    def search(self, text: str) -> None:
+        self.users_model.set_query(text)
+
+    def update_count(self) -> None:
+        total: Final[int] = len(self.users_model.rows)
+        self.count_label.setText(f"{total} users" if total else "No users found")
 
     def load_users(self) -> None:
-        self.users_list.clear()
         try:
-            users_data: api.Data = api.DataManager.get_data()
-            users: List[api.User] = users_data.get("users", [])
-            
-            if not users:
-                item: QListWidgetItem = QListWidgetItem("No users found")
-                item.setTextAlignment(Qt.AlignCenter)
-                self.users_list.addItem(item)
-                return
-                
-            for user in users:
-                item_text: str = f"User name: {user['name']}\nUser ID: {user['id']}"
-                item: QListWidgetItem = QListWidgetItem(item_text)
-                self.users_list.addItem(item)
-                
+            self.users_model.load()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to load users: {str(e)}")
+
+    def refresh_users(self) -> None:
+        # Picks up changes made by other processes; the model applies them as a diff
+        try:
+            api.DataManager.refresh()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load users: {str(e)}")
 
 
+class BulkImportWorker(QThread):
+    """Runs a bulk import off the GUI thread; hashing itself runs on a process pool."""
+    progress = pyqtSignal(int, int)
+    succeeded = pyqtSignal(str, int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, path: str, parent: Union[QWidget, None] = None) -> None:
+        super().__init__(parent)
+        self.path: str = path
+
+    def run(self) -> None:
+        try:
+            credentials: Final[List[tuple]] = api.read_import_file(self.path)
+            results: Final[List[api.ImportResult]] = api.DataManager.new_users(credentials, progress=self.progress.emit)
+            results_path: Final[str] = api.import_results_path(self.path)
+            api.write_import_results(results_path, results)
+            self.succeeded.emit(results_path, len(results))
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class BulkImportWidget(QWidget):
+    def __init__(self, parent: Union[QWidget, None] = None) -> None:
+        super().__init__(parent)
+        self.worker: Union[BulkImportWorker, None] = None
+        self.started: float = 0.0
+        self.setup_ui()
+
+    def setup_ui(self) -> None:
+        layout: Final[QVBoxLayout] = QVBoxLayout(self)
+
+        title: Final[QLabel] = QLabel("BULK IMPORT")
+        title.setAlignment(Qt.AlignCenter)
+        title.setStyleSheet("font-size: 16px; font-weight: bold; margin: 10px;")
+
+        file_layout: Final[QHBoxLayout] = QHBoxLayout()
+        self.file_input: QLineEdit = QLineEdit()
+        self.file_input.setPlaceholderText("CSV (name,password) or JSONL file")
+        browse_button: Final[QPushButton] = QPushButton("Browse")
+        browse_button.clicked.connect(self.browse)
+        file_layout.addWidget(self.file_input)
+        file_layout.addWidget(browse_button)
+
+        self.import_button: QPushButton = QPushButton("Import Users")
+        self.import_button.clicked.connect(self.import_users)
+
+        self.progress_bar: QProgressBar = QProgressBar()
+        self.progress_bar.setValue(0)
+        self.status_label: QLabel = QLabel("")
+
+        layout.addWidget(title)
+        layout.addWidget(QLabel("File:"))
+        layout.addLayout(file_layout)
+        layout.addWidget(self.import_button)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.status_label)
+        layout.addStretch()
+
+    def browse(self) -> None:
+        path, _ = QFileDialog.getOpenFileName(self, "Select users file", "", "Users (*.csv *.jsonl);;All files (*)")
+        if path:
+            self.file_input.setText(path)
+
+    def import_users(self) -> None:
+        path: Final[str] = self.file_input.text().strip()
+
+        if not path:
+            QMessageBox.warning(self, "Error", "Please choose a file to import.")
+            return
+
+        self.import_button.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.status_label.setText("Reading file...")
+        self.started = monotonic()
+
+        self.worker = BulkImportWorker(path, self)
+        self.worker.progress.connect(self.on_progress)
+        self.worker.succeeded.connect(self.on_succeeded)
+        self.worker.failed.connect(self.on_failed)
+        self.worker.finished.connect(lambda: self.import_button.setEnabled(True))
+        self.worker.start()
+
+    def on_progress(self, done: int, total: int) -> None:
+        elapsed: Final[float] = max(monotonic() - self.started, 1e-9)
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(done)
+        self.status_label.setText(f"Hashed {done}/{total} ({done / elapsed:.1f} users/s)")
+
+    def on_succeeded(self, results_path: str, count: int) -> None:
+        self.status_label.setText(f"Created {count} users in {monotonic() - self.started:.1f}s")
+        QMessageBox.information(self, "Success", f"Import success! {count} user IDs written to {results_path}")
+
+    def on_failed(self, message: str) -> None:
+        self.status_label.setText("")
+        QMessageBox.critical(self, "Error", f"Failed to import users: {message}")
+
+
 class MainWindow(QMainWindow):
     def __init__(self) -> None:
         super().__init__()
@@ -242,12 +480,14 @@ class MainWindow(QMainWindow):
         self.delete_user_btn: QPushButton = QPushButton("Delete User")
         self.change_info_btn: QPushButton = QPushButton("Change Info")
         self.all_users_btn: QPushButton = QPushButton("All Users")
+        self.bulk_import_btn: QPushButton = QPushButton("Bulk Import")
         self.exit_btn: QPushButton = QPushButton("Exit")
         
         sidebar_layout.addWidget(self.add_user_btn)
         sidebar_layout.addWidget(self.delete_user_btn)
         sidebar_layout.addWidget(self.change_info_btn)
         sidebar_layout.addWidget(self.all_users_btn)
+        sidebar_layout.addWidget(self.bulk_import_btn)
         sidebar_layout.addWidget(self.exit_btn)
         sidebar_layout.addStretch()
         
@@ -258,11 +498,13 @@ class MainWindow(QMainWindow):
         self.delete_user_widget: DeleteUserWidget = DeleteUserWidget()
         self.change_info_widget: ChangeUserInfoWidget = ChangeUserInfoWidget()
         self.all_users_widget: AllUsersWidget = AllUsersWidget()
+        self.bulk_import_widget: BulkImportWidget = BulkImportWidget()
         
         self.stacked_widget.addWidget(self.add_user_widget)
         self.stacked_widget.addWidget(self.delete_user_widget)
         self.stacked_widget.addWidget(self.change_info_widget)
         self.stacked_widget.addWidget(self.all_users_widget)
+        self.stacked_widget.addWidget(self.bulk_import_widget)
         
         main_layout.addWidget(sidebar)
         main_layout.addWidget(self.stacked_widget)
@@ -272,6 +514,7 @@ class MainWindow(QMainWindow):
         self.delete_user_btn.clicked.connect(lambda: self.stacked_widget.setCurrentIndex(1))
         self.change_info_btn.clicked.connect(lambda: self.stacked_widget.setCurrentIndex(2))
         self.all_users_btn.clicked.connect(lambda: self.stacked_widget.setCurrentIndex(3))
+        self.bulk_import_btn.clicked.connect(lambda: self.stacked_widget.setCurrentIndex(4))
         self.exit_btn.clicked.connect(self.close)
         
         # Set initial view
@@ -0,0 +1,103 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Final, Optional, Callable
+
+
+# ========== Classes =========
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        self.rate: float = rate
+        self.burst: float = burst
+        self.tokens: float = burst
+        self.updated: float = now
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take one token; returns 0, or the seconds until one is available."""
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionControl:
+    """
+    Token-bucket admission for one class of requests.
+
+    A request is admitted when both its session's bucket (if it names one) and
+    the shared global bucket have a token, so one noisy client runs out of its
+    own tokens long before it can starve everybody else. Buckets are kept in
+    last-use order and dropped once they have been idle long enough to be full
+    again, which loses nothing and keeps memory proportional to the sessions
+    active in the last `session_burst / session_rate` seconds. Buckets for
+    unknown keys are only created when the global bucket admits the request,
+    so made-up tokens cannot grow the table faster than the global rate.
+
+    A `rate` of 0 disables admission control.
+    """
+    def __init__(self, rate: float, burst: float, session_rate: float = 0, session_burst: float = 0,
+                 clock: Callable[[], float] = monotonic) -> None:
+        self.enabled: bool = rate > 0
+        self.clock: Callable[[], float] = clock
+        self.session_rate: float = session_rate
+        self.session_burst: float = max(session_burst, 1)
+        self._global: Final[TokenBucket] = TokenBucket(max(rate, 1e-9), max(burst, 1), clock())
+        self._sessions: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._idle: Final[float] = self.session_burst / session_rate if session_rate > 0 else 0
+        self._lock: Final[Lock] = Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict(self, now: float) -> None:
+        deadline: Final[float] = now - self._idle
+        while self._sessions:
+            key, bucket = next(iter(self._sessions.items()))
+            if bucket.updated > deadline:
+                break
+            del self._sessions[key]
+
+    def admit(self, key: Optional[str] = None) -> float:
+        """0 if the request may proceed, else the seconds the client should wait."""
+        if not self.enabled:
+            return 0.0
+
+        with self._lock:
+            now: Final[float] = self.clock()
+            per_session: Final[bool] = key is not None and self.session_rate > 0
+            bucket: Optional[TokenBucket] = None
+            if per_session:
+                self._evict(now)
+                bucket = self._sessions.get(key)
+                if bucket is not None:
+                    self._sessions.move_to_end(key)
+                    wait: float = bucket.take(now)
+                    if wait:
+                        return wait
+
+            wait = self._global.take(now)
+            if wait:
+                if bucket is not None:
+                    bucket.tokens += 1
+                return wait
+
+            if per_session and bucket is None:
+                bucket = TokenBucket(self.session_rate, self.session_burst, now)
+                bucket.tokens -= 1
+                self._sessions[key] = bucket
+            return 0.0
+
+    def load(self) -> float:
+        """How much of the global burst is used up: 0 (idle) to 1 (saturated)."""
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            self._global.refill(self.clock())
+            return 1 - self._global.tokens / self._global.burst
@@ -1,11 +1,35 @@
+import os
+import csv
+import atexit
+import hmac
 import bcrypt
-from typing import Final, Optional, List, TypedDict
-from json import load as json_load, dump as json_dump
+import sqlite3
+import secrets
+from argparse import ArgumentParser
+from hashlib import sha256
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+from threading import RLock, Lock, BoundedSemaphore, local
+from time import time, monotonic, perf_counter
+from typing import Final, Optional, List, Dict, Set, Tuple, Callable, TypedDict, Any, Union
+from json import load as json_load, dump as json_dump, loads as json_loads, JSONDecodeError
 from uuid import uuid4
+from metrics import registry, Histogram
 
 
 # ========== Constants ==========
 DATA_PATH: Final[str] = "data.json"
+DB_PATH: Final[str] = os.environ.get("SEEME_DB_PATH", "data.db")
+# "json", "sqlite", or empty to use SQLite only once DB_PATH exists
+STORAGE: Final[str] = os.environ.get("SEEME_STORAGE", "")
+HASH_WORKERS: Final[int] = int(os.environ.get("SEEME_HASH_WORKERS", str(os.cpu_count() or 2)))
+HASH_QUEUE_LIMIT: Final[int] = int(os.environ.get("SEEME_HASH_QUEUE_LIMIT", "64"))
+CREDENTIAL_CACHE_TTL: Final[float] = float(os.environ.get("SEEME_CREDENTIAL_CACHE_TTL", "300"))
+CREDENTIAL_CACHE_SIZE: Final[int] = int(os.environ.get("SEEME_CREDENTIAL_CACHE_SIZE", "4096"))
+# SqliteStorage: how often a poller records its cursor and prunes `changes`, and
+# how long an absent poller keeps holding back rows it has not read
+CHANGES_PRUNE_INTERVAL: Final[float] = float(os.environ.get("SEEME_CHANGES_PRUNE_INTERVAL", "60"))
+CHANGES_RETENTION: Final[float] = float(os.environ.get("SEEME_CHANGES_RETENTION", str(30 * 86400)))
 
 
 # ========== TypedDict ==========
@@ -19,84 +43,671 @@ class Data(TypedDict):
     users: List[User]
 
 
+class UsersChange(TypedDict):
+    added: List[User]
+    removed: List[str]
+    changed: List[str]
+
+
+class ImportResult(TypedDict):
+    name: str
+    id: str
+
+
+UsersListener = Callable[[UsersChange], None]
+ImportProgress = Callable[[int, int], None]
+
+
+# ========== Metrics =========
+bcrypt_seconds: Final[Histogram] = registry.histogram(
+    "seeme_bcrypt_seconds", "Time spent in bcrypt, by operation (cache hits excluded)", ("operation",)
+)
+store_load_seconds: Final[Histogram] = registry.histogram(
+    "seeme_user_store_load_seconds", "Time to read and parse data.json after it changed"
+)
+
+
+# ========== Exceptions =========
+class HashPoolBusy(Exception):
+    pass
+
+
+# ========== Helper Classes =========
+class HashPool:
+    """
+    Bounded worker pool for bcrypt work.
+
+    bcrypt releases the GIL, so threads run hashes in parallel. At most
+    `workers + queue_limit` jobs may be in flight; anything beyond that is
+    rejected right away with HashPoolBusy instead of queueing behind the burst.
+    """
+    def __init__(self, workers: int, queue_limit: int) -> None:
+        self._executor: Final[ThreadPoolExecutor] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots: Final[BoundedSemaphore] = BoundedSemaphore(workers + queue_limit)
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise HashPoolBusy("Too many password checks in flight")
+        try:
+            future: Final[Future] = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return self.submit(fn, *args).result()
+
+
+class CredentialCache:
+    """
+    Short-lived cache of credentials that already passed bcrypt.
+
+    Entries are keyed by an HMAC of the credentials under a per-process random
+    key, so plaintext passwords are never kept. Each entry remembers the hash it
+    was checked against and is only honoured while that hash is still current.
+    `clock` is injectable for tests.
+    """
+    def __init__(self, ttl: float, max_size: int, clock: Callable[[], float] = monotonic) -> None:
+        self.ttl: float = ttl
+        self.max_size: int = max_size
+        self._clock: Final[Callable[[], float]] = clock
+        self._key: Final[bytes] = secrets.token_bytes(32)
+        self._entries: OrderedDict[bytes, Tuple[str, str, float]] = OrderedDict()
+        self._by_user: Dict[str, Set[bytes]] = {}
+        self._lock: Final[Lock] = Lock()
+
+    def _digest(self, password: str, username: str, user_id: str) -> bytes:
+        message: Final[bytes] = f"{user_id}\0{username}\0{password}".encode('utf-8')
+        return hmac.new(self._key, message, sha256).digest()
+
+    def _drop(self, digest: bytes) -> None:
+        entry: Final[Optional[Tuple[str, str, float]]] = self._entries.pop(digest, None)
+        if entry is None:
+            return
+        digests: Final[Optional[Set[bytes]]] = self._by_user.get(entry[0])
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._by_user[entry[0]]
+
+    def get(self, password: str, username: str, user_id: str, stored_hash: str) -> bool:
+        digest: Final[bytes] = self._digest(password, username, user_id)
+        with self._lock:
+            entry: Final[Optional[Tuple[str, str, float]]] = self._entries.get(digest)
+            if entry is None:
+                return False
+            if entry[1] != stored_hash or entry[2] <= self._clock():
+                self._drop(digest)
+                return False
+            return True
+
+    def put(self, password: str, username: str, user_id: str, stored_hash: str) -> None:
+        digest: Final[bytes] = self._digest(password, username, user_id)
+        with self._lock:
+            self._drop(digest)
+            self._entries[digest] = (user_id, stored_hash, self._clock() + self.ttl)
+            self._by_user.setdefault(user_id, set()).add(digest)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            for digest in list(self._by_user.get(user_id, ())):
+                self._drop(digest)
+
+
 # ========== Manager Classes =========
 class EnhancedPasswordManager:
+    pool: Final[HashPool] = HashPool(HASH_WORKERS, HASH_QUEUE_LIMIT)
+    cache: Final[CredentialCache] = CredentialCache(CREDENTIAL_CACHE_TTL, CREDENTIAL_CACHE_SIZE)
+
+    @staticmethod
+    def _hash(combined: bytes) -> str:
+        return bcrypt.hashpw(combined, bcrypt.gensalt()).decode('utf-8')
+
+    @staticmethod
+    def _check(combined: bytes, stored_hash: bytes) -> bool:
+        started: Final[float] = perf_counter()
+        try:
+            return bcrypt.checkpw(combined, stored_hash)
+        finally:
+            bcrypt_seconds.observe(perf_counter() - started, ("verify",))
+
     @staticmethod
     def hash_password(password: str, username: str, user_id: str) -> str:
         combined: Final[bytes] = f"{password}:{username}:{user_id}".encode('utf-8')
-        hashed: Final[bytes] = bcrypt.hashpw(combined, bcrypt.gensalt())
-        return hashed.decode('utf-8')
-    
+        started: Final[float] = perf_counter()
+        try:
+            return EnhancedPasswordManager.pool.run(EnhancedPasswordManager._hash, combined)
+        finally:
+            bcrypt_seconds.observe(perf_counter() - started, ("hash",))
+
     @staticmethod
     def verify_password(password: str, username: str, user_id: str, stored_hash: str) -> bool:
+        if EnhancedPasswordManager.cache.get(password, username, user_id, stored_hash):
+            return True
+
         combined: Final[bytes] = f"{password}:{username}:{user_id}".encode('utf-8')
-        return bcrypt.checkpw(combined, stored_hash.encode('utf-8'))
-    
+        verified: Final[bool] = EnhancedPasswordManager.pool.run(
+            EnhancedPasswordManager._check, combined, stored_hash.encode('utf-8')
+        )
+        if verified:
+            EnhancedPasswordManager.cache.put(password, username, user_id, stored_hash)
+        return verified
 
-class DataManager:
     @staticmethod
-    def get_data() -> Data:
-        with open(DATA_PATH, 'r', encoding='utf-8') as file:
-            return json_load(file)
+    def hash_many(credentials: List[Tuple[str, str, str]], workers: Optional[int] = None, progress: Optional[ImportProgress] = None) -> List[str]:
+        """
+        Hash (password, username, user_id) triples on a process pool.
 
-    @staticmethod
-    def get_user_password(user_id: str, user_name: str) -> Optional[str]:
-        data: Final[Data] = DataManager.get_data()
-        for user in data["users"]:
-            if user["id"] == user_id and user["name"] == user_name:
-                return user["password"]
-        return None
+        Meant for bulk provisioning: every core gets its own interpreter, and
+        results come back in input order. `progress(done, total)` is called
+        from the calling thread as hashes complete.
+        """
+        combined: Final[List[bytes]] = [
+            f"{password}:{username}:{user_id}".encode('utf-8') for password, username, user_id in credentials
+        ]
+        total: Final[int] = len(combined)
+        workers = workers or os.cpu_count() or 2
+        chunk: Final[int] = max(1, min(8, total // (workers * 4)))
+
+        hashes: Final[List[str]] = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for password_hash in executor.map(EnhancedPasswordManager._hash, combined, chunksize=chunk):
+                hashes.append(password_hash)
+                if progress is not None:
+                    progress(len(hashes), total)
+        return hashes
+
+
+class JsonStorage:
+    """
+    data.json backend.
+
+    The file is parsed once and kept in memory, keyed by user id with a
+    secondary name index. `poll` stats the file and only re-reads it when its
+    mtime or size changed (e.g. after admin.py edited it), applying the
+    difference record by record. Every write rewrites the whole file.
+    """
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self._lock: Final[RLock] = RLock()
+        self._users: Dict[str, User] = {}
+        self._names: Dict[str, Set[str]] = {}
+        self._signature: Optional[Tuple[int, int]] = None
+        self._pending: UsersChange = {"added": [], "removed": [], "changed": []}
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat: Final[os.stat_result] = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _index(self, user: User) -> None:
+        self._users[user["id"]] = user
+        self._names.setdefault(user["name"], set()).add(user["id"])
+
+    def _unindex(self, user_id: str) -> Optional[User]:
+        user: Final[Optional[User]] = self._users.pop(user_id, None)
+        if user is not None:
+            ids: Final[Optional[Set[str]]] = self._names.get(user["name"])
+            if ids is not None:
+                ids.discard(user_id)
+                if not ids:
+                    del self._names[user["name"]]
+        return user
+
+    def _reload(self) -> None:
+        if self._stat() == self._signature:
+            return
+
+        with self._lock:
+            signature: Final[Optional[Tuple[int, int]]] = self._stat()
+            if signature == self._signature:
+                return
+
+            started: Final[float] = perf_counter()
+            try:
+                with open(self.path, 'r', encoding='utf-8') as file:
+                    data: Final[Data] = json_load(file)
+            except (FileNotFoundError, JSONDecodeError):
+                # Missing or half-written file: keep serving the last good index.
+                return
+            store_load_seconds.observe(perf_counter() - started)
+
+            fresh: Final[Dict[str, User]] = {user["id"]: user for user in data.get("users", [])}
+
+            for user_id in [user_id for user_id in self._users if user_id not in fresh]:
+                self._unindex(user_id)
+                self._pending["removed"].append(user_id)
+
+            for user_id, user in fresh.items():
+                current: Optional[User] = self._users.get(user_id)
+                if current is None:
+                    self._index(user)
+                    self._pending["added"].append(user)
+                elif current != user:
+                    self._unindex(user_id)
+                    self._index(user)
+                    self._pending["changed"].append(user_id)
+
+            self._signature = signature
+
+    def _save(self) -> None:
+        data: Final[Data] = {"users": list(self._users.values())}
+        temp_path: Final[str] = f"{self.path}.tmp"
+
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json_dump(data, f, ensure_ascii=False, indent=4)
+        os.replace(temp_path, self.path)
+
+        self._signature = self._stat()
+
+    def poll(self) -> UsersChange:
+        self._reload()
+        with self._lock:
+            change: Final[UsersChange] = self._pending
+            self._pending = {"added": [], "removed": [], "changed": []}
+        return change
+
+    def all(self) -> List[User]:
+        return list(self._users.values())
+
+    def get(self, user_id: str) -> Optional[User]:
+        return self._users.get(user_id)
+
+    def by_name(self, user_name: str) -> List[User]:
+        return [self._users[user_id] for user_id in self._names.get(user_name, ())]
+
+    def insert(self, users: List[User]) -> None:
+        with self._lock:
+            self._reload()
+            for user in users:
+                self._index(user)
+                self._pending["added"].append(user)
+            self._save()
+
+    def update(self, user: User) -> bool:
+        with self._lock:
+            self._reload()
+            if self._unindex(user["id"]) is None:
+                return False
+            self._index(user)
+            self._pending["changed"].append(user["id"])
+            self._save()
+            return True
+
+    def delete(self, user_id: str) -> bool:
+        with self._lock:
+            self._reload()
+            if self._unindex(user_id) is None:
+                return False
+            self._pending["removed"].append(user_id)
+            self._save()
+            return True
+
+
+class SqliteStorage:
+    """
+    SQLite backend in WAL mode.
+
+    Lookups by id and name are index seeks and every write touches a single
+    row, so admin actions cost the same whatever the number of users. WAL lets
+    the server keep reading while another process writes. Each write also
+    appends to a `changes` table in the same transaction; `poll` reads that
+    table past the last sequence number it saw to find out what changed,
+    including writes made by other processes.
+
+    Every poller records how far it has read in `pollers`, at most once per
+    CHANGES_PRUNE_INTERVAL, and then deletes the changes every poller has
+    read. A poller not seen for CHANGES_RETENTION (a crashed process, or one
+    idle that long) stops holding rows back, so the table stays bounded.
+    """
+    SCHEMA: Final[str] = """
+        CREATE TABLE IF NOT EXISTS users (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            password TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS users_name ON users (name);
+        CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            kind TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS pollers (
+            id TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL,
+            seen REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self._local: Final[local] = local()
+        self._lock: Final[Lock] = Lock()
+
+        db: Final[sqlite3.Connection] = self._db()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(SqliteStorage.SCHEMA)
+        self._seq: int = db.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+        self._poller: Final[str] = secrets.token_hex(8)
+        self._pruned_at: float = float("-inf")
+
+    def _db(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread that created them
+        db: Optional[sqlite3.Connection] = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
 
     @staticmethod
-    def new_user(user_name: str, user_password: str) -> str:
-        data: Final[Data] = DataManager.get_data()
+    def _user(row: Optional[tuple]) -> Optional[User]:
+        if row is None:
+            return None
+        return {"name": row[0], "id": row[1], "password": row[2]}
+
+    def _write(self, statements: List[Tuple[str, tuple]], changes: List[Tuple[str, str]]) -> int:
+        db: Final[sqlite3.Connection] = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            rows: int = 0
+            for sql, params in statements:
+                rows += db.execute(sql, params).rowcount
+            if rows:
+                db.executemany("INSERT INTO changes (user_id, kind) VALUES (?, ?)", changes)
+            db.execute("COMMIT")
+            return rows
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def poll(self) -> UsersChange:
+        change: Final[UsersChange] = {"added": [], "removed": [], "changed": []}
+        with self._lock:
+            rows: Final[List[tuple]] = self._db().execute(
+                "SELECT seq, user_id, kind FROM changes WHERE seq > ? ORDER BY seq", (self._seq,)
+            ).fetchall()
+            if rows:
+                self._seq = rows[-1][0]
+            if monotonic() - self._pruned_at >= CHANGES_PRUNE_INTERVAL:
+                self.prune()
+
+        for _, user_id, kind in rows:
+            if kind == "added":
+                user: Optional[User] = self.get(user_id)
+                if user is not None:
+                    change["added"].append(user)
+            else:
+                change["removed" if kind == "removed" else "changed"].append(user_id)
+        return change
+
+    def prune(self) -> int:
+        """Record this poller's cursor, then delete the changes every live poller has read."""
+        now: Final[float] = time()
+        self._pruned_at = monotonic()
+        db: Final[sqlite3.Connection] = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "INSERT INTO pollers (id, seq, seen) VALUES (?, ?, ?) ON CONFLICT (id) DO UPDATE SET seq = excluded.seq, seen = excluded.seen",
+                (self._poller, self._seq, now)
+            )
+            db.execute("DELETE FROM pollers WHERE seen < ?", (now - CHANGES_RETENTION,))
+            pruned: Final[int] = db.execute("DELETE FROM changes WHERE seq <= (SELECT MIN(seq) FROM pollers)").rowcount
+            db.execute("COMMIT")
+            return pruned
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def close(self) -> None:
+        """Stop holding back changes for this poller."""
+        self._db().execute("DELETE FROM pollers WHERE id = ?", (self._poller,))
+
+    def all(self) -> List[User]:
+        rows: Final[List[tuple]] = self._db().execute("SELECT name, id, password FROM users ORDER BY rowid").fetchall()
+        return [{"name": row[0], "id": row[1], "password": row[2]} for row in rows]
+
+    def get(self, user_id: str) -> Optional[User]:
+        return SqliteStorage._user(self._db().execute(
+            "SELECT name, id, password FROM users WHERE id = ?", (user_id,)
+        ).fetchone())
+
+    def by_name(self, user_name: str) -> List[User]:
+        rows: Final[List[tuple]] = self._db().execute(
+            "SELECT name, id, password FROM users WHERE name = ? ORDER BY rowid", (user_name,)
+        ).fetchall()
+        return [{"name": row[0], "id": row[1], "password": row[2]} for row in rows]
+
+    def insert(self, users: List[User]) -> None:
+        self._write(
+            [("INSERT INTO users (name, id, password) VALUES (?, ?, ?)", (user["name"], user["id"], user["password"])) for user in users],
+            [(user["id"], "added") for user in users]
+        )
+
+    def update(self, user: User) -> bool:
+        return self._write(
+            [("UPDATE users SET name = ?, password = ? WHERE id = ?", (user["name"], user["password"], user["id"]))],
+            [(user["id"], "changed")]
+        ) > 0
+
+    def delete(self, user_id: str) -> bool:
+        return self._write(
+            [("DELETE FROM users WHERE id = ?", (user_id,))],
+            [(user_id, "removed")]
+        ) > 0
 
+
+UserStorage = Union[JsonStorage, SqliteStorage]
+
+
+class DataManager:
+    """
+    Facade over the user storage backend.
+
+    The backend is picked on first use: SQLite when SEEME_STORAGE says so, or
+    by default when DB_PATH exists (see `python api.py migrate`), data.json
+    otherwise. Changes, including ones made by other processes, are pushed to
+    listeners the next time anything is read.
+    """
+    _storage: Optional[UserStorage] = None
+    _storage_lock: Final[Lock] = Lock()
+    _listeners: List[UsersListener] = []
+
+    @classmethod
+    def storage(cls) -> UserStorage:
+        if cls._storage is None:
+            with cls._storage_lock:
+                if cls._storage is None:
+                    backend: Final[str] = STORAGE or ("sqlite" if os.path.exists(DB_PATH) else "json")
+                    if backend == "sqlite":
+                        storage: Final[SqliteStorage] = SqliteStorage(DB_PATH)
+                        atexit.register(storage.close)
+                        cls._storage = storage
+                    else:
+                        cls._storage = JsonStorage(DATA_PATH)
+        return cls._storage
+
+    @classmethod
+    def use(cls, storage: UserStorage) -> None:
+        cls._storage = storage
+
+    @classmethod
+    def _notify(cls, change: UsersChange) -> None:
+        if not (change["added"] or change["removed"] or change["changed"]):
+            return
+        for user_id in change["removed"] + change["changed"]:
+            EnhancedPasswordManager.cache.invalidate(user_id)
+        for listener in list(cls._listeners):
+            listener(change)
+
+    @classmethod
+    def refresh(cls) -> None:
+        cls._notify(cls.storage().poll())
+
+    @classmethod
+    def add_listener(cls, listener: UsersListener) -> None:
+        cls._listeners.append(listener)
+
+    @classmethod
+    def get_data(cls) -> Data:
+        cls.refresh()
+        return {"users": cls.storage().all()}
+
+    @classmethod
+    def get_user(cls, user_id: str) -> Optional[User]:
+        cls.refresh()
+        return cls.storage().get(user_id)
+
+    @classmethod
+    def get_users_by_name(cls, user_name: str) -> List[User]:
+        cls.refresh()
+        return cls.storage().by_name(user_name)
+
+    @classmethod
+    def get_user_password(cls, user_id: str, user_name: str) -> Optional[str]:
+        user: Final[Optional[User]] = cls.get_user(user_id)
+        if user is not None and user["name"] == user_name:
+            return user["password"]
+        return None
+
+    @classmethod
+    def new_user(cls, user_name: str, user_password: str) -> str:
         user_id: Final[str] = str(uuid4()).upper()
         password_encode: Final[str] = EnhancedPasswordManager.hash_password(user_password, user_name, user_id)
-        data["users"].append({
+
+        cls.storage().insert([{
             "name": user_name,
             "id": user_id,
             "password": password_encode
-        })
-
-        with open(DATA_PATH, "w", encoding="utf-8") as f:
-            json_dump(data, f, ensure_ascii=False, indent=4)
+        }])
+        cls.refresh()
 
         return user_id
 
-    @staticmethod
-    def delete_user(user_id: str) -> bool:
-        data: Final[Data] = DataManager.get_data()
-        flag: bool = False
-
-        for user in data["users"]:
-            if user["id"] == user_id:
-                flag = True
-                data["users"].remove(user)
-                break
-        
-        with open(DATA_PATH, "w", encoding="utf-8") as f:
-            json_dump(data, f, ensure_ascii=False, indent=4)
+    @classmethod
+    def new_users(cls, credentials: List[Tuple[str, str]], workers: Optional[int] = None, progress: Optional[ImportProgress] = None) -> List[ImportResult]:
+        """Create users from (name, password) pairs with a single storage write."""
+        if not credentials:
+            return []
+
+        ids: Final[List[str]] = [str(uuid4()).upper() for _ in credentials]
+        hashes: Final[List[str]] = EnhancedPasswordManager.hash_many(
+            [(password, name, user_id) for (name, password), user_id in zip(credentials, ids)], workers, progress
+        )
 
+        cls.storage().insert([
+            {"name": name, "id": user_id, "password": password_hash}
+            for (name, _), user_id, password_hash in zip(credentials, ids, hashes)
+        ])
+        cls.refresh()
+
+        return [{"name": name, "id": user_id} for (name, _), user_id in zip(credentials, ids)]
+
+    @classmethod
+    def delete_user(cls, user_id: str) -> bool:
+        flag: Final[bool] = cls.storage().delete(user_id)
+        cls.refresh()
         return flag
-    
-    @staticmethod
-    def change_user_info(user_id: str, new_user_name: str, new_user_password: str):
-        data: Final[Data] = DataManager.get_data()
-        users: Final[List[User]] = data["users"]
-        flag: bool = False
-
-        for i in range(len(users)):
-            if users[i]["id"] == user_id:
-                flag = True
-                new_password_encode: str = EnhancedPasswordManager.hash_password(new_user_password, new_user_name, user_id)
-                users[i]["name"] = new_user_name
-                users[i]["password"] = new_password_encode
-                break
-        
-        data["users"] = users
-        
-        with open(DATA_PATH, "w", encoding="utf-8") as f:
-            json_dump(data, f, ensure_ascii=False, indent=4)
 
+    @classmethod
+    def change_user_info(cls, user_id: str, new_user_name: str, new_user_password: str) -> bool:
+        new_password_encode: Final[str] = EnhancedPasswordManager.hash_password(new_user_password, new_user_name, user_id)
+        flag: Final[bool] = cls.storage().update({
+            "name": new_user_name,
+            "id": user_id,
+            "password": new_password_encode
+        })
+        cls.refresh()
         return flag
+
+
+# ========== Migration =========
+def migrate_json_to_sqlite(json_path: str, db_path: str) -> int:
+    with open(json_path, 'r', encoding='utf-8') as file:
+        data: Final[Data] = json_load(file)
+    storage: Final[SqliteStorage] = SqliteStorage(db_path)
+    known: Final[Set[str]] = {user["id"] for user in storage.all()}
+    users: Final[List[User]] = [user for user in data.get("users", []) if user["id"] not in known]
+    storage.insert(users)
+    return len(users)
+
+
+def export_sqlite_to_json(db_path: str, json_path: str) -> int:
+    users: Final[List[User]] = SqliteStorage(db_path).all()
+    data: Final[Data] = {"users": users}
+    with open(f"{json_path}.tmp", "w", encoding="utf-8") as f:
+        json_dump(data, f, ensure_ascii=False, indent=4)
+    os.replace(f"{json_path}.tmp", json_path)
+    return len(users)
+
+
+# ========== Bulk Import =========
+def read_import_file(path: str) -> List[Tuple[str, str]]:
+    """
+    (name, password) pairs from a .jsonl file ({"name": ..., "password": ...}
+    per line) or a CSV file with a `name,password` header.
+    """
+    credentials: Final[List[Tuple[str, str]]] = []
+    with open(path, 'r', encoding='utf-8-sig', newline='') as file:
+        if path.lower().endswith(".jsonl"):
+            rows: Any = (json_loads(line) for line in file if line.strip())
+        else:
+            rows = csv.DictReader(file)
+
+        for line, row in enumerate(rows, start=1):
+            name: str = str(row.get("name") or "").strip()
+            password: str = str(row.get("password") or "").strip()
+            if not name or not password:
+                raise ValueError(f"Row {line}: empty user name or user password")
+            credentials.append((name, password))
+    return credentials
+
+
+def write_import_results(path: str, results: List[ImportResult]) -> None:
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer: Final[Any] = csv.DictWriter(file, fieldnames=["name", "id"])
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def import_results_path(path: str) -> str:
+    return f"{os.path.splitext(path)[0]}.results.csv"
+
+
+# ========== Main =========
+if __name__ == "__main__":
+    parser: Final[ArgumentParser] = ArgumentParser(description="SeeMe user storage tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate", help=f"copy users from {DATA_PATH} into {DB_PATH}")
+    commands.add_parser("export", help=f"write the users in {DB_PATH} back to {DATA_PATH}")
+    import_parser = commands.add_parser("import", help="create users from a CSV (name,password) or JSONL file")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--results", help="where to write the name,id results (default: <file>.results.csv)")
+    import_parser.add_argument("--workers", type=int, help="hashing processes (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        print(f"[info] [Migrate] Copied {migrate_json_to_sqlite(DATA_PATH, DB_PATH)} users into {DB_PATH}.")
+    elif args.command == "export":
+        print(f"[info] [Export] Wrote {export_sqlite_to_json(DB_PATH, DATA_PATH)} users to {DATA_PATH}.")
+    elif args.command == "import":
+        started: Final[float] = monotonic()
+        reported: List[float] = [started]
+
+        def report(done: int, total: int) -> None:
+            now: Final[float] = monotonic()
+            if done == total or now - reported[0] >= 1:
+                reported[0] = now
+                print(f"[info] [Import] Hashed {done}/{total} ({done / max(now - started, 1e-9):.1f} users/s)")
+
+        results: Final[List[ImportResult]] = DataManager.new_users(read_import_file(args.file), args.workers, report)
+        results_path: Final[str] = args.results or import_results_path(args.file)
+        write_import_results(results_path, results)
+        print(f"[info] [Import] Created {len(results)} users in {monotonic() - started:.1f}s, IDs written to {results_path}.")
@@ -0,0 +1,115 @@
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+from typing import Final, Optional, Dict, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# ========== Constants =========
+INDEX_NAME: Final[str] = "index.html"
+COMPRESSIBLE: Final[Tuple[str, ...]] = (".html", ".js", ".css", ".map", ".json", ".svg", ".txt", ".ts")
+# References in index.html to rewrite: src="public/..." and href="public/..."
+REFERENCE: Final[re.Pattern] = re.compile(r'(src|href)="/?public/([^"?#]+)"')
+
+
+# ========== Classes =========
+class Asset:
+    """One file, with every encoding it can be sent in, all precomputed."""
+    __slots__ = ("name", "url", "mimetype", "digest", "variants")
+
+    def __init__(self, name: str, url: str, body: bytes) -> None:
+        self.name: str = name
+        self.url: str = url
+        self.mimetype: str = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.digest: str = hashlib.sha256(body).hexdigest()[:16]
+        # Encoding ("identity", "gzip", "br") -> body; compressed ones only if smaller
+        self.variants: Dict[str, bytes] = {"identity": body}
+        if name.endswith(COMPRESSIBLE):
+            compressed: bytes = gzip.compress(body, 9, mtime=0)
+            if len(compressed) < len(body):
+                self.variants["gzip"] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=11)
+                if len(compressed) < len(body):
+                    self.variants["br"] = compressed
+
+    def etag(self, encoding: str) -> str:
+        return f"{self.digest}-{encoding}"
+
+
+class AssetStore:
+    """
+    Everything under `root`, loaded into memory once at startup.
+
+    Each file gets a content-hashed URL (`/public/css/style.<hash>.css`) that
+    can be cached forever, since new content means a new URL. index.html is
+    rewritten to reference those URLs and is itself revalidated on every load
+    through its ETag, which is what makes a rebuilt app.js reach the browser.
+    The plain URLs keep working for anything that is not referenced from
+    index.html (e.g. source maps). Compressed variants are made here, so a
+    request only picks one. Rebuilt files are picked up by a restart.
+    """
+    def __init__(self, root: str, prefix: str = "/public/") -> None:
+        self.root: str = root
+        self.prefix: str = prefix
+        self.index: Optional[Asset] = None
+        # Path below `prefix` -> (asset, immutable)
+        self._paths: Dict[str, Tuple[Asset, bool]] = {}
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    @staticmethod
+    def fingerprint(name: str, digest: str) -> str:
+        base, extension = os.path.splitext(name)
+        return f"{base}.{digest[:10]}{extension}"
+
+    def load(self) -> None:
+        paths: Final[Dict[str, Tuple[Asset, bool]]] = {}
+        hashed: Final[Dict[str, str]] = {}
+        index_body: Optional[bytes] = None
+
+        for directory, _, files in os.walk(self.root):
+            for file_name in files:
+                path: str = os.path.join(directory, file_name)
+                name: str = os.path.relpath(path, self.root).replace(os.sep, "/")
+                with open(path, 'rb') as file:
+                    body: bytes = file.read()
+                if name == INDEX_NAME:
+                    index_body = body
+                    continue
+
+                asset: Asset = Asset(name, self.prefix + name, body)
+                fingerprinted: str = self.fingerprint(name, asset.digest)
+                asset.url = self.prefix + fingerprinted
+                hashed[name] = asset.url
+                paths[name] = (asset, False)
+                paths[fingerprinted] = (asset, True)
+
+        if index_body is not None:
+            text: Final[str] = REFERENCE.sub(
+                lambda match: f'{match.group(1)}="{hashed.get(match.group(2), self.prefix + match.group(2))}"',
+                index_body.decode('utf-8')
+            )
+            self.index = Asset(INDEX_NAME, "/", text.encode('utf-8'))
+            paths[INDEX_NAME] = (self.index, False)
+
+        self._paths = paths
+
+    def get(self, name: str) -> Optional[Tuple[Asset, bool]]:
+        return self._paths.get(name)
+
+
+# ========== Functions =========
+def choose_encoding(asset: Asset, accepted: Dict[str, float]) -> str:
+    """Best precomputed variant for the client's Accept-Encoding qualities."""
+    for encoding in ("br", "gzip"):
+        if encoding in asset.variants and accepted.get(encoding, 0) > 0:
+            return encoding
+    return "identity"
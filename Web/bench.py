@@ -0,0 +1,343 @@
+import os
+import sys
+import json
+import random
+import shutil
+import bcrypt
+import platform
+import tempfile
+import subprocess
+import multiprocessing
+from argparse import ArgumentParser
+from itertools import product
+from threading import Thread, Event
+from time import time, sleep, perf_counter
+from typing import Final, Optional, List, Dict, Tuple, TypedDict, Any
+from uuid import uuid4
+import requests
+
+
+# ========== Constants =========
+WEB_DIR: Final[str] = os.path.dirname(os.path.abspath(__file__))
+TOKEN_HEADER: Final[str] = "X-SeeMe-Token"
+NOT_LOGGED_IN: Final[str] = "User not logged in"
+WINDOWS: Final[List[str]] = [f"Window {index} - Benchmark" for index in range(20)]
+PERCENTILES: Final[Tuple[int, ...]] = (50, 95, 99)
+
+
+# ========== TypedDicts =========
+class Credentials(TypedDict):
+    user_id: str
+    user_name: str
+    user_password: str
+
+
+class EndpointStats(TypedDict):
+    requests: int
+    errors: int
+    throughput: float
+    p50: float
+    p95: float
+    p99: float
+
+
+class PointResult(TypedDict):
+    users: int
+    clients: int
+    viewers: int
+    duration: float
+    endpoints: Dict[str, EndpointStats]
+
+
+# ========== Setup =========
+def seed_users(directory: str, users: int, clients: int, rounds: int) -> List[Credentials]:
+    """
+    Write data.json with `users` synthetic users. Only the first `clients` of
+    them ever log in, so only those get a real bcrypt hash (at `rounds`).
+    """
+    records: Final[List[dict]] = []
+    credentials: Final[List[Credentials]] = []
+    for index in range(users):
+        user_id: str = str(uuid4()).upper()
+        name: str = f"bench{index:06d}"
+        password: str = f"pw{index}"
+        if index < clients:
+            combined: bytes = f"{password}:{name}:{user_id}".encode('utf-8')
+            password_hash: str = bcrypt.hashpw(combined, bcrypt.gensalt(rounds)).decode('utf-8')
+            credentials.append({"user_id": user_id, "user_name": name, "user_password": password})
+        else:
+            password_hash = "$2b$12$" + "x" * 53
+        records.append({"name": name, "id": user_id, "password": password_hash})
+
+    with open(os.path.join(directory, "data.json"), "w", encoding="utf-8") as file:
+        json.dump({"users": records}, file)
+    return credentials
+
+
+def start_server(directory: str, port: int, workers: int) -> subprocess.Popen:
+    env: Final[Dict[str, str]] = dict(os.environ)
+    env.update({
+        "PYTHONPATH": WEB_DIR,
+        "SEEME_LOG_LEVEL": "warning",
+        "SEEME_WS_PORT": "0",
+        "SEEME_STORAGE": "json",
+        # Measure raw capacity: admission control would turn the load into 429s
+        "SEEME_INGEST_RATE": "0",
+        "SEEME_LOGIN_RATE": "0"
+    })
+    process: Final[subprocess.Popen] = subprocess.Popen(
+        [sys.executable, os.path.join(WEB_DIR, "serve.py"), "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--ws-port", "0"],
+        cwd=directory, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    deadline: Final[float] = time() + 60
+    while time() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/users?limit=1", timeout=1).ok:
+                return process
+        except requests.RequestException:
+            pass
+        if process.poll() is not None:
+            break
+        sleep(0.2)
+    stop_server(process)
+    raise RuntimeError("Server did not come up")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# ========== Load =========
+class Recorder:
+    """Latencies per endpoint for one thread; merged after the run."""
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def call(self, endpoint: str, fn: Any, *args: Any, **kwargs: Any) -> Optional[dict]:
+        started: Final[float] = perf_counter()
+        try:
+            response: Final[requests.Response] = fn(*args, **kwargs)
+            result: Optional[dict] = response.json() if response.ok else None
+        except (requests.RequestException, ValueError):
+            result = None
+        self.latencies.setdefault(endpoint, []).append(perf_counter() - started)
+        if result is None or result.get("status") != "success":
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        return result
+
+
+def run_client(url: str, credentials: Credentials, interval: float, change_rate: float, stop: Event, recorder: Recorder) -> None:
+    """The Windows client's cycle: log in, then a full upload on a window change, a heartbeat otherwise."""
+    http: Final[requests.Session] = requests.Session()
+    randomizer: Final[random.Random] = random.Random(credentials["user_id"])
+    token: Optional[str] = None
+    window: str = randomizer.choice(WINDOWS)
+    last_sent: Optional[str] = None
+
+    while not stop.is_set():
+        if token is None:
+            result: Optional[dict] = recorder.call("/login", http.post, f"{url}/login", json=credentials, timeout=30)
+            token = result.get("token") if result else None
+            last_sent = None
+            if token is None:
+                stop.wait(1)
+                continue
+
+        if randomizer.random() < change_rate:
+            window = randomizer.choice(WINDOWS)
+
+        if window != last_sent:
+            result = recorder.call(
+                "/upload", http.post, f"{url}/upload", json={"token": token, "active_window": window}, timeout=10
+            )
+        else:
+            result = recorder.call(
+                "/upload/heartbeat", http.post, f"{url}/upload/heartbeat", headers={TOKEN_HEADER: token}, timeout=10
+            )
+
+        if result is not None and result.get("message") == NOT_LOGGED_IN:
+            token = None
+        elif result is not None and result.get("status") == "success" and not result.get("resync"):
+            last_sent = window
+        else:
+            last_sent = None
+        stop.wait(interval)
+    http.close()
+
+
+def run_viewer(url: str, user_ids: List[str], interval: float, stop: Event, recorder: Recorder) -> None:
+    """A dashboard tab watching a random user by polling /users/get."""
+    http: Final[requests.Session] = requests.Session()
+    target: Final[str] = random.choice(user_ids)
+    while not stop.is_set():
+        recorder.call("/users/get", http.post, f"{url}/users/get", json={"user_id": target}, timeout=10)
+        stop.wait(interval)
+    http.close()
+
+
+def run_shard(job: Tuple[str, List[Credentials], int, List[str], float, float, float, float]) -> Tuple[Dict[str, List[float]], Dict[str, int]]:
+    """One load process: a thread per simulated client and viewer."""
+    url, credentials, viewers, user_ids, duration, interval, viewer_interval, change_rate = job
+    stop: Final[Event] = Event()
+    recorders: Final[List[Recorder]] = []
+    threads: Final[List[Thread]] = []
+
+    for entry in credentials:
+        recorder: Recorder = Recorder()
+        recorders.append(recorder)
+        threads.append(Thread(target=run_client, args=(url, entry, interval, change_rate, stop, recorder), daemon=True))
+    for _ in range(viewers):
+        recorder = Recorder()
+        recorders.append(recorder)
+        threads.append(Thread(target=run_viewer, args=(url, user_ids, viewer_interval, stop, recorder), daemon=True))
+
+    for thread in threads:
+        thread.start()
+    sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join(30)
+
+    latencies: Final[Dict[str, List[float]]] = {}
+    errors: Final[Dict[str, int]] = {}
+    for recorder in recorders:
+        for endpoint, values in recorder.latencies.items():
+            latencies.setdefault(endpoint, []).extend(values)
+        for endpoint, count in recorder.errors.items():
+            errors[endpoint] = errors.get(endpoint, 0) + count
+    return latencies, errors
+
+
+# ========== Reporting =========
+def percentile(values: List[float], percent: int) -> float:
+    if not values:
+        return 0.0
+    ordered: Final[List[float]] = sorted(values)
+    index: Final[int] = min(len(ordered) - 1, max(0, int(round(percent / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: Dict[str, List[float]], errors: Dict[str, int], duration: float) -> Dict[str, EndpointStats]:
+    stats: Final[Dict[str, EndpointStats]] = {}
+    for endpoint in sorted(latencies):
+        values: List[float] = latencies[endpoint]
+        stats[endpoint] = {
+            "requests": len(values),
+            "errors": errors.get(endpoint, 0),
+            "throughput": len(values) / duration,
+            "p50": percentile(values, 50) * 1000,
+            "p95": percentile(values, 95) * 1000,
+            "p99": percentile(values, 99) * 1000
+        }
+    return stats
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit: str = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=WEB_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+        "started_at": time()
+    }
+
+
+def print_point(point: PointResult) -> None:
+    print(f"\nusers={point['users']} clients={point['clients']} viewers={point['viewers']} ({point['duration']:.0f}s)")
+    print(f"  {'endpoint':<20}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint, stats in point["endpoints"].items():
+        print(
+            f"  {endpoint:<20}{stats['requests']:>10}{stats['errors']:>8}{stats['throughput']:>10.1f}"
+            f"{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['p99']:>10.2f}"
+        )
+
+
+# ========== Main =========
+def parse_counts(text: str) -> List[int]:
+    return [int(part) for part in text.split(",") if part.strip()]
+
+
+def main() -> None:
+    """
+    Load test: for every (users, clients) pair, seed a fresh data.json, start
+    serve.py on it, run the simulated clients and viewers for `duration`
+    seconds and record per-endpoint throughput and latency percentiles.
+    """
+    parser: Final[ArgumentParser] = ArgumentParser(description="SeeMe server benchmark")
+    parser.add_argument("--users", default="1000", help="comma-separated user counts to sweep")
+    parser.add_argument("--clients", default="10,50", help="comma-separated concurrent client counts to sweep")
+    parser.add_argument("--viewers", type=int, default=5, help="dashboard viewers polling /users/get")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per sweep point")
+    parser.add_argument("--interval", type=float, default=2, help="seconds between a client's samples (0 = flat out)")
+    parser.add_argument("--viewer-interval", type=float, default=2, help="seconds between a viewer's polls")
+    parser.add_argument("--change-rate", type=float, default=0.2, help="chance that a sample is a new window")
+    parser.add_argument("--workers", type=int, default=1, help="serve.py worker processes")
+    parser.add_argument("--load-procs", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="processes generating load")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12, help="cost of the seeded password hashes")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_results.json", help="machine-readable results")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    url: Final[str] = f"http://127.0.0.1:{args.port}"
+    results: Final[Dict[str, Any]] = {"config": vars(args), "environment": environment(), "points": []}
+
+    for users, clients in product(parse_counts(args.users), parse_counts(args.clients)):
+        directory: str = tempfile.mkdtemp(prefix="seeme-bench-")
+        try:
+            credentials: List[Credentials] = seed_users(directory, max(users, clients), clients, args.bcrypt_rounds)
+            user_ids: List[str] = [entry["user_id"] for entry in credentials] or ["none"]
+            server: subprocess.Popen = start_server(directory, args.port, args.workers)
+            try:
+                shards: int = max(1, min(args.load_procs, clients + args.viewers))
+                jobs: List[tuple] = [
+                    (url, credentials[index::shards], args.viewers // shards + (1 if index < args.viewers % shards else 0),
+                     user_ids, args.duration, args.interval, args.viewer_interval, args.change_rate)
+                    for index in range(shards)
+                ]
+                with multiprocessing.get_context("spawn").Pool(shards) as pool:
+                    outcomes: List[Tuple[Dict[str, List[float]], Dict[str, int]]] = pool.map(run_shard, jobs)
+            finally:
+                stop_server(server)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        latencies: Dict[str, List[float]] = {}
+        errors: Dict[str, int] = {}
+        for shard_latencies, shard_errors in outcomes:
+            for endpoint, values in shard_latencies.items():
+                latencies.setdefault(endpoint, []).extend(values)
+            for endpoint, count in shard_errors.items():
+                errors[endpoint] = errors.get(endpoint, 0) + count
+
+        point: PointResult = {
+            "users": users,
+            "clients": clients,
+            "viewers": args.viewers,
+            "duration": args.duration,
+            "endpoints": summarize(latencies, errors, args.duration)
+        }
+        results["points"].append(point)
+        print_point(point)
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=4)
+    print(f"\n[info] [Bench] Results written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import os
+import json
+import random
+import shutil
+import tempfile
+from argparse import ArgumentParser
+from json import dumps as json_dumps
+from time import time, thread_time
+from typing import Final, List, Dict, Tuple, TypedDict, Any
+from bench import seed_users, environment, WINDOWS, TOKEN_HEADER
+from wire import SampleEncoder, TitleDictionaries, CONTENT_TYPE as WIRE_TYPE
+
+
+# ========== TypedDicts =========
+class FormatStats(TypedDict):
+    requests: int
+    samples: int
+    errors: int
+    bytes_per_sample: float
+    cpu_us_per_sample: float
+    decode_us_per_sample: float
+
+
+# ========== Requests =========
+def sample_stream(randomizer: random.Random, count: int, change_rate: float, start: float) -> List[Tuple[float, str]]:
+    """One client's (time, title) samples, one per second, switching window now and then."""
+    samples: Final[List[Tuple[float, str]]] = []
+    window: str = randomizer.choice(WINDOWS)
+    for index in range(count):
+        if randomizer.random() < change_rate:
+            window = randomizer.choice(WINDOWS)
+        samples.append((start + index, window))
+    return samples
+
+
+def json_bodies(token: str, samples: List[Tuple[float, str]], batch: int) -> List[Tuple[str, bytes, int]]:
+    """(route, body, samples) exactly as Windows/api.py posts them as JSON."""
+    if batch <= 1:
+        return [
+            ("/upload", json_dumps({"token": token, "active_window": title}).encode('utf-8'), 1)
+            for _, title in samples
+        ]
+    bodies: Final[List[Tuple[str, bytes, int]]] = []
+    for offset in range(0, len(samples), batch):
+        chunk: List[Tuple[float, str]] = samples[offset:offset + batch]
+        body: bytes = json_dumps({
+            "token": token,
+            "sent_at": chunk[-1][0],
+            "samples": [{"time": sample_time, "active_window": title} for sample_time, title in chunk]
+        }).encode('utf-8')
+        bodies.append(("/upload/batch", body, len(chunk)))
+    return bodies
+
+
+def wire_bodies(samples: List[Tuple[float, str]], batch: int) -> List[Tuple[str, bytes, int]]:
+    """The same samples in the binary format, assuming every request succeeds."""
+    encoder: Final[SampleEncoder] = SampleEncoder()
+    route: Final[str] = "/upload" if batch <= 1 else "/upload/batch"
+    bodies: Final[List[Tuple[str, bytes, int]]] = []
+    for offset in range(0, len(samples), max(batch, 1)):
+        chunk: List[Tuple[float, str]] = samples[offset:offset + max(batch, 1)]
+        body, defined = encoder.encode(chunk, chunk[-1][0])
+        encoder.confirm(defined)
+        bodies.append((route, body, len(chunk)))
+    return bodies
+
+
+def decode_cost(requests: List[Tuple[str, str, bytes, int]], content_type: str) -> float:
+    """CPU microseconds per sample spent only turning bodies into Python objects."""
+    dictionaries: Final[TitleDictionaries] = TitleDictionaries(len(requests))
+    now: Final[float] = time()
+    started: Final[float] = thread_time()
+    for token, _, body, _ in requests:
+        if content_type == WIRE_TYPE:
+            dictionaries.decode(token, body, now, 0xFFFF)
+        else:
+            json.loads(body)
+    return (thread_time() - started) / sum(request[3] for request in requests) * 1e6
+
+
+def replay(client: Any, requests: List[Tuple[str, str, bytes, int]], content_type: str) -> FormatStats:
+    """
+    Post every (token, route, body, samples) through Flask's test client. CPU
+    is this thread's time, which is where the test client runs the request;
+    the decode cost is measured separately on the same bodies.
+    """
+    errors: int = 0
+    started: Final[float] = thread_time()
+    for token, route, body, _ in requests:
+        response = client.post(route, data=body, headers={"Content-Type": content_type, TOKEN_HEADER: token})
+        if response.get_json().get("status") != "success":
+            errors += 1
+    elapsed: Final[float] = thread_time() - started
+
+    samples: Final[int] = sum(request[3] for request in requests)
+    return {
+        "requests": len(requests),
+        "samples": samples,
+        "errors": errors,
+        "bytes_per_sample": round(sum(len(request[2]) for request in requests) / samples, 2),
+        "cpu_us_per_sample": round(elapsed / samples * 1e6, 2),
+        "decode_us_per_sample": round(decode_cost(requests, content_type), 2)
+    }
+
+
+# ========== Main =========
+def main() -> None:
+    parser: Final[ArgumentParser] = ArgumentParser(
+        description="Compare the JSON and binary upload formats: request body bytes and server CPU per sample."
+    )
+    parser.add_argument("--clients", type=int, default=8, help="sessions posting samples")
+    parser.add_argument("--samples", type=int, default=2000, help="samples per client")
+    parser.add_argument("--batches", default="1,50", help="samples per request, comma separated; 1 means /upload")
+    parser.add_argument("--change-rate", type=float, default=0.1, help="chance the window changes between samples")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_wire_results.json")
+    args = parser.parse_args()
+
+    directory: Final[str] = tempfile.mkdtemp(prefix="seeme-bench-wire-")
+    output: Final[str] = os.path.abspath(args.output)
+    results: Final[Dict[str, Any]] = {"environment": environment(), "args": vars(args), "points": []}
+    try:
+        credentials = seed_users(directory, args.clients, args.clients, 4)
+        os.chdir(directory)
+        os.environ.update({
+            "SEEME_LOG_LEVEL": "off",
+            "SEEME_WS_PORT": "0",
+            "SEEME_STORAGE": "json",
+            "SEEME_INGEST_RATE": "0",
+            "SEEME_LOGIN_RATE": "0"
+        })
+        # The server reads its configuration at import time
+        import server
+        server.init_users()
+        server.restore_presence()
+        client: Final[Any] = server.app.test_client()
+
+        tokens: Final[List[str]] = [client.post("/login", json=entry).get_json()["token"] for entry in credentials]
+        randomizer: Final[random.Random] = random.Random(args.seed)
+        streams: Final[List[List[Tuple[float, str]]]] = [
+            sample_stream(randomizer, args.samples, args.change_rate, time() - args.samples) for _ in tokens
+        ]
+
+        for batch in (int(value) for value in args.batches.split(",") if value.strip()):
+            point: Dict[str, Any] = {"batch": batch}
+            for name, content_type in (("json", "application/json"), ("binary", WIRE_TYPE)):
+                # Clients take turns, as they would against a real server
+                per_client: List[List[Tuple[str, str, bytes, int]]] = [
+                    [(token, *request) for request in (
+                        json_bodies(token, stream, batch) if name == "json" else wire_bodies(stream, batch)
+                    )]
+                    for token, stream in zip(tokens, streams)
+                ]
+                interleaved: List[Tuple[str, str, bytes, int]] = [
+                    request for turn in zip(*per_client) for request in turn
+                ]
+                point[name] = replay(client, interleaved, content_type)
+            results["points"].append(point)
+
+            print(f"\n{'/upload' if batch <= 1 else f'/upload/batch ({batch} per request)'}")
+            print(f"  {'format':<10}{'requests':>10}{'errors':>8}{'bytes/sample':>15}{'cpu us/sample':>15}{'decode us':>12}")
+            for name in ("json", "binary"):
+                stats: FormatStats = point[name]
+                print(
+                    f"  {name:<10}{stats['requests']:>10}{stats['errors']:>8}"
+                    f"{stats['bytes_per_sample']:>15.2f}{stats['cpu_us_per_sample']:>15.2f}{stats['decode_us_per_sample']:>12.2f}"
+                )
+
+        server.activity_log.close()
+    finally:
+        os.chdir(os.path.dirname(output))
+        shutil.rmtree(directory, ignore_errors=True)
+
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=4)
+    print(f"\n[info] [Bench] Results written to {output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from bisect import bisect_left, bisect_right, insort
+from json import dumps as json_dumps, loads as json_loads
+from threading import Lock
+from typing import Final, Optional, List, Dict, Set, Tuple, Callable, Iterable, Iterator
+
+
+# ========== Classes =========
+class NameIndex:
+    """
+    Users sorted by name: (lowercased name, user id) pairs in a sorted list.
+
+    `load` builds the list with a single sort. `put` and `remove` keep it
+    sorted with bisect, which suits the one-at-a-time edits that follow;
+    `put_many` appends a batch and re-sorts, which Timsort does as one merge.
+    Subclasses hook `_added` / `_removed` to keep extra indexes in step.
+    """
+    def __init__(self) -> None:
+        self.names: Dict[str, str] = {}
+        self._sorted: List[Tuple[str, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def load(self, users: Iterable[Tuple[str, str]]) -> None:
+        """Replace the contents with (user id, name) pairs."""
+        self.names = dict(users)
+        self._sorted = sorted((name.lower(), user_id) for user_id, name in self.names.items())
+        for key, user_id in self._sorted:
+            self._added(user_id, key)
+
+    def put(self, user_id: str, name: str) -> None:
+        self._discard(user_id)
+        self.names[user_id] = name
+        insort(self._sorted, (name.lower(), user_id))
+        self._added(user_id, name.lower())
+
+    def put_many(self, users: List[Tuple[str, str]]) -> None:
+        for user_id, _ in users:
+            self._discard(user_id)
+        for user_id, name in users:
+            self.names[user_id] = name
+            self._sorted.append((name.lower(), user_id))
+            self._added(user_id, name.lower())
+        self._sorted.sort()
+
+    def remove(self, user_id: str) -> None:
+        self._discard(user_id)
+
+    def _discard(self, user_id: str) -> None:
+        name: Final[Optional[str]] = self.names.pop(user_id, None)
+        if name is None:
+            return
+        key: Final[Tuple[str, str]] = (name.lower(), user_id)
+        position: Final[int] = bisect_left(self._sorted, key)
+        if position < len(self._sorted) and self._sorted[position] == key:
+            del self._sorted[position]
+        self._removed(user_id, key[0])
+
+    def _added(self, user_id: str, key: str) -> None:
+        pass
+
+    def _removed(self, user_id: str, key: str) -> None:
+        pass
+
+    def prefixed(self, prefix: str) -> Iterator[str]:
+        """Ids of the users whose name starts with `prefix`, by name."""
+        key: Final[str] = prefix.lower()
+        position: int = bisect_left(self._sorted, (key, ""))
+        while position < len(self._sorted) and self._sorted[position][0].startswith(key):
+            yield self._sorted[position][1]
+            position += 1
+
+
+class UserDirectory(NameIndex):
+    """
+    Users sorted by name, for paging through /users.
+
+    A page is a bisect to the cursor (or to the name prefix) followed by a
+    short forward walk. The cursor is the last entry returned, which stays
+    valid while users are added or removed between two page requests.
+    """
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock: Final[Lock] = Lock()
+
+    def load(self, users: Iterable[Tuple[str, str]]) -> None:
+        with self._lock:
+            super().load(users)
+
+    def put(self, user_id: str, name: str) -> None:
+        with self._lock:
+            super().put(user_id, name)
+
+    def put_many(self, users: List[Tuple[str, str]]) -> None:
+        with self._lock:
+            super().put_many(users)
+
+    def remove(self, user_id: str) -> None:
+        with self._lock:
+            super().remove(user_id)
+
+    @staticmethod
+    def encode_cursor(entry: Tuple[str, str]) -> str:
+        return urlsafe_b64encode(json_dumps(entry, ensure_ascii=False).encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[str, str]:
+        try:
+            key, user_id = json_loads(urlsafe_b64decode(cursor.encode('ascii')))
+        except (ValueError, TypeError, UnicodeError):
+            raise ValueError("Invalid cursor")
+        return (str(key), str(user_id))
+
+    def page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        prefix: str = "",
+        accept: Optional[Callable[[str], bool]] = None,
+        max_scan: int = 5000
+    ) -> Tuple[List[Tuple[str, str]], Optional[str]]:
+        """
+        Up to `limit` (user id, name) pairs after `cursor` whose name starts with
+        `prefix` and that pass `accept`, plus the cursor of the next page.
+
+        At most `max_scan` entries are examined, so a selective `accept` can
+        return a short (even empty) page that still has a next cursor.
+        """
+        key: Final[str] = prefix.lower()
+        with self._lock:
+            if cursor is not None:
+                position: int = bisect_right(self._sorted, UserDirectory.decode_cursor(cursor))
+            else:
+                position = bisect_left(self._sorted, (key, ""))
+
+            result: Final[List[Tuple[str, str]]] = []
+            scanned: int = 0
+            last: Optional[Tuple[str, str]] = None
+            while position < len(self._sorted) and len(result) < limit and scanned < max_scan:
+                entry: Tuple[str, str] = self._sorted[position]
+                if not entry[0].startswith(key):
+                    return result, None
+                if accept is None or accept(entry[1]):
+                    result.append((entry[1], self.names[entry[1]]))
+                last = entry
+                scanned += 1
+                position += 1
+
+            more: Final[bool] = position < len(self._sorted) and self._sorted[position][0].startswith(key)
+            return result, (UserDirectory.encode_cursor(last) if more and last is not None else None)
+
+
+class UserIndex(NameIndex):
+    """
+    Name index for the admin search box.
+
+    Besides the sorted names used for prefix lookups, every 3-character slice
+    of a name maps to the ids containing it, so a substring query only checks
+    the users that share all of its trigrams.
+    """
+    def __init__(self) -> None:
+        super().__init__()
+        self._trigrams: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def _grams(name: str) -> Set[str]:
+        return {name[i:i + 3] for i in range(len(name) - 2)}
+
+    def load(self, users: Iterable[Tuple[str, str]]) -> None:
+        self._trigrams = {}
+        super().load(users)
+
+    def _added(self, user_id: str, key: str) -> None:
+        for gram in UserIndex._grams(key):
+            self._trigrams.setdefault(gram, set()).add(user_id)
+
+    def _removed(self, user_id: str, key: str) -> None:
+        for gram in UserIndex._grams(key):
+            ids: Optional[Set[str]] = self._trigrams.get(gram)
+            if ids is not None:
+                ids.discard(user_id)
+                if not ids:
+                    del self._trigrams[gram]
+
+    def matches(self, user_id: str, query: str) -> bool:
+        return query.lower() in self.names.get(user_id, "").lower()
+
+    def search(self, query: str) -> List[str]:
+        """Prefix matches first, then the remaining substring matches, each by name."""
+        key: Final[str] = query.lower()
+        prefixed: Final[List[str]] = list(self.prefixed(key))
+        if len(key) < 3:
+            return prefixed
+
+        candidates: Optional[Set[str]] = None
+        for gram in sorted(UserIndex._grams(key), key=lambda gram: len(self._trigrams.get(gram, ()))):
+            candidates = set(self._trigrams.get(gram, ())) if candidates is None else candidates & self._trigrams.get(gram, set())
+            if not candidates:
+                return prefixed
+
+        seen: Final[Set[str]] = set(prefixed)
+        inner: Final[List[str]] = sorted(
+            (user_id for user_id in candidates or () if user_id not in seen and key in self.names[user_id].lower()),
+            key=lambda user_id: self.names[user_id].lower()
+        )
+        return prefixed + inner
@@ -0,0 +1,245 @@
+from array import array
+from threading import Lock
+from typing import Final, Optional, List, Dict, Tuple, TypedDict, Iterator
+
+
+# ========== Constants =========
+OFFLINE: Final[int] = 0
+MAX_BUCKETS: Final[int] = 10000
+
+
+# ========== TypedDicts =========
+class HistoryEntry(TypedDict):
+    time: float
+    active_window: Optional[str]
+
+
+# ========== Classes =========
+class TitleDictionary:
+    """
+    Shared, reference-counted title <-> id table.
+
+    Id 0 is reserved for "offline". Ids whose last reference was evicted are
+    recycled, so the table only holds titles that some history still uses.
+    """
+    def __init__(self) -> None:
+        self._ids: Dict[str, int] = {}
+        self._titles: List[Optional[str]] = [None]
+        self._refs: array = array('I', [0])
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def intern(self, title: Optional[str]) -> int:
+        if title is None:
+            return OFFLINE
+
+        title_id: Optional[int] = self._ids.get(title)
+        if title_id is None:
+            if self._free:
+                title_id = self._free.pop()
+                self._titles[title_id] = title
+            else:
+                title_id = len(self._titles)
+                self._titles.append(title)
+                self._refs.append(0)
+            self._ids[title] = title_id
+
+        self._refs[title_id] += 1
+        return title_id
+
+    def release(self, title_id: int) -> None:
+        if title_id == OFFLINE:
+            return
+        self._refs[title_id] -= 1
+        if self._refs[title_id] == 0:
+            title: Final[Optional[str]] = self._titles[title_id]
+            if title is not None:
+                del self._ids[title]
+            self._titles[title_id] = None
+            self._free.append(title_id)
+
+    def lookup(self, title_id: int) -> Optional[str]:
+        return self._titles[title_id]
+
+
+class UserHistory:
+    """
+    Ring of at most `capacity` (timestamp, title id) pairs in time order.
+
+    The arrays grow with the entries and only wrap around once they are full,
+    so a user with few changes costs a few bytes, not a whole ring.
+    """
+    __slots__ = ("capacity", "times", "titles", "start", "size")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity: int = capacity
+        self.times: array = array('d')
+        self.titles: array = array('I')
+        self.start: int = 0
+        self.size: int = 0
+
+    def time_at(self, index: int) -> float:
+        return self.times[(self.start + index) % self.capacity]
+
+    def title_at(self, index: int) -> int:
+        return self.titles[(self.start + index) % self.capacity]
+
+    def last_title(self) -> Optional[int]:
+        return self.title_at(self.size - 1) if self.size else None
+
+    def last_time(self) -> Optional[float]:
+        return self.time_at(self.size - 1) if self.size else None
+
+    def append(self, timestamp: float, title_id: int) -> Optional[int]:
+        evicted: Optional[int] = None
+        if len(self.times) < self.capacity:
+            self.times.append(timestamp)
+            self.titles.append(title_id)
+            self.size += 1
+            return evicted
+
+        if self.size == self.capacity:
+            evicted = self.titles[self.start]
+            self.start = (self.start + 1) % self.capacity
+            self.size -= 1
+
+        slot: Final[int] = (self.start + self.size) % self.capacity
+        self.times[slot] = timestamp
+        self.titles[slot] = title_id
+        self.size += 1
+        return evicted
+
+    def clear(self) -> Iterator[int]:
+        for index in range(self.size):
+            yield self.title_at(index)
+        self.start = 0
+        self.size = 0
+        self.times = array('d')
+        self.titles = array('I')
+
+    def bisect(self, timestamp: float) -> int:
+        """Index of the first entry whose time is > timestamp."""
+        low: int = 0
+        high: int = self.size
+        while low < high:
+            middle: int = (low + high) // 2
+            if self.time_at(middle) <= timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+
+class ActivityHistory:
+    """
+    Per-user history of window changes.
+
+    Only changes are stored (consecutive uploads of the same title collapse
+    into one entry), as a timestamp array plus a title-id array per user, so
+    a user costs at most 12 bytes per entry times `capacity` no matter how
+    often the client uploads. The oldest entries are evicted first.
+    """
+    def __init__(self, capacity: int) -> None:
+        self.capacity: int = capacity
+        self.titles: Final[TitleDictionary] = TitleDictionary()
+        self._users: Dict[str, UserHistory] = {}
+        self._lock: Final[Lock] = Lock()
+
+    def record(self, user_id: str, timestamp: float, title: Optional[str]) -> None:
+        with self._lock:
+            history: Optional[UserHistory] = self._users.get(user_id)
+            if history is None:
+                history = UserHistory(self.capacity)
+                self._users[user_id] = history
+
+            last_time: Final[Optional[float]] = history.last_time()
+            if last_time is not None and timestamp < last_time:
+                # Late sample: the timeline only grows forward
+                return
+
+            last_title: Final[Optional[int]] = history.last_title()
+            if last_title is not None and self.titles.lookup(last_title) == title:
+                return
+
+            evicted: Final[Optional[int]] = history.append(timestamp, self.titles.intern(title))
+            if evicted is not None:
+                self.titles.release(evicted)
+
+    def remove(self, user_id: str) -> None:
+        with self._lock:
+            history: Final[Optional[UserHistory]] = self._users.pop(user_id, None)
+            if history is not None:
+                for title_id in history.clear():
+                    self.titles.release(title_id)
+
+    def _segments(self, history: UserHistory, since: float, until: float) -> List[Tuple[float, float, int]]:
+        # The entry in effect at `since` starts before it, hence the -1
+        first: Final[int] = max(history.bisect(since) - 1, 0)
+        last: Final[int] = history.bisect(until)
+        segments: Final[List[Tuple[float, float, int]]] = []
+        for index in range(first, last):
+            begin: float = max(history.time_at(index), since)
+            end: float = history.time_at(index + 1) if index + 1 < history.size else until
+            segments.append((begin, min(end, until), history.title_at(index)))
+        return segments
+
+    def query(self, user_id: str, since: float, until: float) -> List[HistoryEntry]:
+        with self._lock:
+            history: Final[Optional[UserHistory]] = self._users.get(user_id)
+            if history is None:
+                return []
+            return [
+                {"time": begin, "active_window": self.titles.lookup(title_id)}
+                for begin, _, title_id in self._segments(history, since, until)
+            ]
+
+    def oldest(self, user_id: str) -> Optional[float]:
+        """Time of the oldest change still held for `user_id`."""
+        with self._lock:
+            history: Final[Optional[UserHistory]] = self._users.get(user_id)
+            return history.time_at(0) if history is not None and history.size else None
+
+    def downsample(self, user_id: str, since: float, until: float, bucket: float) -> List[HistoryEntry]:
+        """One entry per bucket: the title that was active for longest in it."""
+        check_buckets(since, until, bucket)
+        return downsample(self.query(user_id, since, until), since, until, bucket)
+
+
+# ========== Functions =========
+def check_buckets(since: float, until: float, bucket: float) -> None:
+    if (until - since) / bucket > MAX_BUCKETS:
+        raise ValueError(f"More than {MAX_BUCKETS} buckets requested")
+
+
+def downsample(entries: List[HistoryEntry], since: float, until: float, bucket: float) -> List[HistoryEntry]:
+    """
+    Bucket a time-ordered change list, as returned by `ActivityHistory.query`:
+    each entry lasts until the next one, the last until `until`.
+    """
+    check_buckets(since, until, bucket)
+    result: Final[List[HistoryEntry]] = []
+    durations: Final[Dict[Optional[str], float]] = {}
+    bucket_start: float = since
+    cursor: int = 0
+    while bucket_start < until:
+        bucket_end: float = min(bucket_start + bucket, until)
+        durations.clear()
+        while cursor < len(entries) and entries[cursor]["time"] < bucket_end:
+            begin: float = entries[cursor]["time"]
+            end: float = entries[cursor + 1]["time"] if cursor + 1 < len(entries) else until
+            overlap: float = min(end, bucket_end) - max(begin, bucket_start)
+            if overlap > 0:
+                title: Optional[str] = entries[cursor]["active_window"]
+                durations[title] = durations.get(title, 0.0) + overlap
+            if end > bucket_end:
+                break
+            cursor += 1
+
+        if durations:
+            best: Optional[str] = max(durations, key=durations.__getitem__)
+            result.append({"time": bucket_start, "active_window": best})
+        bucket_start = bucket_end
+
+    return result
@@ -0,0 +1,98 @@
+from json import dumps as json_dumps
+from queue import Queue, Full, Empty
+from threading import Lock
+from typing import Final, Optional, Dict, Set, Iterable
+
+
+# ========== Classes =========
+class Subscription:
+    __slots__ = ("user_ids", "queue")
+
+    def __init__(self, user_ids: Optional[Set[str]], max_queue: int) -> None:
+        self.user_ids: Optional[Set[str]] = user_ids
+        self.queue: Queue = Queue(max_queue)
+
+
+class PresenceHub:
+    """
+    Fan-out of presence events to stream subscribers.
+
+    An event is serialized once into a ready-to-send SSE frame and the same
+    bytes object is queued for every interested subscriber. Subscribers are
+    indexed by user id, so publishing only touches the ones that asked for
+    that user (plus those watching everybody). A subscriber whose queue is
+    full is too slow to keep up and gets disconnected with a `None` marker.
+    """
+    def __init__(self, max_queue: int = 256) -> None:
+        self.max_queue: int = max_queue
+        self._by_user: Dict[str, Set[Subscription]] = {}
+        self._everyone: Set[Subscription] = set()
+        self._count: int = 0
+        self._lock: Final[Lock] = Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @staticmethod
+    def encode(event: str, data: dict) -> bytes:
+        return f"event: {event}\ndata: {json_dumps(data, ensure_ascii=False)}\n\n".encode('utf-8')
+
+    def subscribe(self, user_ids: Optional[Iterable[str]] = None) -> Subscription:
+        subscription: Final[Subscription] = Subscription(
+            set(user_ids) if user_ids is not None else None, self.max_queue
+        )
+        with self._lock:
+            if subscription.user_ids is None:
+                self._everyone.add(subscription)
+            else:
+                for user_id in subscription.user_ids:
+                    self._by_user.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription.user_ids is None:
+                if subscription not in self._everyone:
+                    return
+                self._everyone.discard(subscription)
+            else:
+                found: bool = False
+                for user_id in subscription.user_ids:
+                    subscribers: Optional[Set[Subscription]] = self._by_user.get(user_id)
+                    if subscribers is None or subscription not in subscribers:
+                        continue
+                    found = True
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._by_user[user_id]
+                if not found:
+                    return
+            self._count -= 1
+
+    def publish(self, user_id: str, event: str, data: dict) -> None:
+        with self._lock:
+            targets: Final[Set[Subscription]] = self._everyone | self._by_user.get(user_id, set())
+        if not targets:
+            return
+
+        frame: Final[bytes] = PresenceHub.encode(event, data)
+        for subscription in targets:
+            try:
+                subscription.queue.put_nowait(frame)
+            except Full:
+                self.unsubscribe(subscription)
+                self._close(subscription)
+
+    @staticmethod
+    def _close(subscription: Subscription) -> None:
+        # Make room for the end-of-stream marker so the reader wakes up and exits.
+        while True:
+            try:
+                subscription.queue.put_nowait(None)
+                return
+            except Full:
+                try:
+                    subscription.queue.get_nowait()
+                except Empty:
+                    pass
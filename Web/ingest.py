@@ -0,0 +1,166 @@
+import asyncio
+import socket
+from json import dumps as json_dumps, loads as json_loads
+from threading import Thread
+from time import time, monotonic
+from typing import Final, Optional, Callable, Any
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+
+# ========== Constants =========
+NOT_LOGGED_IN: Final[str] = "User not logged in"
+THROTTLED: Final[str] = "Too many requests"
+MAX_FRAME: Final[int] = 64 * 1024
+# Seconds a connection trusts its session before looking the token up again
+REAUTH_INTERVAL: Final[float] = 30
+
+
+# ========== Classes =========
+class Connection:
+    """What one WebSocket connection knows about its session."""
+    __slots__ = ("user_id", "token", "checked")
+
+    def __init__(self) -> None:
+        self.user_id: Optional[str] = None
+        self.token: Optional[str] = None
+        self.checked: float = 0.0
+
+    def reset(self) -> None:
+        self.user_id = None
+        self.token = None
+
+
+class IngestServer:
+    """
+    Optional WebSocket ingest channel (needs the `websockets` package).
+
+    A client authenticates once with its session token, then sends small JSON
+    frames: {"type": "upload", "active_window": ...} for a window change and
+    {"type": "heartbeat"} otherwise. Every frame is answered with the same
+    result object the HTTP endpoints return. All connections live on a
+    single asyncio loop in a background thread, so an idle client costs a
+    socket and a coroutine instead of a thread or a request per sample. The
+    frames themselves are handled on the loop's thread pool, since they take
+    locks and may write to the shared SQLite store; a slow one only holds up
+    its own connection. The session is looked up again at most every
+    REAUTH_INTERVAL seconds, which keeps it alive and notices revocation.
+
+    The server is wired to the presence table by callables, so it updates
+    exactly the same state as /upload and /upload/heartbeat:
+    `authenticate(token)` returns the user id or None, `ingest(user_id,
+    time, window)` records a sample and `touch(user_id, time)` is a heartbeat
+    returning False when the server needs a full upload. The optional
+    `admit(token)` applies the same admission control as HTTP (0 admits, else
+    the seconds to wait, sent back as `retry_after`) and `suggest()` supplies
+    the `next_interval` added to successful results.
+    """
+    def __init__(
+        self,
+        authenticate: Callable[[str], Optional[str]],
+        ingest: Callable[[str, float, str], None],
+        touch: Callable[[str, float], bool],
+        admit: Optional[Callable[[str], float]] = None,
+        suggest: Optional[Callable[[], float]] = None,
+        clock: Callable[[], float] = monotonic
+    ) -> None:
+        self.authenticate: Callable[[str], Optional[str]] = authenticate
+        self.ingest: Callable[[str, float, str], None] = ingest
+        self.touch: Callable[[str, float], bool] = touch
+        self.admit: Optional[Callable[[str], float]] = admit
+        self.suggest: Optional[Callable[[], float]] = suggest
+        self.clock: Callable[[], float] = clock
+        self.connections: int = 0
+        self.running: bool = False
+        self._thread: Optional[Thread] = None
+
+    @staticmethod
+    def available() -> bool:
+        return websockets is not None
+
+    def start(self, host: str, port: int, sock: Optional[socket.socket] = None) -> None:
+        """Serve on `sock` if given (shared by serve.py workers), else bind host:port."""
+        self._thread = Thread(target=lambda: asyncio.run(self._serve(host, port, sock)), name="ws-ingest", daemon=True)
+        self._thread.start()
+
+    async def _serve(self, host: str, port: int, sock: Optional[socket.socket]) -> None:
+        assert websockets is not None
+        if sock is not None:
+            server: Any = await websockets.serve(self._handle, sock=sock, max_size=MAX_FRAME)
+        else:
+            server = await websockets.serve(self._handle, host, port, max_size=MAX_FRAME)
+        self.running = True
+        async with server:
+            await asyncio.Future()
+
+    def _handle_frame(self, connection: Connection, frame: dict) -> dict:
+        kind: Final[Any] = frame.get("type")
+
+        if kind == "auth":
+            token: Final[str] = str(frame.get("token") or "")
+            connection.user_id = self.authenticate(token)
+            if connection.user_id is None:
+                connection.reset()
+                return {"status": "error", "message": NOT_LOGGED_IN}
+            connection.token = token
+            connection.checked = self.clock()
+            return {"status": "success", "message": "Authenticated"}
+
+        if connection.token is None or connection.user_id is None:
+            return {"status": "error", "message": NOT_LOGGED_IN}
+
+        if self.admit is not None:
+            wait: Final[float] = self.admit(connection.token)
+            if wait:
+                return {"status": "error", "message": THROTTLED, "retry_after": wait}
+
+        # The session may have expired or been revoked since it was last checked
+        now: Final[float] = self.clock()
+        if now - connection.checked >= REAUTH_INTERVAL:
+            if self.authenticate(connection.token) != connection.user_id:
+                connection.reset()
+                return {"status": "error", "message": NOT_LOGGED_IN}
+            connection.checked = now
+
+        if kind == "upload" and isinstance(frame.get("active_window"), str):
+            self.ingest(connection.user_id, time(), frame["active_window"])
+            result: dict = {"status": "success", "message": "Upload successful"}
+        elif kind == "heartbeat":
+            result = (
+                {"status": "success", "message": "Heartbeat received"} if self.touch(connection.user_id, time())
+                else {"status": "success", "message": "Full upload required", "resync": True}
+            )
+        else:
+            return {"status": "error", "message": "Invalid data"}
+
+        if self.suggest is not None:
+            result["next_interval"] = self.suggest()
+        return result
+
+    async def _handle(self, socket_connection: Any) -> None:
+        connection: Final[Connection] = Connection()
+        self.connections += 1
+        try:
+            async for message in socket_connection:
+                try:
+                    frame: Any = json_loads(message)
+                except ValueError:
+                    frame = None
+                if not isinstance(frame, dict):
+                    await socket_connection.send(json_dumps({"status": "error", "message": "Invalid data"}))
+                    continue
+
+                # One frame at a time per connection, so `connection` needs no lock
+                result: dict = await asyncio.to_thread(self._handle_frame, connection, frame)
+                if "seq" in frame:
+                    result["seq"] = frame["seq"]
+                await socket_connection.send(json_dumps(result, ensure_ascii=False))
+                if result.get("message") == NOT_LOGGED_IN:
+                    break
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.connections -= 1
@@ -0,0 +1,66 @@
+import os
+import sys
+import logging
+from typing import Final, Any
+
+
+# ========== Constants =========
+# debug / info / warning / error, or "off" to silence the server entirely
+LOG_LEVEL: Final[str] = os.environ.get("SEEME_LOG_LEVEL", "info").lower()
+
+
+# ========== Classes =========
+class KeyValueFormatter(logging.Formatter):
+    """`[level] [Tag] message key=value ...`, keeping the old print() layout."""
+    def format(self, record: logging.LogRecord) -> str:
+        fields: Final[dict] = getattr(record, "fields", {})
+        line: str = f"[{record.levelname.lower()}] [{record.name.split('.')[-1]}] {record.getMessage()}"
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class Logger:
+    """Thin wrapper so call sites pass structured fields as keyword arguments."""
+    def __init__(self, logger: logging.Logger) -> None:
+        self._logger: Final[logging.Logger] = logger
+
+    def _log(self, level: int, message: str, fields: dict, exc_info: bool = False) -> None:
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, message, extra={"fields": fields}, exc_info=exc_info)
+
+    def debug(self, message: str, **fields: Any) -> None:
+        self._log(logging.DEBUG, message, fields)
+
+    def info(self, message: str, **fields: Any) -> None:
+        self._log(logging.INFO, message, fields)
+
+    def warning(self, message: str, **fields: Any) -> None:
+        self._log(logging.WARNING, message, fields)
+
+    def error(self, message: str, exc_info: bool = False, **fields: Any) -> None:
+        self._log(logging.ERROR, message, fields, exc_info)
+
+
+# ========== Functions =========
+def _configure(name: str, level: str) -> logging.Logger:
+    root: Final[logging.Logger] = logging.getLogger(name)
+    root.propagate = False
+    if level == "off":
+        root.disabled = True
+        return root
+
+    handler: Final[logging.Handler] = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(KeyValueFormatter())
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+    return root
+
+
+_root: Final[logging.Logger] = _configure("seeme", LOG_LEVEL)
+
+
+def get_logger(tag: str) -> Logger:
+    return Logger(_root.getChild(tag))
@@ -0,0 +1,173 @@
+from bisect import bisect_left
+from threading import Lock, current_thread, local, Thread
+from typing import Final, Optional, List, Dict, Tuple, Callable, Sequence
+
+
+# ========== Constants =========
+LATENCY_BUCKETS: Final[Tuple[float, ...]] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+Labels = Tuple[str, ...]
+
+
+# ========== Classes =========
+class _Cells:
+    """
+    Per-thread storage behind a metric.
+
+    Each thread only ever writes its own dict of label values -> [values], so
+    recording takes no lock. Registering a thread is a single dict store.
+    Threads that have exited are folded into `retired` when the metric is
+    read, or when enough of them pile up (werkzeug runs a thread per request).
+    """
+    def __init__(self, width: int) -> None:
+        self.width: int = width
+        self._local: Final[local] = local()
+        self._cells: Dict[int, Tuple[Thread, Dict[Labels, List[float]]]] = {}
+        self._retired: Dict[Labels, List[float]] = {}
+        self._fold_lock: Final[Lock] = Lock()
+        self._fold_at: int = 256
+
+    def cell(self, labels: Labels) -> List[float]:
+        cells: Optional[Dict[Labels, List[float]]] = getattr(self._local, "cells", None)
+        if cells is None:
+            cells = {}
+            self._local.cells = cells
+            self._cells[id(cells)] = (current_thread(), cells)
+            if len(self._cells) > self._fold_at:
+                self._fold()
+        values: Optional[List[float]] = cells.get(labels)
+        if values is None:
+            values = [0.0] * self.width
+            cells[labels] = values
+        return values
+
+    def _fold(self) -> None:
+        with self._fold_lock:
+            for key, (thread, cells) in list(self._cells.items()):
+                if thread.is_alive():
+                    continue
+                del self._cells[key]
+                for labels, values in cells.items():
+                    total: List[float] = self._retired.setdefault(labels, [0.0] * self.width)
+                    for index, value in enumerate(values):
+                        total[index] += value
+            self._fold_at = max(256, 2 * len(self._cells))
+
+    def collect(self) -> Dict[Labels, List[float]]:
+        self._fold()
+        with self._fold_lock:
+            result: Final[Dict[Labels, List[float]]] = {labels: list(values) for labels, values in self._retired.items()}
+            live: Final[List[Dict[Labels, List[float]]]] = [cells for _, cells in self._cells.values()]
+        for cells in live:
+            for labels, values in list(cells.items()):
+                total: List[float] = result.setdefault(labels, [0.0] * self.width)
+                for index, value in enumerate(list(values)):
+                    total[index] += value
+        return result
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        self.name: str = name
+        self.help: str = help
+        self.labels: Tuple[str, ...] = tuple(labels)
+        self._cells: Final[_Cells] = _Cells(1)
+
+    def inc(self, amount: float = 1.0, labels: Labels = ()) -> None:
+        self._cells.cell(labels)[0] += amount
+
+    def render(self) -> List[str]:
+        lines: Final[List[str]] = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, values in sorted(self._cells.collect().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {_format_value(values[0])}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram; each cell is [bucket counts..., +Inf count, sum]."""
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.name: str = name
+        self.help: str = help
+        self.labels: Tuple[str, ...] = tuple(labels)
+        self.buckets: Tuple[float, ...] = tuple(buckets)
+        self._cells: Final[_Cells] = _Cells(len(self.buckets) + 2)
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        cell: Final[List[float]] = self._cells.cell(labels)
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def render(self) -> List[str]:
+        lines: Final[List[str]] = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, values in sorted(self._cells.collect().items()):
+            cumulative: float = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                le: str = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels + ('le',), labels + (le,))} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(values[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {_format_value(cumulative)}")
+        return lines
+
+
+class Gauge:
+    """Read at scrape time from a callback returning {label values: value}."""
+    def __init__(self, name: str, help: str, read: Callable[[], Dict[Labels, float]], labels: Sequence[str] = ()) -> None:
+        self.name: str = name
+        self.help: str = help
+        self.labels: Tuple[str, ...] = tuple(labels)
+        self.read: Callable[[], Dict[Labels, float]] = read
+
+    def render(self) -> List[str]:
+        lines: Final[List[str]] = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, value in sorted(self.read().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[object] = []
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        metric: Final[Counter] = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric: Final[Histogram] = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]) -> Gauge:
+        metric: Final[Gauge] = Gauge(name, help, lambda: {(): read()})
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: Final[List[str]] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())  # type: ignore[attr-defined]
+        return "\n".join(lines) + "\n"
+
+
+# ========== Helpers =========
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Labels) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Process-wide registry shared by api.py and server.py
+registry: Final[Registry] = Registry()
@@ -0,0 +1,100 @@
+from contextlib import contextmanager, ExitStack
+from threading import Lock
+from typing import Final, Optional, List, Dict, Iterator, TypedDict
+
+
+# ========== TypedDicts =========
+class PresenceEvent(TypedDict):
+    user_id: str
+    active_window: str
+    update_time: float
+    online: bool
+
+
+# ========== Classes =========
+class PresenceRecord:
+    """One user's presence, updated in place."""
+    __slots__ = ("user_id", "active_window", "update_time", "online")
+
+    def __init__(self, user_id: str, active_window: str, update_time: float) -> None:
+        self.user_id: str = user_id
+        self.active_window: str = active_window
+        self.update_time: float = update_time
+        self.online: bool = False
+
+    def event(self) -> PresenceEvent:
+        return {
+            "user_id": self.user_id,
+            "active_window": self.active_window,
+            "update_time": self.update_time,
+            "online": self.online
+        }
+
+
+class PresenceTable:
+    """
+    Presence records indexed by user id, guarded by striped locks.
+
+    A user id always maps to the same stripe, so updates to different users
+    rarely contend and a lookup is a dict access whatever the fleet size.
+    Callers mutate a record only inside `locked(user_id)` and report each
+    change with `changed(user_id)`; `version` is the sum of the per-stripe
+    change counters, so it only grows and differs whenever anything changed.
+    `frozen()` takes every stripe (always in the same order) for reads that
+    must see one consistent state.
+    """
+    def __init__(self, stripes: int = 64) -> None:
+        self._records: Dict[str, PresenceRecord] = {}
+        self._locks: Final[List[Lock]] = [Lock() for _ in range(stripes)]
+        self._versions: Final[List[int]] = [0] * stripes
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._records
+
+    def _stripe(self, user_id: str) -> int:
+        return hash(user_id) % len(self._locks)
+
+    @property
+    def version(self) -> int:
+        return sum(self._versions)
+
+    def changed(self, user_id: str) -> None:
+        """Record a change; the caller holds the user's stripe lock."""
+        self._versions[self._stripe(user_id)] += 1
+
+    @contextmanager
+    def locked(self, user_id: str) -> Iterator[Optional[PresenceRecord]]:
+        with self._locks[self._stripe(user_id)]:
+            yield self._records.get(user_id)
+
+    def get(self, user_id: str) -> Optional[PresenceRecord]:
+        """Unlocked read; fields may be mid-update. Use `locked` to act on them."""
+        return self._records.get(user_id)
+
+    def add(self, user_id: str, active_window: str, update_time: float) -> None:
+        with self._locks[self._stripe(user_id)]:
+            if user_id not in self._records:
+                self._records[user_id] = PresenceRecord(user_id, active_window, update_time)
+                self.changed(user_id)
+
+    def remove(self, user_id: str) -> None:
+        with self._locks[self._stripe(user_id)]:
+            if self._records.pop(user_id, None) is not None:
+                self.changed(user_id)
+
+    @contextmanager
+    def frozen(self) -> Iterator[List[PresenceRecord]]:
+        with ExitStack() as stack:
+            for lock in self._locks:
+                stack.enter_context(lock)
+            yield list(self._records.values())
+
+    def snapshot(self) -> List[PresenceEvent]:
+        with self.frozen() as records:
+            return [record.event() for record in records]
+
+    def count_online(self) -> int:
+        return sum(1 for record in list(self._records.values()) if record.online)
@@ -5,7 +5,8 @@ interface UserData {
 };
 
 interface UserListData {
-    data: Array<UserData>
+    data: Array<UserData>,
+    next_cursor: string | null
 };
 
 interface UserActiveWindow {
@@ -15,17 +16,44 @@ interface UserActiveWindow {
     }
 };
 
+interface PresenceEvent {
+    user_id: string,
+    active_window: string,
+    update_time: number,
+    online: boolean
+};
+
 // DOM Eletments
 const users_list: HTMLDivElement = document.getElementsByClassName("usersList")[0] as HTMLDivElement;
 const target_user: HTMLParagraphElement = document.getElementById("target-user") as HTMLParagraphElement;
 const status_p: HTMLParagraphElement = document.getElementById("status-p") as HTMLParagraphElement;
 const activeWindow_p: HTMLParagraphElement = document.getElementById("activeWindow-p") as HTMLParagraphElement;
 const update_p: HTMLParagraphElement = document.getElementById("update-time") as HTMLParagraphElement;
+const search_input: HTMLInputElement = document.getElementById("user-search") as HTMLInputElement;
+
+// ========== Constants =========
+const PAGE_SIZE: number = 100;
+/** 距离列表底部多少像素时加载下一页 */
+const LOAD_AHEAD: number = 200;
+const SEARCH_DELAY: number = 250;
+/** 推送流连续出错多少次后改用轮询（EventSource 本身会自动重连） */
+const STREAM_MAX_FAILURES: number = 3;
+/** 改用轮询后，隔多久重新尝试推送流 */
+const STREAM_RETRY_DELAY: number = 60000;
 
 // ========== Global Variables =========
-let userList: Array<UserData> = [];
+let next_cursor: string | null = null;
+let search_prefix: string = "";
+let loading: boolean = false;
+/** 每次重新搜索时递增，丢弃过期请求的结果 */
+let list_generation: number = 0;
+let search_timer: number | undefined = undefined;
 let target_user_id: string | undefined = undefined;
 let target_user_name: string | undefined = undefined;
+let presence_stream: EventSource | undefined = undefined;
+let poll_timer: number | undefined = undefined;
+let stream_failures: number = 0;
+let stream_retry_timer: number | undefined = undefined;
 
 // ========== Functions =========
 /** 时间戳转日期 */
@@ -41,6 +69,19 @@ function timestampToDate(timestamp: number): string {
     return `${year}-${month}-${day} ${hours}:${minutes}:${seconds}`;
 }
 
+function render_presence(active_window: string, update_time: number, online: boolean): void {
+    target_user.textContent = `Target User: ${target_user_name}`;
+    activeWindow_p.textContent = `Active Window: ${active_window}`;
+    update_p.textContent = `Update Time: ${timestampToDate(update_time * 1000)}`;
+    if (online) {
+        status_p.textContent = "status: online";
+        status_p.className = "online";
+    } else {
+        status_p.textContent = "status: disconnect";
+        status_p.className = "disconnect";
+    }
+}
+
 async function render_target(): Promise<void> {
     if (target_user_id === undefined || target_user_name === undefined) {
         return
@@ -57,25 +98,70 @@ async function render_target(): Promise<void> {
     if (response.ok) {
         const data: UserActiveWindow = await response.json();
         const unix: number = data.data.update_time;
-        const date_format = timestampToDate(unix * 1000);
         const online: boolean = Date.now() / 1000 - unix <= 30;
-
-        target_user.textContent = `Target User: ${target_user_name}`;
-        activeWindow_p.textContent = `Active Window: ${data.data.active_window}`;
-        update_p.textContent = `Update Time: ${date_format}`;
-        if (online) {
-            status_p.textContent = "status: online";
-            status_p.className = "online";
-        } else {
-            status_p.textContent = "status: disconnect";
-            status_p.className = "disconnect";
-        }
-
+        render_presence(data.data.active_window, unix, online);
     } else {
         console.error("Failed to fetch user list");
     }
 }
 
+function stop_watching(): void {
+    if (presence_stream !== undefined) {
+        presence_stream.close();
+        presence_stream = undefined;
+    }
+    if (poll_timer !== undefined) {
+        clearInterval(poll_timer);
+        poll_timer = undefined;
+    }
+    if (stream_retry_timer !== undefined) {
+        clearTimeout(stream_retry_timer);
+        stream_retry_timer = undefined;
+    }
+}
+
+function start_polling(): void {
+    stop_watching();
+    render_target();
+    poll_timer = setInterval(render_target, 2000);
+}
+
+/** 订阅目标用户的推送流；推送流关闭或反复出错时先轮询，稍后再重试推送流 */
+function watch_target(): void {
+    stop_watching();
+    stream_failures = 0;
+    if (target_user_id === undefined) {
+        return;
+    }
+    if (typeof EventSource === "undefined") {
+        start_polling();
+        return;
+    }
+
+    const source: EventSource = new EventSource(`/users/stream?user_id=${encodeURIComponent(target_user_id)}`);
+    source.addEventListener("presence", (event: MessageEvent<string>) => {
+        const data: PresenceEvent = JSON.parse(event.data);
+        if (data.user_id !== target_user_id) {
+            return;
+        }
+        render_presence(data.active_window, data.update_time, data.online);
+    });
+    source.onopen = () => {
+        stream_failures = 0;
+    };
+    source.onerror = () => {
+        stream_failures += 1;
+        // CONNECTING: the browser is already reconnecting on its own
+        if (source.readyState !== EventSource.CLOSED && stream_failures < STREAM_MAX_FAILURES) {
+            return;
+        }
+        console.error("Presence stream failed, polling until it is retried");
+        start_polling();
+        stream_retry_timer = setTimeout(watch_target, STREAM_RETRY_DELAY);
+    };
+    presence_stream = source;
+}
+
 function creatUserCard(text: string, id: string): HTMLDivElement {
     const card: HTMLDivElement = document.createElement("div");
     const card_text: HTMLParagraphElement = document.createElement("p");
@@ -86,7 +172,7 @@ function creatUserCard(text: string, id: string): HTMLDivElement {
     card.addEventListener("click", async function(): Promise<void> {
         target_user_id = id;
         target_user_name = text;
-        render_target();
+        watch_target();
     })
 
     card.appendChild(card_text);
@@ -94,34 +180,87 @@ function creatUserCard(text: string, id: string): HTMLDivElement {
     return card;
 }
 
-function updateUserListDisplay(): void {
-    console.log(userList);
-
-    userList.forEach((user: UserData) => {
-        const card: HTMLDivElement = creatUserCard(user.user_name, user.user_id);
-        users_list.appendChild(card);
-    })
+function appendUserCards(page: Array<UserData>): void {
+    const fragment: DocumentFragment = document.createDocumentFragment();
+    page.forEach((user: UserData) => {
+        fragment.appendChild(creatUserCard(user.user_name, user.user_id));
+    });
+    users_list.appendChild(fragment);
 }
 
-async function get_user_list(): Promise<void> {
-    const response = await fetch("/users");
-    if (response.ok) {
+/** 按游标加载下一页用户 */
+async function load_next_page(): Promise<void> {
+    if (loading) {
+        return;
+    }
+    loading = true;
+    const generation: number = list_generation;
+
+    const params: URLSearchParams = new URLSearchParams({ "limit": String(PAGE_SIZE) });
+    if (next_cursor !== null) {
+        params.set("cursor", next_cursor);
+    }
+    if (search_prefix !== "") {
+        params.set("prefix", search_prefix);
+    }
+
+    try {
+        const response = await fetch(`/users?${params.toString()}`);
+        if (generation !== list_generation) {
+            return;
+        }
+        if (!response.ok) {
+            console.error("Failed to fetch user list");
+            next_cursor = null;
+            return;
+        }
         const data: UserListData = await response.json();
+        if (generation !== list_generation) {
+            return;
+        }
         if (data.data === undefined) {
             console.error("User list data is undefined");
+            next_cursor = null;
             return;
         }
-        userList = data.data.map((user: { user_id: string, user_name: string }) => ({
-            user_id: user.user_id,
-            user_name: user.user_name
-        }));
-        updateUserListDisplay();
-    } else {
-        console.error("Failed to fetch user list");
+        appendUserCards(data.data);
+        next_cursor = data.next_cursor ?? null;
+    } finally {
+        if (generation === list_generation) {
+            loading = false;
+        }
+    }
+
+    // 列表还没填满可视区域时继续加载
+    if (next_cursor !== null && users_list.scrollHeight <= users_list.clientHeight + LOAD_AHEAD) {
+        await load_next_page();
     }
 }
 
+/** 清空列表并从第一页重新加载 */
+function reset_user_list(prefix: string): void {
+    list_generation += 1;
+    loading = false;
+    search_prefix = prefix;
+    next_cursor = null;
+    users_list.replaceChildren();
+    load_next_page();
+}
+
+users_list.addEventListener("scroll", () => {
+    if (next_cursor === null) {
+        return;
+    }
+    if (users_list.scrollTop + users_list.clientHeight >= users_list.scrollHeight - LOAD_AHEAD) {
+        load_next_page();
+    }
+});
+
+search_input.addEventListener("input", () => {
+    clearTimeout(search_timer);
+    search_timer = setTimeout(() => reset_user_list(search_input.value.trim()), SEARCH_DELAY);
+});
+
 
 // ========== Initialization =========
-get_user_list()
-setInterval(render_target, 2000)
+reset_user_list("")
@@ -0,0 +1,114 @@
+import os
+import signal
+import socket
+import multiprocessing
+from argparse import ArgumentParser
+from time import sleep
+from typing import Final, Optional, List, Any
+from log import get_logger
+
+
+# ========== Constants =========
+DEFAULT_WORKERS: Final[int] = os.cpu_count() or 2
+DEFAULT_SHARED_STATE: Final[str] = "shared_state.db"
+BACKLOG: Final[int] = 1024
+
+serve_log: Final = get_logger("Serve")
+
+
+# ========== Worker =========
+def run_worker(index: int, listener: socket.socket, ws_listener: Optional[socket.socket], host: str, port: int) -> None:
+    # server reads its configuration from the environment at import time
+    os.environ["SEEME_WORKER_ID"] = str(index)
+    from werkzeug.serving import make_server
+    import server
+
+    def stop(signum: int, frame: Any) -> None:
+        # Let the atexit snapshot finish even if a second signal arrives
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        raise SystemExit(0)
+    signal.signal(signal.SIGTERM, stop)
+    # Ctrl+C reaches the whole process group; the parent stops workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    server.init_users()
+    server.start_background(ws_listener)
+    httpd: Final[Any] = make_server(host, port, server.app, threaded=True, fd=listener.fileno())
+    serve_log.info(f"Worker {index} ready.", pid=os.getpid())
+    httpd.serve_forever()
+
+
+def bind(host: str, port: int) -> socket.socket:
+    listener: Final[socket.socket] = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(BACKLOG)
+    return listener
+
+
+# ========== Main =========
+def main() -> None:
+    """
+    Production entry point: one listening socket, accepted from by N worker
+    processes. Sessions and presence live in a shared SQLite file (see
+    shared.py), so any worker can serve any request.
+    """
+    parser: Final[ArgumentParser] = ArgumentParser(description="Run the SeeMe server with several worker processes")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5050)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--ws-port", type=int, default=5051, help="WebSocket ingest port, 0 to disable")
+    parser.add_argument("--shared-state", default=DEFAULT_SHARED_STATE, help="SQLite file shared by the workers")
+    args = parser.parse_args()
+
+    os.environ["SEEME_SHARED_STATE"] = os.path.abspath(args.shared_state)
+    # Create the schema once before the workers race to do it
+    from shared import SharedStore
+    SharedStore(os.environ["SEEME_SHARED_STATE"])
+
+    os.environ["SEEME_WS_PORT"] = str(args.ws_port)
+
+    listener: Final[socket.socket] = bind(args.host, args.port)
+    from ingest import IngestServer
+    ws_listener: Final[Optional[socket.socket]] = (
+        bind(args.host, args.ws_port) if args.ws_port and IngestServer.available() else None
+    )
+
+    # spawn on every platform: workers must import server after the env is set
+    context: Final[Any] = multiprocessing.get_context("spawn")
+
+    def start(index: int) -> Any:
+        process: Any = context.Process(
+            target=run_worker, args=(index, listener, ws_listener, args.host, args.port), name=f"seeme-worker-{index}"
+        )
+        process.start()
+        return process
+
+    def stop(signum: int, frame: Any) -> None:
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+
+    workers: Final[List[Any]] = [start(index) for index in range(args.workers)]
+    serve_log.info(f"Serving on {args.host}:{args.port} with {args.workers} workers.")
+
+    try:
+        while True:
+            sleep(1)
+            for index, process in enumerate(workers):
+                if not process.is_alive():
+                    serve_log.warning(f"Worker {index} exited, restarting.", exitcode=process.exitcode)
+                    workers[index] = start(index)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            process.join(10)
+        listener.close()
+        if ws_listener is not None:
+            ws_listener.close()
+
+
+if __name__ == "__main__":
+    main()
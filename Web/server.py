@@ -1,29 +1,128 @@
+import os
 import flask
-from typing import Final, TypedDict, Optional, List
-from api import DataManager, EnhancedPasswordManager, Data
-from time import time
+import heapq
+import atexit
+import secrets
+import math
+import socket
+import sqlite3
+from json import dumps as json_dumps
+from typing import Final, TypedDict, Optional, List, Dict, Set, Tuple, Iterator, Mapping, Union
+from api import DataManager, EnhancedPasswordManager, Data, UsersChange, HashPoolBusy, SqliteStorage, User as StoredUser
+from sessions import SessionManager, Session
+from hub import PresenceHub, Subscription
+from history import ActivityHistory, HistoryEntry, downsample, check_buckets
+from activity_log import ActivityLog, LogRecord
+from directory import UserDirectory
+from shared import SharedStore, SharedSessionManager, SharedPresence
+from ingest import IngestServer
+from presence import PresenceTable, PresenceRecord, PresenceEvent
+from usage import UsageAggregates, UsageBucket, PERIODS
+from admission import AdmissionControl
+from assets import AssetStore, Asset, choose_encoding
+from wire import TitleDictionaries, WireError, UnknownTitle, CONTENT_TYPE as WIRE_TYPE
+from metrics import registry, Counter, Histogram
+from log import get_logger
+from queue import Empty
+from threading import Lock, Thread
+from time import time, sleep, perf_counter
+
+
+# ========== Constants =========
+SESSION_TTL: Final[float] = float(os.environ.get("SEEME_SESSION_TTL", "1800"))
+ONLINE_TIMEOUT: Final[float] = 30
+UNKNOWN_WINDOW: Final[str] = "Unknow"
+BATCH_LIMIT: Final[int] = int(os.environ.get("SEEME_BATCH_LIMIT", "1000"))
+TOKEN_HEADER: Final[str] = "X-SeeMe-Token"
+STREAM_KEEPALIVE: Final[float] = 15
+# Window changes kept per user, 12 bytes each
+HISTORY_CAPACITY: Final[int] = int(os.environ.get("SEEME_HISTORY_CAPACITY", "8192"))
+HISTORY_DEFAULT_RANGE: Final[float] = 3600
+# Set by serve.py: state shared between worker processes, and this worker's number
+SHARED_STATE: Final[str] = os.environ.get("SEEME_SHARED_STATE", "")
+WORKER_ID: Final[int] = int(os.environ.get("SEEME_WORKER_ID", "0"))
+SHARED_SYNC_INTERVAL: Final[float] = float(os.environ.get("SEEME_SHARED_SYNC_INTERVAL", "0.25"))
+# Each serve.py worker appends to its own activity log; history reads all of them
+LOG_ROOT: Final[str] = os.environ.get("SEEME_LOG_DIR", "activity_log")
+LOG_DIR: Final[str] = os.path.join(LOG_ROOT, f"worker-{WORKER_ID}") if SHARED_STATE else LOG_ROOT
+LOG_SEGMENT_BYTES: Final[int] = int(os.environ.get("SEEME_LOG_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+LOG_FLUSH_INTERVAL: Final[float] = float(os.environ.get("SEEME_LOG_FLUSH_INTERVAL", "1"))
+LOG_RETENTION: Final[int] = int(os.environ.get("SEEME_LOG_RETENTION", "16"))
+SNAPSHOT_INTERVAL: Final[float] = float(os.environ.get("SEEME_SNAPSHOT_INTERVAL", "60"))
+# WebSocket ingest channel, only started when `websockets` is installed; 0 disables it
+WS_HOST: Final[str] = os.environ.get("SEEME_WS_HOST", "127.0.0.1")
+WS_PORT: Final[int] = int(os.environ.get("SEEME_WS_PORT", "5051"))
+USERS_PAGE_DEFAULT: Final[int] = 100
+USERS_PAGE_MAX: Final[int] = 500
+# Time-in-application aggregates: a silence longer than USAGE_MAX_GAP is idle time
+USAGE_MAX_GAP: Final[float] = float(os.environ.get("SEEME_USAGE_MAX_GAP", "10"))
+USAGE_TOP_K: Final[int] = int(os.environ.get("SEEME_USAGE_TOP_K", "20"))
+USAGE_RETENTION: Final[Dict[str, int]] = {
+    "hour": int(os.environ.get("SEEME_USAGE_HOURS", "48")),
+    "day": int(os.environ.get("SEEME_USAGE_DAYS", "31"))
+}
+SUMMARY_DEFAULT_LIMIT: Final[int] = 10
+# Admission control, per process: requests per second and burst size; a rate of 0 disables it
+INGEST_RATE: Final[float] = float(os.environ.get("SEEME_INGEST_RATE", "500"))
+INGEST_BURST: Final[float] = float(os.environ.get("SEEME_INGEST_BURST", "1000"))
+SESSION_RATE: Final[float] = float(os.environ.get("SEEME_SESSION_RATE", "2"))
+SESSION_BURST: Final[float] = float(os.environ.get("SEEME_SESSION_BURST", "20"))
+LOGIN_RATE: Final[float] = float(os.environ.get("SEEME_LOGIN_RATE", "20"))
+LOGIN_BURST: Final[float] = float(os.environ.get("SEEME_LOGIN_BURST", "50"))
+# Upload interval suggested to clients, from idle to saturated ingest (seconds)
+SUGGEST_INTERVAL_MIN: Final[float] = float(os.environ.get("SEEME_SUGGEST_INTERVAL_MIN", "1"))
+SUGGEST_INTERVAL_MAX: Final[float] = float(os.environ.get("SEEME_SUGGEST_INTERVAL_MAX", "8"))
+# Cache lifetime of content-hashed asset URLs
+ASSET_MAX_AGE: Final[int] = 365 * 24 * 3600
+# Sessions whose binary-upload title dictionaries are kept, least recently used dropped first
+WIRE_SESSIONS: Final[int] = int(os.environ.get("SEEME_WIRE_SESSIONS", "10000"))
+THROTTLED_BODY: Final[bytes] = b'{"status": "error", "message": "Too many requests"}'
+
+
+# ========== Logging & Metrics =========
+init_log: Final = get_logger("Init")
+login_log: Final = get_logger("Login")
+shared_log: Final = get_logger("Shared")
+server_log: Final = get_logger("Server")
+
+http_requests: Final[Counter] = registry.counter(
+    "seeme_http_requests_total", "HTTP requests by route, method and status", ("route", "method", "status")
+)
+http_latency: Final[Histogram] = registry.histogram(
+    "seeme_http_request_duration_seconds", "Time to produce a response, by route", ("route",)
+)
+samples_ingested: Final[Counter] = registry.counter(
+    "seeme_samples_ingested_total", "Window samples applied to the presence table, by source", ("source",)
+)
+heartbeats: Final[Counter] = registry.counter("seeme_heartbeats_total", "Heartbeats received")
+admission_rejected: Final[Counter] = registry.counter(
+    "seeme_admission_rejected_total", "Requests answered with 429 by admission control, by route", ("route",)
+)
 
 
 # ========== TypedDicts =========
 class UploadInfo(TypedDict):
-    user_id: str
-    user_name: str
-    user_password: str
+    token: str
     active_window: str
 
 
+class Sample(TypedDict):
+    time: float
+    active_window: str
+
+
+class BatchUploadInfo(TypedDict):
+    token: str
+    sent_at: float
+    samples: List[Sample]
+
+
 class LoginInfo(TypedDict):
     user_id: str
     user_name: str
     user_password: str
 
 
-class User(TypedDict):
-    user_id: str
-    active_window: str
-    update_time: float
-
-
 class UserListData(TypedDict):
     user_id: str
     user_name: str
@@ -35,34 +134,371 @@ class UserActiveWindow(TypedDict):
 
 
 # ========== Golbal Viants =========
-login_dict: List[LoginInfo] = []
-users: List[User] = []
+shared_store: Final[Optional[SharedStore]] = SharedStore(SHARED_STATE) if SHARED_STATE else None
+shared_presence: Final[Optional[SharedPresence]] = SharedPresence(shared_store, WORKER_ID) if shared_store else None
+sessions: Final[Union[SessionManager, SharedSessionManager]] = (
+    SharedSessionManager(shared_store, SESSION_TTL) if shared_store else SessionManager(SESSION_TTL)
+)
+presence: Final[PresenceTable] = PresenceTable()
+directory: Final[UserDirectory] = UserDirectory()
+hub: Final[PresenceHub] = PresenceHub()
+history: Final[ActivityHistory] = ActivityHistory(HISTORY_CAPACITY)
+usage: Final[UsageAggregates] = UsageAggregates(USAGE_MAX_GAP, USAGE_TOP_K, USAGE_RETENTION)
+activity_log: Final[ActivityLog] = ActivityLog(LOG_DIR, LOG_SEGMENT_BYTES, LOG_FLUSH_INTERVAL, LOG_RETENTION)
+# Lock order: a presence stripe, then deadline_lock
+offline_deadlines: List[Tuple[float, str]] = []
+deadline_lock: Final[Lock] = Lock()
+ingest_admission: Final[AdmissionControl] = AdmissionControl(INGEST_RATE, INGEST_BURST, SESSION_RATE, SESSION_BURST)
+login_admission: Final[AdmissionControl] = AdmissionControl(LOGIN_RATE, LOGIN_BURST)
+title_dictionaries: Final[TitleDictionaries] = TitleDictionaries(WIRE_SESSIONS)
+# /users/status caches its body per presence.version
+status_cache: Tuple[int, bytes] = (-1, b"")
+status_lock: Final[Lock] = Lock()
+boot_id: Final[str] = secrets.token_hex(4)
 
 # ========== Inits =========
+def on_users_changed(change: UsersChange) -> None:
+    for user in change["added"]:
+        presence.add(user["id"], UNKNOWN_WINDOW, time() - 60)
+    directory.put_many([(user["id"], user["name"]) for user in change["added"]])
+
+    for user_id in change["changed"]:
+        stored: Optional[StoredUser] = DataManager.storage().get(user_id)
+        if stored is not None:
+            directory.put(user_id, stored["name"])
+
+    for user_id in change["removed"]:
+        presence.remove(user_id)
+        # Usage is only changed under the user's stripe (snapshot_presence reads
+        # it under all of them); with the record gone nothing credits it again
+        with presence.locked(user_id):
+            usage.remove(user_id)
+        directory.remove(user_id)
+        history.remove(user_id)
+
+    for user_id in change["removed"] + change["changed"]:
+        sessions.revoke_user(user_id)
+
+
 def init_users() -> None:
     data: Final[Data] = DataManager.get_data()
     for user in data.get("users", []):
-        users.append({
-            "user_id": user["id"],
-            "active_window": "Unknow",
-            "update_time": time() - 60
-        })
-    print(f"[info] [Init] Loaded {len(users)} users from data.json.")
+        presence.add(user["id"], UNKNOWN_WINDOW, time() - 60)
+    directory.load((user["id"], user["name"]) for user in data.get("users", []))
+    DataManager.add_listener(on_users_changed)
+    source: Final[str] = "SQLite" if isinstance(DataManager.storage(), SqliteStorage) else "data.json"
+    init_log.info(f"Loaded {len(presence)} users from {source}.")
+
+
+# ========== Presence =========
+def apply_presence(user: PresenceRecord, active_window: str, update_time: float) -> None:
+    # Caller holds the user's presence stripe
+    if user.active_window != UNKNOWN_WINDOW and update_time < user.update_time:
+        # Late sample (e.g. from a client's offline queue): never rewind
+        return
+    presence.changed(user.user_id)
+    if user.active_window != UNKNOWN_WINDOW:
+        usage.record(user.user_id, user.active_window, user.update_time, update_time)
+
+    online: Final[bool] = time() - update_time < ONLINE_TIMEOUT
+    if online and not user.online:
+        with deadline_lock:
+            heapq.heappush(offline_deadlines, (update_time + ONLINE_TIMEOUT, user.user_id))
+
+    user.active_window = active_window
+    user.update_time = update_time
+    user.online = online
+    history.record(user.user_id, update_time, active_window)
+
+
+def ingest_samples(user_id: str, samples: List[Tuple[float, str]], source: str = "upload") -> None:
+    # source "shared" marks updates another worker received (see sync_shared)
+    local: Final[bool] = source != "shared"
+    samples_ingested.inc(len(samples), (source,))
+    with presence.locked(user_id) as user:
+        if user is None:
+            return
+
+        before: Final[Tuple[str, bool]] = (user.active_window, user.online)
+        for update_time, active_window in samples:
+            apply_presence(user, active_window, update_time)
+            if local:
+                activity_log.append({"time": update_time, "user_id": user_id, "active_window": active_window})
+        changed: Final[bool] = before != (user.active_window, user.online)
+        event: Final[PresenceEvent] = user.event()
+
+    if changed:
+        hub.publish(user_id, "presence", event)
+    if local and shared_presence is not None:
+        shared_presence.publish(user_id, event["active_window"], event["update_time"])
+
+
+def update_presence(user_id: str, active_window: str, update_time: float, source: str = "upload") -> None:
+    ingest_samples(user_id, [(update_time, active_window)], source)
+
+
+def touch_presence(user_id: str, update_time: float) -> bool:
+    # Heartbeat: the window is unchanged, only refresh liveness. Returns False
+    # when the server has no window for the user and needs a full upload.
+    heartbeats.inc()
+    with presence.locked(user_id) as user:
+        if user is None or user.active_window == UNKNOWN_WINDOW:
+            return False
+        if update_time < user.update_time:
+            return True
+
+        active_window: Final[str] = user.active_window
+        presence.changed(user_id)
+        usage.record(user_id, active_window, user.update_time, update_time)
+        came_online: Final[bool] = not user.online
+        if came_online:
+            with deadline_lock:
+                heapq.heappush(offline_deadlines, (update_time + ONLINE_TIMEOUT, user_id))
+        user.update_time = update_time
+        user.online = True
+        if came_online:
+            history.record(user_id, update_time, user.active_window)
+        event: Final[PresenceEvent] = user.event()
+
+    if came_online:
+        hub.publish(user_id, "presence", event)
+    if shared_presence is not None:
+        shared_presence.publish(user_id, active_window, update_time)
+    return True
+
+
+def watch_offline() -> None:
+    while True:
+        sleep(1)
+        try:
+            expire_presence(time())
+        except Exception:
+            server_log.error("Offline watcher failed", exc_info=True)
+
+
+def expire_presence(now: float) -> None:
+    # One heap entry per online user; an entry whose user uploaded again in the
+    # meantime is pushed back with the new deadline instead of being dropped.
+    due: Final[List[str]] = []
+    events: Final[List[PresenceEvent]] = []
+
+    with deadline_lock:
+        while offline_deadlines and offline_deadlines[0][0] <= now:
+            due.append(heapq.heappop(offline_deadlines)[1])
+
+    # Stripe before heap, as in apply_presence
+    for user_id in due:
+        with presence.locked(user_id) as user:
+            if user is None or not user.online:
+                continue
+            deadline: float = user.update_time + ONLINE_TIMEOUT
+            if deadline > now:
+                with deadline_lock:
+                    heapq.heappush(offline_deadlines, (deadline, user_id))
+                continue
+            user.online = False
+            presence.changed(user_id)
+            history.record(user_id, user.update_time, None)
+            events.append(user.event())
+
+    for event in events:
+        hub.publish(event["user_id"], "presence", event)
+
+
+def restore_presence() -> None:
+    # Replaying the tail through apply_presence also rebuilds the usage
+    # aggregates; only heartbeat time since the snapshot is lost on a crash.
+    state, tail = activity_log.recover()
+    replayed: int = 0
+
+    if state is not None and "presence" in state:
+        usage.load(state.get("usage", {}))
+        state = state["presence"]
+
+    for user_id, (active_window, update_time) in (state or {}).items():
+        with presence.locked(user_id) as user:
+            if user is not None:
+                apply_presence(user, active_window, update_time)
+    for record in tail:
+        replayed += 1
+        with presence.locked(record["user_id"]) as user:
+            if user is not None:
+                apply_presence(user, record["active_window"], record["time"])
+
+    activity_log.open()
+    init_log.info(f"Restored presence from {LOG_DIR}.", replayed=replayed)
+
+
+def sync_shared() -> None:
+    # Write out what this worker received since the last pass, then apply what
+    # the other workers received; our own rows are already applied. The first
+    # pass starts from 0 and so also restores state on startup.
+    assert shared_presence is not None
+    seq: int = 0
+    while True:
+        try:
+            shared_presence.flush()
+            for row_seq, user_id, active_window, update_time, worker in shared_presence.since(seq):
+                seq = row_seq
+                if worker != WORKER_ID:
+                    ingest_samples(user_id, [(update_time, active_window)], "shared")
+        except sqlite3.OperationalError as e:
+            shared_log.warning("Presence sync failed", error=e)
+        sleep(SHARED_SYNC_INTERVAL)
+
+
+def snapshot_presence() -> None:
+    # Appends happen under a stripe, so the log position matches the state
+    with presence.frozen() as records:
+        position: Final[Tuple[int, int]] = activity_log.position()
+        state: Final[dict] = {
+            "presence": {
+                user.user_id: [user.active_window, user.update_time]
+                for user in records if user.active_window != UNKNOWN_WINDOW
+            },
+            "usage": usage.dump()
+        }
+    activity_log.snapshot(state, position)
+
+
+def snapshot_loop() -> None:
+    while True:
+        sleep(SNAPSHOT_INTERVAL)
+        try:
+            snapshot_presence()
+        except Exception:
+            server_log.error("Snapshot failed", exc_info=True)
+
+
+def shutdown() -> None:
+    if shared_presence is not None:
+        try:
+            shared_presence.flush()
+        except sqlite3.OperationalError as e:
+            shared_log.warning("Final presence flush failed", error=e)
+    snapshot_presence()
+    activity_log.close()
 
 
 # ========== Server =========
 port: Final[int] = 5050
-static_folder: Final[str] = ""
+# No blanket static route: only files under public/ are served, from the asset store
+static_folder: Final[Optional[str]] = None
 app: Final[flask.Flask] = flask.Flask(__name__, static_folder=static_folder)
+assets: Final[AssetStore] = AssetStore(os.path.join(app.root_path, "public"))
+assets.load()
+
+
+@app.before_request
+def start_timer() -> None:
+    flask.g.started = perf_counter()
+
+
+@app.after_request
+def record_request(response: flask.Response) -> flask.Response:
+    route: Final[str] = flask.request.url_rule.rule if flask.request.url_rule is not None else "unmatched"
+    http_requests.inc(labels=(route, flask.request.method, str(response.status_code)))
+    started: Final[Optional[float]] = flask.g.get("started")
+    if started is not None:
+        http_latency.observe(perf_counter() - started, (route,))
+    return response
+
+
+if SHARED_STATE:
+    @app.after_request
+    def tag_worker(response: flask.Response) -> flask.Response:
+        response.headers["X-SeeMe-Worker"] = str(WORKER_ID)
+        return response
+
+
+def throttled(route: str, retry_after: float) -> flask.Response:
+    # Answered before the body is parsed, so a flood costs as little as possible
+    admission_rejected.inc(labels=(route,))
+    response: Final[flask.Response] = flask.Response(THROTTLED_BODY, status=429, mimetype="application/json")
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def invalid_data() -> flask.Response:
+    return flask.make_response(flask.jsonify({"status": "error", "message": "Invalid data"}), 400)
+
+
+def admit_ingest(route: str) -> Optional[flask.Response]:
+    # Clients send their token as a header too, so the session is known unparsed
+    wait: Final[float] = ingest_admission.admit(flask.request.headers.get(TOKEN_HEADER))
+    return throttled(route, wait) if wait else None
+
+
+def suggested_interval() -> float:
+    # Rises linearly with how much of the global ingest burst is used up
+    return round(SUGGEST_INTERVAL_MIN + (SUGGEST_INTERVAL_MAX - SUGGEST_INTERVAL_MIN) * ingest_admission.load(), 1)
+
+
+def upload_wire(source: str) -> flask.Response:
+    # Binary samples (see wire.py): decoded straight into (time, title) tuples
+    token: Final[Optional[str]] = flask.request.headers.get(TOKEN_HEADER)
+    session: Final[Optional[Session]] = sessions.get(token)
+    if session is None:
+        return flask.jsonify({"status": "error", "message": "User not logged in"})
+
+    try:
+        samples: Final[List[Tuple[float, str]]] = title_dictionaries.decode(
+            token, flask.request.get_data(), time(), BATCH_LIMIT
+        )
+    except UnknownTitle:
+        return flask.jsonify({"status": "error", "message": "Unknown title reference", "resync_titles": True})
+    except WireError as error:
+        return flask.jsonify({"status": "error", "message": str(error)})
+
+    if samples:
+        samples.sort()
+        ingest_samples(session.user_id, samples, source)
+
+    return flask.jsonify({
+        "status": "success", "message": "Upload successful", "accepted": len(samples), "next_interval": suggested_interval()
+    })
+
+
+def send_asset(asset: Asset, immutable: bool) -> flask.Response:
+    request: Final[flask.Request] = flask.request
+    encoding: Final[str] = choose_encoding(asset, {
+        encoding: request.accept_encodings[encoding] for encoding in ("br", "gzip")
+    })
+    etag: Final[str] = asset.etag(encoding)
+
+    if request.if_none_match.contains(etag):
+        response: flask.Response = flask.Response(status=304)
+    else:
+        response = flask.Response(asset.variants[encoding], mimetype=asset.mimetype)
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = f"public, max-age={ASSET_MAX_AGE}, immutable" if immutable else "no-cache"
+    return response
 
 
 @app.route("/", methods=["GET"])
 def home() -> flask.Response:
-    return flask.send_file("public/index.html")
+    if assets.index is None:
+        flask.abort(404)
+    return send_asset(assets.index, False)
+
+
+@app.route("/public/<path:name>", methods=["GET"])
+def public_asset(name: str) -> flask.Response:
+    found: Final[Optional[Tuple[Asset, bool]]] = assets.get(name)
+    if found is None:
+        flask.abort(404)
+    return send_asset(*found)
 
 
 @app.route("/login", methods=["POST"])
 def login() -> flask.Response:
+    wait: Final[float] = login_admission.admit()
+    if wait:
+        return throttled("/login", wait)
+
     data: Final[Optional[LoginInfo]] = flask.request.json
 
     if not data:
@@ -73,63 +509,150 @@ def login() -> flask.Response:
     user_password: Final[str] = data["user_password"]
 
     stored_password: Final[Optional[str]] = DataManager.get_user_password(user_id, user_name)
-    print(f"[info] [Login] [{user_id}] Attempting login with user name: {user_name}")
-    print(f"[info] [Login] [{user_id}] Stored password: {stored_password}")
+    login_log.debug("Login attempt", user_id=user_id, user_name=user_name)
     if not stored_password:
+        login_log.info("Login rejected: unknown user", user_id=user_id)
         return flask.jsonify({"status": "error", "message": "User or password error"})
     
-    if EnhancedPasswordManager.verify_password(user_password, user_name, user_id, stored_password):
-        if not data in login_dict:
-            login_dict.append(data)
-        return flask.jsonify({"status": "success", "message": "Login successful"})
+    try:
+        verified: Final[bool] = EnhancedPasswordManager.verify_password(user_password, user_name, user_id, stored_password)
+    except HashPoolBusy:
+        login_log.warning("Login rejected: hash pool busy", user_id=user_id)
+        return flask.make_response(flask.jsonify({"status": "error", "message": "Server busy, retry later"}), 503)
+
+    if verified:
+        login_log.info("Login successful", user_id=user_id)
+        token: Final[str] = sessions.create(user_id, user_name)
+        result: Final[dict] = {"status": "success", "message": "Login successful", "token": token}
+        if ingest_server.running:
+            result["ws_port"] = WS_PORT
+        result["wire_formats"] = [WIRE_TYPE]
+        return flask.jsonify(result)
     else:
+        login_log.info("Login rejected: wrong password", user_id=user_id)
         return flask.jsonify({"status": "error", "message": "User or password error"})
 
 
 @app.route("/upload", methods=["POST"])
 def upload() -> flask.Response:
+    rejected: Final[Optional[flask.Response]] = admit_ingest("/upload")
+    if rejected is not None:
+        return rejected
+
+    if flask.request.mimetype == WIRE_TYPE:
+        return upload_wire("upload")
+
     data: Final[Optional[UploadInfo]] = flask.request.json
 
-    if not data:
-        return flask.jsonify({"status": "error", "message": "Invalid data"})
+    # Titles are stored and aggregated as strings, so anything else is refused here
+    if not isinstance(data, dict) or not isinstance(data.get("active_window"), str):
+        return invalid_data()
 
-    user_id: Final[str] = data["user_id"]
-    user_name: Final[str] = data["user_name"]
-    user_password: Final[str] = data["user_password"]
-    active_window: Final[str] = data["active_window"]
+    session: Final[Optional[Session]] = sessions.get(data.get("token"))
+    if session is None:
+        return flask.jsonify({"status": "error", "message": "User not logged in"})
+
+    update_presence(session.user_id, data["active_window"], time())
+
+    return flask.jsonify({"status": "success", "message": "Upload successful", "next_interval": suggested_interval()})
 
-    login_info: LoginInfo = {
-        "user_id": user_id,
-        "user_name": user_name,
-        "user_password": user_password
-    }
 
-    if login_info not in login_dict:
+@app.route("/upload/heartbeat", methods=["POST"])
+def upload_heartbeat() -> flask.Response:
+    rejected: Final[Optional[flask.Response]] = admit_ingest("/upload/heartbeat")
+    if rejected is not None:
+        return rejected
+
+    # The session token travels in a header so the body is never parsed
+    session: Final[Optional[Session]] = sessions.get(flask.request.headers.get(TOKEN_HEADER))
+    if session is None:
         return flask.jsonify({"status": "error", "message": "User not logged in"})
 
-    user_data: Final[User] = {
-                "user_id": user_id,
-                "active_window": active_window,
-                "update_time": time()
-            }
-    
-    for i in range(len(users)):
-        if users[i]["user_id"] == user_id:
-            users[i] = user_data
-            break
+    if not touch_presence(session.user_id, time()):
+        return flask.jsonify({
+            "status": "success", "message": "Full upload required", "resync": True, "next_interval": suggested_interval()
+        })
 
-    return flask.jsonify({"status": "success", "message": "Upload successful"})
+    return flask.jsonify({"status": "success", "message": "Heartbeat received", "next_interval": suggested_interval()})
+
+
+@app.route("/upload/batch", methods=["POST"])
+def upload_batch() -> flask.Response:
+    rejected: Final[Optional[flask.Response]] = admit_ingest("/upload/batch")
+    if rejected is not None:
+        return rejected
+
+    if flask.request.mimetype == WIRE_TYPE:
+        return upload_wire("batch")
+
+    data: Final[Optional[BatchUploadInfo]] = flask.request.json
+
+    if not isinstance(data, dict) or not isinstance(data.get("samples"), list):
+        return invalid_data()
+
+    session: Final[Optional[Session]] = sessions.get(data.get("token"))
+    if session is None:
+        return flask.jsonify({"status": "error", "message": "User not logged in"})
+
+    if len(data["samples"]) > BATCH_LIMIT:
+        return flask.jsonify({"status": "error", "message": f"At most {BATCH_LIMIT} samples per batch"})
+
+    # Shift client timestamps onto the server clock and never into the future
+    now: Final[float] = time()
+    try:
+        skew: Final[float] = now - float(data.get("sent_at", now))
+        samples: Final[List[Tuple[float, str]]] = sorted(
+            (min(float(sample["time"]) + skew, now), str(sample["active_window"]))
+            for sample in data["samples"]
+        )
+    except (KeyError, TypeError, ValueError):
+        return invalid_data()
+    # NaN or infinite timestamps would poison the ordering of the history
+    if not all(math.isfinite(update_time) for update_time, _ in samples) or not math.isfinite(skew):
+        return invalid_data()
+
+    ingest_samples(session.user_id, samples, "batch")
+
+    return flask.jsonify({
+        "status": "success", "message": "Upload successful", "accepted": len(samples), "next_interval": suggested_interval()
+    })
 
 
 @app.route("/users", methods=["GET"])
 def get_users_list() -> flask.Response:
-    user_list: List[UserListData] = []
-    for user in DataManager.get_data().get("users", []):
-        user_list.append({
-            "user_id": user["id"],
-            "user_name": user["name"]
-        })
-    return flask.jsonify({"status": "success", "data": user_list})
+    """
+    One page of users sorted by name.
+
+    Query: `limit` (default 100, max 500), `cursor` from the previous page's
+    `next_cursor`, `prefix` to match the start of the name, and `online_only`.
+    """
+    args: Final[Mapping[str, str]] = flask.request.args
+
+    try:
+        limit: Final[int] = min(int(args.get("limit", USERS_PAGE_DEFAULT)), USERS_PAGE_MAX)
+    except ValueError:
+        return flask.jsonify({"status": "error", "message": "Invalid data"})
+
+    if limit <= 0:
+        return flask.jsonify({"status": "error", "message": "Invalid data"})
+
+    online_only: Final[bool] = args.get("online_only", "").lower() in ("1", "true", "yes")
+
+    def is_online(user_id: str) -> bool:
+        user: Optional[PresenceRecord] = presence.get(user_id)
+        return user is not None and user.online
+
+    # Pick up edits made by admin.py before reading the directory
+    DataManager.refresh()
+    try:
+        page, next_cursor = directory.page(
+            limit, args.get("cursor") or None, args.get("prefix", ""), is_online if online_only else None
+        )
+    except ValueError as e:
+        return flask.jsonify({"status": "error", "message": str(e)})
+
+    user_list: Final[List[UserListData]] = [{"user_id": user_id, "user_name": name} for user_id, name in page]
+    return flask.jsonify({"status": "success", "data": user_list, "next_cursor": next_cursor})
 
 
 @app.route("/users/get", methods=["POST"])
@@ -144,19 +667,224 @@ def get_user_info() -> flask.Response:
     if not user_id:
         return flask.jsonify({"status": "error", "message": "Invalid data"})
 
-    for user in users:
-        if user["user_id"] == user_id:
-            active_window: UserActiveWindow = {
-                "active_window": user["active_window"],
-                "update_time": user["update_time"]
-            }
-            return flask.jsonify({"status": "success", "data": active_window})
+    with presence.locked(user_id) as user:
+        if user is None:
+            return flask.jsonify({"status": "error", "message": "Data not found."})
+        active_window: Final[UserActiveWindow] = {
+            "active_window": user.active_window,
+            "update_time": user.update_time
+        }
+
+    return flask.jsonify({"status": "success", "data": active_window})
+
+
+def history_logs() -> List[ActivityLog]:
+    # Other workers' logs (and those of workers from an earlier, larger deployment) are only read
+    logs: Final[List[ActivityLog]] = [activity_log]
+    if SHARED_STATE and os.path.isdir(LOG_ROOT):
+        for name in sorted(os.listdir(LOG_ROOT)):
+            directory: str = os.path.join(LOG_ROOT, name)
+            if name.startswith("worker-") and directory != LOG_DIR:
+                logs.append(ActivityLog(directory, LOG_SEGMENT_BYTES, LOG_FLUSH_INTERVAL, LOG_RETENTION))
+    return logs
+
+
+def logged_history(user_id: str, since: float, before: float) -> List[HistoryEntry]:
+    # Window changes in [since, before) from the on-disk segments of every worker
+    records: Final[List[LogRecord]] = [
+        record for log in history_logs() for record in log.read(since, before, user_id) if record["time"] < before
+    ]
+    records.sort(key=lambda record: record["time"])
+
+    entries: Final[List[HistoryEntry]] = []
+    for record in records:
+        if not entries or entries[-1]["active_window"] != record["active_window"]:
+            entries.append({"time": record["time"], "active_window": record["active_window"]})
+    return entries
+
+
+@app.route("/users/history", methods=["GET"])
+def get_user_history() -> flask.Response:
+    args: Final[Mapping[str, str]] = flask.request.args
+    user_id: Final[Optional[str]] = args.get("user_id")
+
+    try:
+        until: Final[float] = float(args.get("until", time()))
+        since: Final[float] = float(args.get("since", until - HISTORY_DEFAULT_RANGE))
+        bucket: Final[Optional[float]] = float(args["bucket"]) if "bucket" in args else None
+    except ValueError:
+        return flask.jsonify({"status": "error", "message": "Invalid data"})
+
+    if not user_id or since > until or (bucket is not None and bucket <= 0):
+        return flask.jsonify({"status": "error", "message": "Invalid data"})
+
+    try:
+        if bucket is not None:
+            check_buckets(since, until, bucket)
+    except ValueError as e:
+        return flask.jsonify({"status": "error", "message": str(e)})
+
+    entries: Final[List[HistoryEntry]] = history.query(user_id, since, until)
+    # Older than anything the ring still holds: read the rest from the activity log
+    oldest: Final[Optional[float]] = history.oldest(user_id)
+    if user_id in presence and (oldest is None or since < oldest):
+        older: Final[List[HistoryEntry]] = logged_history(user_id, since, until if oldest is None else oldest)
+        if entries and older and entries[0]["active_window"] == older[-1]["active_window"]:
+            # Not a change: after a restart the ring starts mid-way through a title
+            entries.pop(0)
+        entries[:0] = older
+
+    return flask.jsonify({"status": "success", "data": entries if bucket is None else downsample(entries, since, until, bucket)})
+
+
+@app.route("/users/summary", methods=["GET"])
+def get_user_summary() -> flask.Response:
+    """
+    Time spent per application, from the precomputed aggregates.
+
+    Query: `user_id`, `period` (`hour` or `day`, default `day`), `since` and
+    `until` (default: the current period only) and `limit`, the number of
+    top titles per period (default 10).
+    """
+    args: Final[Mapping[str, str]] = flask.request.args
+    user_id: Final[Optional[str]] = args.get("user_id")
+    period: Final[str] = args.get("period", "day")
+
+    try:
+        until: Final[float] = float(args.get("until", time()))
+        since: Final[float] = float(args.get("since", until))
+        limit: Final[int] = min(int(args.get("limit", SUMMARY_DEFAULT_LIMIT)), USAGE_TOP_K)
+    except ValueError:
+        return flask.jsonify({"status": "error", "message": "Invalid data"})
+
+    if not user_id or period not in PERIODS or since > until or limit <= 0:
+        return flask.jsonify({"status": "error", "message": "Invalid data"})
+
+    with presence.locked(user_id) as user:
+        if user is None:
+            return flask.jsonify({"status": "error", "message": "Data not found."})
+        buckets: Final[List[UsageBucket]] = usage.summary(user_id, period, since, until, limit)
+
+    return flask.jsonify({"status": "success", "data": buckets})
+
+
+def presence_etag(version: int) -> str:
+    return f"{boot_id}-{version}"
+
+
+def status_body() -> Tuple[int, bytes]:
+    global status_cache
+    cached: Tuple[int, bytes] = status_cache
+    if cached[0] == presence.version:
+        return cached
+
+    with status_lock:
+        if status_cache[0] != presence.version:
+            with presence.frozen() as records:
+                version: int = presence.version
+                snapshot: List[PresenceEvent] = [user.event() for user in records]
+            body: bytes = json_dumps({"status": "success", "data": snapshot}, ensure_ascii=False).encode('utf-8')
+            status_cache = (version, body)
+        return status_cache
+
+
+@app.route("/users/status", methods=["GET"])
+def get_users_status() -> flask.Response:
+    current: Final[int] = presence.version
+    if presence_etag(current) in flask.request.if_none_match:
+        not_modified: Final[flask.Response] = flask.Response(status=304)
+        not_modified.set_etag(presence_etag(current))
+        return not_modified
+
+    version, body = status_body()
+    response: Final[flask.Response] = flask.Response(body, mimetype="application/json")
+    response.set_etag(presence_etag(version))
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics() -> flask.Response:
+    return flask.Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/users/stream", methods=["GET"])
+def stream_users() -> flask.Response:
+    user_ids: Final[Set[str]] = set(flask.request.args.getlist("user_id"))
+    subscription: Final[Subscription] = hub.subscribe(user_ids or None)
+
+    with presence.frozen() as records:
+        snapshot: Final[List[PresenceEvent]] = [
+            user.event() for user in records
+            if not user_ids or user.user_id in user_ids
+        ]
+
+    def generate() -> Iterator[bytes]:
+        try:
+            for event in snapshot:
+                yield PresenceHub.encode("presence", event)
+            while True:
+                try:
+                    frame: Optional[bytes] = subscription.queue.get(timeout=STREAM_KEEPALIVE)
+                except Empty:
+                    frame = b": keepalive\n\n"
+                if frame is None:
+                    break
+                yield frame
+        finally:
+            hub.unsubscribe(subscription)
+
+    return flask.Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+
+def ws_authenticate(token: str) -> Optional[str]:
+    session: Final[Optional[Session]] = sessions.get(token)
+    return session.user_id if session is not None else None
+
+
+def ws_ingest(user_id: str, update_time: float, active_window: str) -> None:
+    update_presence(user_id, active_window, update_time, "websocket")
+
+
+def ws_admit(token: str) -> float:
+    wait: Final[float] = ingest_admission.admit(token)
+    if wait:
+        admission_rejected.inc(labels=("websocket",))
+    return wait
+
+
+ingest_server: Final[IngestServer] = IngestServer(
+    ws_authenticate, ws_ingest, touch_presence, ws_admit, suggested_interval
+)
+
+registry.gauge("seeme_sessions_active", "Live login sessions", lambda: len(sessions))
+registry.gauge("seeme_presence_users", "Users in the presence table", lambda: len(presence))
+registry.gauge("seeme_presence_online", "Users currently online", presence.count_online)
+registry.gauge("seeme_stream_subscribers", "Open /users/stream connections", lambda: len(hub))
+registry.gauge("seeme_websocket_connections", "Open WebSocket ingest connections", lambda: ingest_server.connections)
+registry.gauge("seeme_worker", "Worker number of this process (serve.py)", lambda: WORKER_ID)
 
-    return flask.jsonify({"status": "error", "message": "Data not found."})
+
+def start_background(ws_socket: Optional[socket.socket] = None) -> None:
+    restore_presence()
+    atexit.register(shutdown)
+    Thread(target=watch_offline, daemon=True).start()
+    Thread(target=snapshot_loop, daemon=True).start()
+    if shared_presence is not None:
+        Thread(target=sync_shared, daemon=True).start()
+    if WS_PORT and IngestServer.available():
+        ingest_server.start(WS_HOST, WS_PORT, ws_socket)
+        init_log.info(f"WebSocket ingest listening on port {WS_PORT}.")
 
 
 # ========== Main =========
 if __name__ == "__main__":
     init_users()
-    print(f"[info] [Server] Starting server on port {port}...")
+    # With the debug reloader only the child process actually serves
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background()
+    server_log.info(f"Starting server on port {port}...")
     app.run(port=port, debug=True)
@@ -0,0 +1,89 @@
+import secrets
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Final, Optional, Dict, Set, Callable
+
+
+# ========== Classes =========
+class Session:
+    __slots__ = ("token", "user_id", "user_name", "last_seen")
+
+    def __init__(self, token: str, user_id: str, user_name: str) -> None:
+        self.token: str = token
+        self.user_id: str = user_id
+        self.user_name: str = user_name
+        self.last_seen: float = monotonic()
+
+
+class SessionManager:
+    """
+    Opaque-token sessions with idle expiry.
+
+    Sessions live in an OrderedDict kept in last-seen order: a touch moves the
+    session to the end, so expired sessions are always at the front and eviction
+    only ever looks at the entries it actually removes. `clock` is injectable
+    for tests.
+    """
+    def __init__(self, ttl: float, clock: Callable[[], float] = monotonic) -> None:
+        self.ttl: float = ttl
+        self._clock: Final[Callable[[], float]] = clock
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self._by_user: Dict[str, Set[str]] = {}
+        self._lock: Final[Lock] = Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _drop(self, token: str) -> None:
+        session: Final[Optional[Session]] = self._sessions.pop(token, None)
+        if session is None:
+            return
+        tokens: Final[Optional[Set[str]]] = self._by_user.get(session.user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[session.user_id]
+
+    def _evict(self, now: float) -> None:
+        deadline: Final[float] = now - self.ttl
+        while self._sessions:
+            token, session = next(iter(self._sessions.items()))
+            if session.last_seen > deadline:
+                break
+            self._drop(token)
+
+    def create(self, user_id: str, user_name: str) -> str:
+        token: Final[str] = secrets.token_urlsafe(32)
+        session: Final[Session] = Session(token, user_id, user_name)
+        with self._lock:
+            session.last_seen = self._clock()
+            self._evict(session.last_seen)
+            self._sessions[token] = session
+            self._by_user.setdefault(user_id, set()).add(token)
+        return token
+
+    def get(self, token: Optional[str]) -> Optional[Session]:
+        if not token:
+            return None
+
+        now: Final[float] = self._clock()
+        with self._lock:
+            self._evict(now)
+            session: Final[Optional[Session]] = self._sessions.get(token)
+            if session is None:
+                return None
+            session.last_seen = now
+            self._sessions.move_to_end(token)
+            return session
+
+    def revoke(self, token: str) -> None:
+        with self._lock:
+            self._drop(token)
+
+    def revoke_user(self, user_id: str) -> int:
+        with self._lock:
+            tokens: Final[Set[str]] = self._by_user.get(user_id, set()).copy()
+            for token in tokens:
+                self._drop(token)
+        return len(tokens)
@@ -0,0 +1,190 @@
+import sqlite3
+import secrets
+from threading import local, Lock
+from time import time
+from typing import Final, Optional, List, Dict, Tuple
+from sessions import Session
+
+
+# ========== Classes =========
+class SharedStore:
+    """
+    SQLite database shared by the worker processes of serve.py.
+
+    WAL mode lets every worker read while one of them writes. Connections are
+    per thread because sqlite3 connections must not cross threads.
+    """
+    SCHEMA: Final[str] = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            token TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            user_name TEXT NOT NULL,
+            last_seen REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS sessions_user ON sessions (user_id);
+        CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen);
+        CREATE TABLE IF NOT EXISTS presence (
+            user_id TEXT PRIMARY KEY,
+            active_window TEXT NOT NULL,
+            update_time REAL NOT NULL,
+            worker INTEGER NOT NULL,
+            seq INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS presence_seq ON presence (seq);
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self._local: Final[local] = local()
+        db: Final[sqlite3.Connection] = self.db()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(SharedStore.SCHEMA)
+
+    def db(self) -> sqlite3.Connection:
+        db: Optional[sqlite3.Connection] = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+
+class SharedSessionManager:
+    """
+    SessionManager with the sessions kept in a SharedStore, so a token issued
+    by one worker is accepted by all of them.
+
+    Idle time is measured on the wall clock since workers do not share a
+    monotonic one. `last_seen` is only written back once it is `touch_after`
+    seconds old, so a busy session does not turn every request into a write.
+    """
+    def __init__(self, store: SharedStore, ttl: float) -> None:
+        self.ttl: float = ttl
+        self.touch_after: float = min(60.0, ttl / 10)
+        self._store: Final[SharedStore] = store
+
+    def __len__(self) -> int:
+        return self._store.db().execute(
+            "SELECT COUNT(*) FROM sessions WHERE last_seen > ?", (time() - self.ttl,)
+        ).fetchone()[0]
+
+    def create(self, user_id: str, user_name: str) -> str:
+        token: Final[str] = secrets.token_urlsafe(32)
+        now: Final[float] = time()
+        db: Final[sqlite3.Connection] = self._store.db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("DELETE FROM sessions WHERE last_seen <= ?", (now - self.ttl,))
+            db.execute(
+                "INSERT INTO sessions (token, user_id, user_name, last_seen) VALUES (?, ?, ?, ?)",
+                (token, user_id, user_name, now)
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return token
+
+    def get(self, token: Optional[str]) -> Optional[Session]:
+        if not token:
+            return None
+
+        db: Final[sqlite3.Connection] = self._store.db()
+        row: Final[Optional[tuple]] = db.execute(
+            "SELECT user_id, user_name, last_seen FROM sessions WHERE token = ?", (token,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        now: Final[float] = time()
+        if row[2] <= now - self.ttl:
+            db.execute("DELETE FROM sessions WHERE token = ?", (token,))
+            return None
+        if now - row[2] >= self.touch_after:
+            db.execute("UPDATE sessions SET last_seen = ? WHERE token = ?", (now, token))
+
+        session: Final[Session] = Session(token, row[0], row[1])
+        session.last_seen = now
+        return session
+
+    def revoke(self, token: str) -> None:
+        self._store.db().execute("DELETE FROM sessions WHERE token = ?", (token,))
+
+    def revoke_user(self, user_id: str) -> int:
+        return self._store.db().execute("DELETE FROM sessions WHERE user_id = ?", (user_id,)).rowcount
+
+
+class SharedPresence:
+    """
+    Latest (active window, update time) per user, shared between workers.
+
+    Each write takes the next sequence number, so a worker catches up on what
+    the others received by reading the rows past the last number it saw. A
+    write never moves a user's update time backwards.
+
+    `publish` only remembers the latest state per user; `flush` writes all of
+    it in one transaction. The database write lock is then taken once per
+    flush interval and worker instead of once per upload, which is what lets
+    ingest scale with the number of workers.
+    """
+    def __init__(self, store: SharedStore, worker: int) -> None:
+        self.worker: int = worker
+        self._store: Final[SharedStore] = store
+        self._pending: Dict[str, Tuple[str, float]] = {}
+        self._lock: Final[Lock] = Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def publish(self, user_id: str, active_window: str, update_time: float) -> None:
+        with self._lock:
+            previous: Optional[Tuple[str, float]] = self._pending.get(user_id)
+            if previous is None or update_time >= previous[1]:
+                self._pending[user_id] = (active_window, update_time)
+
+    def flush(self) -> int:
+        """Write everything published since the last flush; returns the rows written."""
+        with self._lock:
+            pending: Final[Dict[str, Tuple[str, float]]] = self._pending
+            self._pending = {}
+        if not pending:
+            return 0
+
+        db: Final[sqlite3.Connection] = self._store.db()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            self._requeue(pending)
+            raise
+        try:
+            db.executemany(
+                """
+                INSERT INTO presence (user_id, active_window, update_time, worker, seq)
+                VALUES (?, ?, ?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM presence))
+                ON CONFLICT (user_id) DO UPDATE SET
+                    active_window = excluded.active_window,
+                    update_time = excluded.update_time,
+                    worker = excluded.worker,
+                    seq = excluded.seq
+                WHERE excluded.update_time >= presence.update_time
+                """,
+                [(user_id, active_window, update_time, self.worker) for user_id, (active_window, update_time) in pending.items()]
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            self._requeue(pending)
+            raise
+        return len(pending)
+
+    def _requeue(self, pending: Dict[str, Tuple[str, float]]) -> None:
+        # A failed flush is retried with the next one; newer states win
+        for user_id, (active_window, update_time) in pending.items():
+            self.publish(user_id, active_window, update_time)
+
+    def since(self, seq: int) -> List[Tuple[int, str, str, float, int]]:
+        """(seq, user_id, active_window, update_time, worker) rows after `seq`."""
+        return self._store.db().execute(
+            "SELECT seq, user_id, active_window, update_time, worker FROM presence WHERE seq > ? ORDER BY seq",
+            (seq,)
+        ).fetchall()
@@ -0,0 +1,112 @@
+import os
+from typing import Any, List
+
+import activity_log
+from activity_log import ActivityLog, LogRecord
+
+
+def new_log(directory: Any, segment_bytes: int = 1 << 20) -> ActivityLog:
+    log = ActivityLog(str(directory), segment_bytes, 3600, 100)
+    log.open()
+    return log
+
+
+def record(time: float, user_id: str, window: str = "Editor") -> LogRecord:
+    return {"time": time, "user_id": user_id, "active_window": window}
+
+
+def test_read_filters_by_time_and_user(tmp_path: Any) -> None:
+    log = new_log(tmp_path)
+    log.append(record(10, "a"))
+    log.append(record(11, "b", 'titled "user_id": "a"'))
+    # Arrival order, not time order: a late sample from an offline queue
+    log.append(record(5, "a", "Late"))
+    log.append(record(12, "a", "Browser"))
+    log.close()
+
+    assert [entry["active_window"] for entry in log.read(0, 100, "a")] == ["Editor", "Late", "Browser"]
+    assert [entry["time"] for entry in log.read(6, 11, "a")] == [10]
+    assert [entry["user_id"] for entry in log.read(0, 100)] == ["a", "b", "a", "a"]
+
+
+def test_read_skips_blocks_outside_the_range(tmp_path: Any, monkeypatch: Any) -> None:
+    monkeypatch.setattr(activity_log, "INDEX_BLOCK_BYTES", 256)
+    log = new_log(tmp_path)
+    for index in range(400):
+        log.append(record(1000 + index, f"user{index % 4}"))
+        if index % 50 == 49:
+            log.flush()
+    log.close()
+
+    parsed: List[bytes] = []
+    loads = activity_log.json_loads
+
+    def counting_loads(data: Any) -> Any:
+        parsed.append(data)
+        return loads(data)
+
+    monkeypatch.setattr(activity_log, "json_loads", counting_loads)
+    found = list(log.read(1200, 1219, "user1"))
+    assert [entry["time"] for entry in found] == [1201, 1205, 1209, 1213, 1217]
+    # Only that user's lines in the few blocks around the range are parsed, not all 400 records
+    assert sum(b'"user_id"' in data for data in parsed) <= 10
+
+
+def test_segments_without_an_index_are_searched_in_full(tmp_path: Any) -> None:
+    log = new_log(tmp_path)
+    log.append(record(10, "a"))
+    log.append(record(20, "a", "Browser"))
+    log.close()
+    (segment,) = log.segments()
+    with open(os.path.join(str(tmp_path), f"{segment:08d}.idx"), "wb") as file:
+        file.write(b"[0, 10, 10")
+
+    assert [entry["time"] for entry in log.read(0, 100, "a")] == [10, 20]
+    os.remove(os.path.join(str(tmp_path), f"{segment:08d}.idx"))
+    assert [entry["time"] for entry in log.read(15, 100, "a")] == [20]
+
+
+def test_open_starts_past_a_segment_named_by_the_snapshot(tmp_path: Any) -> None:
+    log = new_log(tmp_path)
+    log.append(record(10, "a"))
+    log.close()
+    # As after a crash between the snapshot and the write of segment 5
+    log.snapshot({"seen": 1}, (5, 200))
+
+    reopened = new_log(tmp_path)
+    assert reopened.position() == (6, 0)
+    reopened.append(record(20, "a", "After restart"))
+    reopened.close()
+
+    state, tail = ActivityLog(str(tmp_path), 1 << 20, 3600, 100).recover()
+    assert state == {"seen": 1}
+    assert [entry["active_window"] for entry in tail] == ["After restart"]
+
+
+def test_snapshot_flushes_the_records_it_covers(tmp_path: Any) -> None:
+    log = new_log(tmp_path)
+    log.append(record(10, "a"))
+    log.snapshot({"seen": 1}, log.position())
+    assert [entry["time"] for entry in log.read(0, 100)] == [10]
+    log.append(record(20, "a", "Browser"))
+    log.close()
+
+    state, tail = ActivityLog(str(tmp_path), 1 << 20, 3600, 100).recover()
+    assert [entry["time"] for entry in tail] == [20]
+
+
+def test_pruned_segments_lose_their_index_too(tmp_path: Any) -> None:
+    log = ActivityLog(str(tmp_path), 64, 3600, 1)
+    log.open()
+    for index in range(4):
+        log.append(record(index, "a", f"Window {index}"))
+        log.flush()
+    log.snapshot({}, log.position())
+    log.append(record(10, "a"))
+    log.flush()
+    log.close()
+
+    names = sorted(os.listdir(str(tmp_path)))
+    segments = [name[:-4] for name in names if name.endswith(".log")]
+    assert 0 < len(segments) < 5
+    assert sorted(name[:-4] for name in names if name.endswith(".idx")) == segments
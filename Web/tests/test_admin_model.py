@@ -0,0 +1,99 @@
+import os
+from typing import Any, Dict, List
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pytest
+from PyQt5.QtCore import QModelIndex, Qt
+from PyQt5.QtWidgets import QApplication
+
+import api
+from admin import UsersModel
+
+
+@pytest.fixture(scope="module")
+def qt_app() -> QApplication:
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def users(monkeypatch: pytest.MonkeyPatch) -> Dict[str, api.User]:
+    stored: Dict[str, api.User] = {}
+
+    class Storage:
+        def get(self, user_id: str) -> Any:
+            return stored.get(user_id)
+
+    monkeypatch.setattr(api.DataManager, "get_data", lambda: {"users": list(stored.values())})
+    monkeypatch.setattr(api.DataManager, "add_listener", lambda listener: None)
+    monkeypatch.setattr(api.DataManager, "storage", lambda: Storage())
+    return stored
+
+
+def add_users(stored: Dict[str, api.User], names: List[str]) -> None:
+    for name in names:
+        stored[f"id-{name}"] = {"id": f"id-{name}", "name": name, "password": ""}
+
+
+def record(model: UsersModel) -> List[tuple]:
+    events: List[tuple] = []
+    model.modelReset.connect(lambda: events.append(("reset",)))
+    model.rowsInserted.connect(lambda parent, first, last: events.append(("inserted", first, last)))
+    model.rowsRemoved.connect(lambda parent, first, last: events.append(("removed", first, last)))
+    model.dataChanged.connect(lambda top, bottom: events.append(("changed", top.row(), bottom.row())))
+    return events
+
+
+# ========== UsersModel =========
+def test_load_pages_rows_in_batches(qt_app: QApplication, users: Dict[str, api.User]) -> None:
+    add_users(users, [f"user{index:04d}" for index in range(UsersModel.BATCH * 2 + 50)])
+    model = UsersModel()
+    events = record(model)
+    model.load()
+    assert events == [("reset",)]
+    assert model.rowCount() == UsersModel.BATCH
+
+    while model.canFetchMore(QModelIndex()):
+        model.fetchMore(QModelIndex())
+    assert model.rowCount() == len(users)
+    assert events[1:] == [
+        ("inserted", UsersModel.BATCH, 2 * UsersModel.BATCH - 1),
+        ("inserted", 2 * UsersModel.BATCH, 2 * UsersModel.BATCH + 49)
+    ]
+
+
+def test_query_resets_to_matching_rows(qt_app: QApplication, users: Dict[str, api.User]) -> None:
+    add_users(users, ["alice", "bob", "alina"])
+    model = UsersModel()
+    model.load()
+    events = record(model)
+    model.set_query("ali")
+    assert events == [("reset",)]
+    assert [model.data(model.index(row), Qt.UserRole) for row in range(model.rowCount())] == ["id-alice", "id-alina"]
+
+
+def test_changes_insert_remove_and_update_rows(qt_app: QApplication, users: Dict[str, api.User]) -> None:
+    add_users(users, ["alice", "bob"])
+    model = UsersModel()
+    model.load()
+    events = record(model)
+
+    model.apply_change({"added": [{"id": "id-carol", "name": "carol", "password": ""}], "removed": [], "changed": []})
+    model.apply_change({"added": [], "removed": ["id-alice"], "changed": []})
+    users["id-bob"]["name"] = "robert"
+    model.apply_change({"added": [], "removed": [], "changed": ["id-bob"]})
+
+    assert events == [("inserted", 2, 2), ("removed", 0, 0), ("changed", 0, 0)]
+    assert "robert" in model.data(model.index(0))
+
+
+def test_rename_out_of_query_removes_row(qt_app: QApplication, users: Dict[str, api.User]) -> None:
+    add_users(users, ["alice", "bob"])
+    model = UsersModel()
+    model.load()
+    model.set_query("ali")
+    events = record(model)
+    users["id-alice"]["name"] = "eve"
+    model.apply_change({"added": [], "removed": [], "changed": ["id-alice"]})
+    assert events == [("removed", 0, 0)]
+    assert model.rowCount() == 0
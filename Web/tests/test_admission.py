@@ -0,0 +1,101 @@
+import pytest
+
+from admission import AdmissionControl, TokenBucket
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_bucket_starts_full_and_reports_the_wait() -> None:
+    bucket = TokenBucket(rate=2, burst=3, now=0)
+    assert [bucket.take(0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take(0) == pytest.approx(0.5)
+    assert bucket.take(0.25) == pytest.approx(0.25)
+    assert bucket.take(0.5) == 0.0
+
+
+def test_bucket_refill_is_capped_at_burst() -> None:
+    bucket = TokenBucket(rate=10, burst=2, now=0)
+    bucket.take(0)
+    bucket.refill(100)
+    assert bucket.tokens == 2
+
+
+def test_zero_rate_disables_admission() -> None:
+    clock = FakeClock()
+    control = AdmissionControl(0, 0, 1, 1, clock=clock)
+    assert all(control.admit("a") == 0.0 for _ in range(100))
+    assert control.load() == 0.0 and len(control) == 0
+
+
+def test_global_bucket_limits_everyone() -> None:
+    clock = FakeClock()
+    control = AdmissionControl(rate=10, burst=2, clock=clock)
+    assert control.admit() == 0.0 and control.admit("a") == 0.0
+    assert control.admit("b") == pytest.approx(0.1)
+    clock.now += 0.1
+    assert control.admit() == 0.0
+
+
+def test_one_session_cannot_starve_the_others() -> None:
+    clock = FakeClock()
+    control = AdmissionControl(rate=100, burst=10, session_rate=1, session_burst=2, clock=clock)
+    assert [control.admit("noisy") for _ in range(2)] == [0.0, 0.0]
+    assert control.admit("noisy") == pytest.approx(1.0)
+    assert control.admit("quiet") == 0.0
+    # Requests without a session only count against the global bucket
+    assert control.admit() == 0.0
+    assert control.load() == pytest.approx(0.4)
+
+
+def test_global_rejection_refunds_the_session_token() -> None:
+    clock = FakeClock()
+    control = AdmissionControl(rate=1, burst=1, session_rate=1, session_burst=3, clock=clock)
+    assert control.admit("a") == 0.0
+    assert control.admit("a") == pytest.approx(1.0)
+    assert control.admit("a") == pytest.approx(1.0)
+    clock.now += 1
+    # Both rejected attempts gave their session token back
+    assert control.admit("a") == 0.0
+
+
+def test_rejected_unknown_sessions_get_no_bucket() -> None:
+    clock = FakeClock()
+    control = AdmissionControl(rate=1, burst=1, session_rate=1, session_burst=1, clock=clock)
+    control.admit("first")
+    for index in range(50):
+        assert control.admit(f"made-up-{index}") > 0
+    assert len(control) == 1
+
+
+def test_idle_buckets_are_evicted_once_full_again() -> None:
+    clock = FakeClock()
+    control = AdmissionControl(rate=100, burst=100, session_rate=1, session_burst=5, clock=clock)
+    control.admit("a")
+    clock.now += 3
+    control.admit("b")
+    assert len(control) == 2
+
+    clock.now += 2
+    control.admit("b")
+    assert len(control) == 1
+    # A recreated bucket starts full, exactly as the evicted one would have been
+    assert [control.admit("a") for _ in range(5)] == [0.0] * 5
+    assert control.admit("a") > 0
+
+
+def test_load_recovers_over_time() -> None:
+    clock = FakeClock()
+    control = AdmissionControl(rate=2, burst=4, clock=clock)
+    for _ in range(4):
+        control.admit()
+    assert control.load() == pytest.approx(1.0)
+    clock.now += 1
+    assert control.load() == pytest.approx(0.5)
+    clock.now += 10
+    assert control.load() == 0.0
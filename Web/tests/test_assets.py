@@ -0,0 +1,62 @@
+import gzip
+from typing import Any
+
+import pytest
+
+from assets import Asset, AssetStore, choose_encoding
+
+SCRIPT = b"console.log('SeeMe');\n" * 50
+
+
+def store(tmp_path: Any, script: bytes = SCRIPT) -> AssetStore:
+    (tmp_path / "js").mkdir(exist_ok=True)
+    (tmp_path / "js" / "app.js").write_bytes(script)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG not really")
+    (tmp_path / "index.html").write_text(
+        '<script src="public/js/app.js"></script><link href="/public/missing.css"><img src="public/logo.png">',
+        encoding="utf-8"
+    )
+    assets = AssetStore(str(tmp_path))
+    assets.load()
+    return assets
+
+
+def test_urls_carry_a_content_hash_and_index_points_at_them(tmp_path: Any) -> None:
+    assets = store(tmp_path)
+    script, immutable = assets.get("js/app.js")
+    assert not immutable
+    assert script.url == f"/public/js/app.{script.digest[:10]}.js"
+    assert assets.get(script.url[len("/public/"):]) == (script, True)
+
+    index = assets.index.variants["identity"].decode("utf-8")
+    assert f'src="{script.url}"' in index
+    assert 'src="/public/logo.' in index
+    # Files that do not exist keep their plain URL
+    assert 'href="/public/missing.css"' in index
+    assert assets.get("index.html") == (assets.index, False)
+
+
+def test_changed_content_gets_a_new_url(tmp_path: Any) -> None:
+    before = store(tmp_path).get("js/app.js")[0].url
+    assert store(tmp_path, SCRIPT + b"// rebuilt\n").get("js/app.js")[0].url != before
+
+
+def test_only_text_is_compressed_and_only_when_smaller(tmp_path: Any) -> None:
+    assets = store(tmp_path)
+    script = assets.get("js/app.js")[0]
+    assert gzip.decompress(script.variants["gzip"]) == SCRIPT
+    assert set(assets.get("logo.png")[0].variants) == {"identity"}
+    assert set(Asset("tiny.js", "/public/tiny.js", b"x").variants) == {"identity"}
+
+
+@pytest.mark.parametrize("accepted, expected", [
+    ({"br": 1.0, "gzip": 1.0}, "br"),
+    ({"br": 0.0, "gzip": 0.5}, "gzip"),
+    ({"gzip": 1.0}, "gzip"),
+    ({"gzip": 0.0}, "identity"),
+    ({}, "identity"),
+])
+def test_choose_encoding_prefers_br_then_gzip(accepted: dict, expected: str) -> None:
+    asset = Asset("app.js", "/public/app.js", SCRIPT)
+    asset.variants["br"] = b"brotli stand-in"
+    assert choose_encoding(asset, accepted) == expected
@@ -0,0 +1,68 @@
+from typing import Any, List, Tuple
+
+import bcrypt
+import pytest
+
+from api import (
+    DataManager, EnhancedPasswordManager, JsonStorage,
+    read_import_file, write_import_results, import_results_path
+)
+
+
+def test_reads_csv_with_header(tmp_path: Any) -> None:
+    path = tmp_path / "users.csv"
+    # Spreadsheet exports often start with a BOM
+    path.write_text("﻿name,password\nalice, secret \nbob,hunter2\n", encoding="utf-8")
+    assert read_import_file(str(path)) == [("alice", "secret"), ("bob", "hunter2")]
+
+
+def test_reads_jsonl_and_skips_blank_lines(tmp_path: Any) -> None:
+    path = tmp_path / "users.JSONL"
+    path.write_text('{"name": "alice", "password": "secret"}\n\n{"name": "bob", "password": 1234}\n', encoding="utf-8")
+    assert read_import_file(str(path)) == [("alice", "secret"), ("bob", "1234")]
+
+
+def test_rejects_rows_without_name_or_password(tmp_path: Any) -> None:
+    path = tmp_path / "users.csv"
+    path.write_text("name,password\nalice,secret\n,orphan\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="Row 2"):
+        read_import_file(str(path))
+
+
+def test_results_are_written_next_to_the_input(tmp_path: Any) -> None:
+    path = import_results_path(str(tmp_path / "users.csv"))
+    assert path == str(tmp_path / "users.results.csv")
+
+    write_import_results(path, [{"name": "alice", "id": "A"}, {"name": "bob", "id": "B"}])
+    with open(path, encoding="utf-8") as file:
+        assert file.read().splitlines() == ["name,id", "alice,A", "bob,B"]
+
+
+def test_hash_many_keeps_input_order_and_reports_progress() -> None:
+    credentials = [("secret", "alice", "A"), ("hunter2", "bob", "B"), ("letmein", "carol", "C")]
+    progress: List[Tuple[int, int]] = []
+    hashes = EnhancedPasswordManager.hash_many(credentials, 2, lambda done, total: progress.append((done, total)))
+
+    assert len(hashes) == len(credentials)
+    for (password, name, user_id), password_hash in zip(credentials, hashes):
+        assert bcrypt.checkpw(f"{password}:{name}:{user_id}".encode("utf-8"), password_hash.encode("utf-8"))
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+
+
+def test_new_users_inserts_once_and_notifies(tmp_path: Any, monkeypatch: Any) -> None:
+    storage = JsonStorage(str(tmp_path / "data.json"))
+    monkeypatch.setattr(DataManager, "_storage", storage)
+    monkeypatch.setattr(DataManager, "_listeners", [])
+    changes: List[Any] = []
+    DataManager.add_listener(changes.append)
+
+    assert DataManager.new_users([]) == []
+    results = DataManager.new_users([("alice", "secret"), ("bob", "hunter2")], 1)
+
+    assert [result["name"] for result in results] == ["alice", "bob"]
+    assert len({result["id"] for result in results}) == 2
+    assert len(changes) == 1 and sorted(user["id"] for user in changes[0]["added"]) == sorted(result["id"] for result in results)
+    for result, password in zip(results, ("secret", "hunter2")):
+        stored = storage.get(result["id"])
+        assert stored is not None and stored["name"] == result["name"]
+        assert EnhancedPasswordManager.verify_password(password, result["name"], result["id"], stored["password"])
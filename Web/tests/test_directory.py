@@ -0,0 +1,138 @@
+from typing import Any, List, Optional, Tuple
+
+import pytest
+
+import directory as directory_module
+from directory import UserDirectory, UserIndex
+
+
+def build(names: List[str]) -> UserDirectory:
+    directory = UserDirectory()
+    directory.load((f"id{index}", name) for index, name in enumerate(names))
+    return directory
+
+
+def walk(directory: UserDirectory, limit: int, prefix: str = "") -> List[List[str]]:
+    pages: List[List[str]] = []
+    cursor: Optional[str] = None
+    while True:
+        page, cursor = directory.page(limit, cursor, prefix)
+        pages.append([name for _, name in page])
+        if cursor is None:
+            return pages
+
+
+def test_pages_are_sorted_case_insensitively() -> None:
+    directory = build(["carol", "Bob", "alice", "dave", "Eve"])
+    assert walk(directory, 2) == [["alice", "Bob"], ["carol", "dave"], ["Eve"]]
+
+
+def test_exact_last_page_has_no_next_cursor() -> None:
+    directory = build(["a", "b", "c", "d"])
+    assert walk(directory, 2) == [["a", "b"], ["c", "d"]]
+
+
+def test_prefix_limits_the_walk() -> None:
+    directory = build(["anna", "Andrew", "bob", "amy", "ann"])
+    assert walk(directory, 2, "an") == [["Andrew", "ann"], ["anna"]]
+    assert walk(directory, 10, "z") == [[]]
+
+
+def test_cursor_survives_changes_between_pages() -> None:
+    directory = build(["a", "b", "c", "d", "e"])
+    page, cursor = directory.page(2)
+    assert [name for _, name in page] == ["a", "b"]
+
+    # Removing the cursor entry and adding users before and after it
+    directory.remove("id1")
+    directory.put("id5", "aa")
+    directory.put("id6", "bb")
+    page, cursor = directory.page(10, cursor)
+    assert [name for _, name in page] == ["bb", "c", "d", "e"]
+    assert cursor is None
+
+
+def test_same_names_are_told_apart_by_id() -> None:
+    directory = build(["sam", "sam", "sam"])
+    first, cursor = directory.page(2)
+    second, cursor = directory.page(2, cursor)
+    assert cursor is None
+    assert sorted(user_id for user_id, _ in first + second) == ["id0", "id1", "id2"]
+
+
+def test_rename_moves_the_entry() -> None:
+    directory = build(["alice", "bob"])
+    directory.put("id0", "zoe")
+    assert len(directory) == 2
+    assert walk(directory, 10) == [["bob", "zoe"]]
+
+
+def test_selective_accept_stops_at_max_scan_with_a_cursor() -> None:
+    directory = build([f"user{index:02}" for index in range(10)])
+    accept_odd = lambda user_id: int(user_id[2:]) % 2 == 1
+    page, cursor = directory.page(10, None, "", accept_odd, max_scan=4)
+    assert [user_id for user_id, _ in page] == ["id1", "id3"]
+    assert cursor is not None
+
+    page, cursor = directory.page(10, cursor, "", accept_odd, max_scan=100)
+    assert [user_id for user_id, _ in page] == ["id5", "id7", "id9"]
+    assert cursor is None
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm90IGpzb24", UserDirectory.encode_cursor(("a", "b"))[:-4]])
+def test_invalid_cursor_raises_value_error(cursor: str) -> None:
+    with pytest.raises(ValueError):
+        build(["a"]).page(1, cursor)
+
+
+def test_cursor_round_trips_non_ascii_names() -> None:
+    entry: Tuple[str, str] = ("张三", "id0")
+    assert UserDirectory.decode_cursor(UserDirectory.encode_cursor(entry)) == entry
+
+
+def test_load_sorts_once_and_matches_incremental_puts(monkeypatch: Any) -> None:
+    names = ["carol", "Bob", "alice", "bob", "Eve", "张三"]
+    incremental = UserDirectory()
+    for index, name in enumerate(names):
+        incremental.put(f"id{index}", name)
+
+    def no_insort(*args: Any) -> None:
+        raise AssertionError("load must not insert one entry at a time")
+
+    monkeypatch.setattr(directory_module, "insort", no_insort)
+    assert walk(build(names), 4) == walk(incremental, 4)
+    assert len(build(names)) == len(names)
+
+
+def test_put_many_adds_and_renames_in_one_pass() -> None:
+    directory = build(["bob", "dave"])
+    directory.put_many([("id0", "zed"), ("id2", "alice"), ("id3", "carol")])
+    assert walk(directory, 10) == [["alice", "carol", "dave", "zed"]]
+    assert len(directory) == 4
+
+
+# ========== UserIndex =========
+def test_prefix_matches_come_first_in_name_order() -> None:
+    index = UserIndex()
+    index.load([("1", "Bobby"), ("2", "alice"), ("3", "Alina"), ("4", "Malice")])
+    assert index.search("ali") == ["2", "3", "4"]
+    assert index.search("AL") == ["2", "3"]
+
+
+def test_removed_and_renamed_names_are_not_found() -> None:
+    index = UserIndex()
+    index.put("1", "alice")
+    index.put("2", "alina")
+    index.put("3", "malice")
+    index.remove("1")
+    index.put("3", "bob")
+    assert index.search("ali") == ["2"]
+    assert index.search("lic") == []
+
+
+def test_reload_drops_the_previous_trigrams() -> None:
+    index = UserIndex()
+    index.load([("1", "alice")])
+    index.load([("2", "bob")])
+    assert index.search("lic") == []
+    assert index.search("bob") == ["2"]
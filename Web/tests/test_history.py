@@ -0,0 +1,53 @@
+from history import ActivityHistory, UserHistory, downsample
+
+
+def test_ring_grows_with_entries() -> None:
+    ring = UserHistory(8192)
+    ring.append(1.0, 1)
+    assert len(ring.times) == 1 and len(ring.titles) == 1
+
+
+def test_ring_wraps_once_full() -> None:
+    ring = UserHistory(3)
+    evicted = [ring.append(float(index), index + 1) for index in range(5)]
+    assert evicted == [None, None, None, 1, 2]
+    assert len(ring.times) == 3
+    assert [ring.title_at(index) for index in range(ring.size)] == [3, 4, 5]
+
+
+def test_query_keeps_newest_changes() -> None:
+    history = ActivityHistory(4)
+    for index in range(10):
+        history.record("user", float(index), f"title {index}")
+    assert [entry["active_window"] for entry in history.query("user", 0, 100)] == [
+        "title 6", "title 7", "title 8", "title 9"
+    ]
+
+
+def test_remove_releases_titles() -> None:
+    history = ActivityHistory(4)
+    for index in range(10):
+        history.record("user", float(index), f"title {index}")
+    history.remove("user")
+    assert len(history.titles) == 0
+    assert history.query("user", 0, 100) == []
+
+
+def test_downsample_picks_longest_title_per_bucket() -> None:
+    entries = [
+        {"time": 0.0, "active_window": "a"},
+        {"time": 4.0, "active_window": "b"},
+        {"time": 5.0, "active_window": "a"},
+        {"time": 12.0, "active_window": "c"}
+    ]
+    assert downsample(entries, 0.0, 20.0, 10.0) == [
+        {"time": 0.0, "active_window": "a"},
+        {"time": 10.0, "active_window": "c"}
+    ]
+
+
+def test_downsample_matches_history_query() -> None:
+    history = ActivityHistory(16)
+    for index, title in enumerate(["a", "b", "a", "c", None, "c"]):
+        history.record("user", index * 3.0, title)
+    assert history.downsample("user", 1.0, 17.0, 4.0) == downsample(history.query("user", 1.0, 17.0), 1.0, 17.0, 4.0)
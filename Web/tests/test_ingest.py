@@ -0,0 +1,59 @@
+from typing import List, Optional, Tuple
+
+from ingest import IngestServer, Connection, REAUTH_INTERVAL, NOT_LOGGED_IN
+
+
+class FakeSessions:
+    def __init__(self) -> None:
+        self.valid: bool = True
+        self.lookups: int = 0
+        self.samples: List[Tuple[str, str]] = []
+        self.now: float = 0.0
+
+    def authenticate(self, token: str) -> Optional[str]:
+        self.lookups += 1
+        return "user" if self.valid and token == "token" else None
+
+    def ingest(self, user_id: str, update_time: float, active_window: str) -> None:
+        self.samples.append((user_id, active_window))
+
+    def touch(self, user_id: str, update_time: float) -> bool:
+        return True
+
+
+def make_server(fake: FakeSessions) -> IngestServer:
+    return IngestServer(fake.authenticate, fake.ingest, fake.touch, clock=lambda: fake.now)
+
+
+def test_frames_reuse_the_authenticated_session() -> None:
+    fake = FakeSessions()
+    server = make_server(fake)
+    connection = Connection()
+    assert server._handle_frame(connection, {"type": "auth", "token": "token"})["status"] == "success"
+    for index in range(5):
+        result = server._handle_frame(connection, {"type": "upload", "active_window": f"window {index}"})
+        assert result["status"] == "success"
+    assert fake.lookups == 1
+    assert len(fake.samples) == 5
+
+
+def test_session_is_checked_again_after_interval() -> None:
+    fake = FakeSessions()
+    server = make_server(fake)
+    connection = Connection()
+    server._handle_frame(connection, {"type": "auth", "token": "token"})
+    fake.now = REAUTH_INTERVAL
+    assert server._handle_frame(connection, {"type": "heartbeat"})["status"] == "success"
+    assert fake.lookups == 2
+
+    fake.valid = False
+    fake.now = 2 * REAUTH_INTERVAL
+    assert server._handle_frame(connection, {"type": "heartbeat"})["message"] == NOT_LOGGED_IN
+    assert connection.user_id is None
+
+
+def test_frames_before_auth_are_rejected() -> None:
+    fake = FakeSessions()
+    result = make_server(fake)._handle_frame(Connection(), {"type": "upload", "active_window": "window"})
+    assert result["message"] == NOT_LOGGED_IN
+    assert fake.samples == []
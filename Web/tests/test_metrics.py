@@ -0,0 +1,105 @@
+from threading import Barrier, Thread
+from typing import Any, Callable, List
+
+import pytest
+
+from log import Logger, _configure
+from metrics import Counter, Histogram, Registry
+
+
+def in_threads(count: int, work: Callable[[], None]) -> None:
+    threads = [Thread(target=work) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+# ========== Cells =========
+def test_counter_sums_the_cells_of_live_and_exited_threads() -> None:
+    counter = Counter("jobs_total", "Jobs", ("kind",))
+    in_threads(8, lambda: [counter.inc(1, ("a",)) for _ in range(1000)])
+    assert counter._cells.collect() == {("a",): [8000.0]}
+
+    # Threads still running are read from their own cells
+    ready, done = Barrier(3), Barrier(3)
+
+    def live() -> None:
+        counter.inc(2, ("b",))
+        ready.wait()
+        done.wait()
+
+    threads = [Thread(target=live) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    counter.inc(1, ("a",))
+    assert counter._cells.collect() == {("a",): [8001.0], ("b",): [4.0]}
+    done.wait()
+    for thread in threads:
+        thread.join()
+
+
+def test_exited_threads_are_folded_once_enough_pile_up() -> None:
+    counter = Counter("requests_total", "Requests")
+    counter._cells._fold_at = 4
+    for _ in range(5):
+        in_threads(1, counter.inc)
+    # The fifth thread to register found four exited ones and folded them away
+    assert len(counter._cells._cells) == 1
+    counter.inc()
+    assert counter._cells.collect() == {(): [6.0]}
+    assert len(counter._cells._cells) == 1
+
+
+# ========== Prometheus text =========
+def test_counter_and_gauge_render_with_escaped_labels() -> None:
+    registry = Registry()
+    counter = registry.counter("http_requests_total", "HTTP requests", ("route", "status"))
+    registry.gauge("sessions_active", "Live sessions", lambda: 3)
+    counter.inc(labels=("/upload", "200"))
+    counter.inc(2.5, ("/say \"hi\"\n", "500"))
+
+    assert registry.render() == "\n".join([
+        "# HELP http_requests_total HTTP requests",
+        "# TYPE http_requests_total counter",
+        'http_requests_total{route="/say \\"hi\\"\\n",status="500"} 2.5',
+        'http_requests_total{route="/upload",status="200"} 1',
+        "# HELP sessions_active Live sessions",
+        "# TYPE sessions_active gauge",
+        "sessions_active 3",
+    ]) + "\n"
+
+
+def test_histogram_buckets_are_cumulative() -> None:
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, ("/",))
+    assert histogram.render() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/",le="0.1"} 2',
+        'latency_seconds_bucket{route="/",le="1"} 3',
+        'latency_seconds_bucket{route="/",le="+Inf"} 4',
+        'latency_seconds_sum{route="/"} 2.65',
+        'latency_seconds_count{route="/"} 4',
+    ]
+
+
+# ========== Logging =========
+@pytest.mark.parametrize("level, expected", [
+    ("debug", ["debug", "info", "warning", "error"]),
+    ("warning", ["warning", "error"]),
+    ("bogus", ["info", "warning", "error"]),
+    ("off", []),
+])
+def test_logger_filters_by_level(level: str, expected: List[str], capsys: Any) -> None:
+    logger = Logger(_configure(f"seeme-test-{level}", level).getChild("Tag"))
+    logger.debug("debug")
+    logger.info("info", user_id="a")
+    logger.warning("warning")
+    logger.error("error")
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split(" ")[2] for line in lines] == expected
+    if "info" in expected:
+        assert "[info] [Tag] info user_id=a" in lines
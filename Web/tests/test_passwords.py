@@ -0,0 +1,128 @@
+from threading import Event
+from typing import Any, List
+
+import bcrypt
+import pytest
+
+import api
+from api import CredentialCache, DataManager, EnhancedPasswordManager, HashPool, HashPoolBusy
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now: float = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+# ========== HashPool =========
+def test_pool_rejects_work_beyond_workers_plus_queue() -> None:
+    pool = HashPool(1, 1)
+    release = Event()
+    running = [pool.submit(release.wait, 5), pool.submit(release.wait, 5)]
+    with pytest.raises(HashPoolBusy):
+        pool.submit(release.wait, 5)
+
+    release.set()
+    assert [future.result(5) for future in running] == [True, True]
+    # Slots come back as jobs finish
+    assert pool.run(lambda value: value * 2, 21) == 42
+
+
+# ========== CredentialCache =========
+def test_cache_hits_only_for_the_same_credentials_and_hash() -> None:
+    cache = CredentialCache(60, 10)
+    cache.put("secret", "alice", "A", "$hash1")
+    assert cache.get("secret", "alice", "A", "$hash1")
+    assert not cache.get("wrong", "alice", "A", "$hash1")
+    assert not cache.get("secret", "alicia", "A", "$hash1")
+    assert not cache.get("secret", "alice", "B", "$hash1")
+
+    # The password changed: the entry no longer counts and is dropped
+    assert not cache.get("secret", "alice", "A", "$hash2")
+    assert not cache.get("secret", "alice", "A", "$hash1")
+
+
+def test_cache_entries_expire_and_the_oldest_are_evicted() -> None:
+    clock = Clock()
+    cache = CredentialCache(60, 2, clock)
+    cache.put("one", "alice", "A", "$hash")
+    clock.now += 59
+    assert cache.get("one", "alice", "A", "$hash")
+    clock.now += 1
+    assert not cache.get("one", "alice", "A", "$hash")
+
+    for password in ("one", "two", "three"):
+        cache.put(password, "alice", "A", "$hash")
+    assert [cache.get(password, "alice", "A", "$hash") for password in ("one", "two", "three")] == [False, True, True]
+
+
+def test_cache_never_keeps_the_plain_password() -> None:
+    cache = CredentialCache(60, 10)
+    cache.put("hunter2", "alice", "A", "$hash")
+    assert all(b"hunter2" not in digest for digest in cache._entries)
+
+
+def test_invalidate_drops_every_entry_of_the_user() -> None:
+    cache = CredentialCache(60, 10)
+    cache.put("old", "alice", "A", "$hash")
+    cache.put("new", "alice", "A", "$hash")
+    cache.put("secret", "bob", "B", "$hash")
+    cache.invalidate("A")
+    assert not cache.get("old", "alice", "A", "$hash")
+    assert not cache.get("new", "alice", "A", "$hash")
+    assert cache.get("secret", "bob", "B", "$hash")
+
+
+# ========== EnhancedPasswordManager =========
+@pytest.fixture
+def checks(monkeypatch: Any) -> List[bytes]:
+    """Every bcrypt check verify_password makes, with a fresh cache."""
+    made: List[bytes] = []
+    check = EnhancedPasswordManager._check
+
+    def counting_check(combined: bytes, stored_hash: bytes) -> bool:
+        made.append(combined)
+        return check(combined, stored_hash)
+
+    monkeypatch.setattr(EnhancedPasswordManager, "_check", staticmethod(counting_check))
+    monkeypatch.setattr(EnhancedPasswordManager, "cache", CredentialCache(60, 10))
+    return made
+
+
+def hashed(password: str, username: str, user_id: str) -> str:
+    return bcrypt.hashpw(f"{password}:{username}:{user_id}".encode("utf-8"), bcrypt.gensalt(4)).decode("utf-8")
+
+
+def test_verified_logins_skip_bcrypt_until_the_password_changes(checks: List[bytes]) -> None:
+    old_hash = hashed("secret", "alice", "A")
+    assert EnhancedPasswordManager.verify_password("secret", "alice", "A", old_hash)
+    assert EnhancedPasswordManager.verify_password("secret", "alice", "A", old_hash)
+    assert len(checks) == 1
+
+    # Failures are never cached
+    assert not EnhancedPasswordManager.verify_password("wrong", "alice", "A", old_hash)
+    assert not EnhancedPasswordManager.verify_password("wrong", "alice", "A", old_hash)
+    assert len(checks) == 3
+
+    new_hash = hashed("changed", "alice", "A")
+    assert not EnhancedPasswordManager.verify_password("secret", "alice", "A", new_hash)
+    assert EnhancedPasswordManager.verify_password("changed", "alice", "A", new_hash)
+    assert len(checks) == 5
+
+
+def test_changed_users_are_invalidated_on_refresh(checks: List[bytes], tmp_path: Any, monkeypatch: Any) -> None:
+    storage = api.JsonStorage(str(tmp_path / "data.json"))
+    monkeypatch.setattr(DataManager, "_storage", storage)
+    monkeypatch.setattr(DataManager, "_listeners", [])
+    password_hash = hashed("secret", "alice", "A")
+    storage.insert([{"name": "alice", "id": "A", "password": password_hash}])
+    DataManager.refresh()
+
+    assert EnhancedPasswordManager.verify_password("secret", "alice", "A", password_hash)
+    # Another process rewrote the user (same hash here), so the cached login must be checked again
+    storage.update({"name": "alice", "id": "A", "password": password_hash})
+    DataManager.refresh()
+    assert EnhancedPasswordManager.verify_password("secret", "alice", "A", password_hash)
+    assert len(checks) == 2
@@ -0,0 +1,412 @@
+import gzip
+import os
+import sys
+from threading import Event
+from typing import Any, Iterator, List, Optional
+
+import pytest
+
+from activity_log import ActivityLog
+from api import CredentialCache, HashPool
+from assets import AssetStore
+from admission import AdmissionControl
+from sessions import SessionManager
+from wire import (
+    SampleEncoder, TitleDictionaries, CONTENT_TYPE as WIRE_TYPE, HEADER, SAMPLE, LENGTH, MAGIC, VERSION, DEFINE
+)
+
+# Users seeded by the `server` fixture, all able to log in
+credentials: List[dict] = []
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory: pytest.TempPathFactory) -> Iterator[Any]:
+    """server.py imported inside a scratch directory seeded with users."""
+    from bench import seed_users
+
+    directory = tmp_path_factory.mktemp("server")
+    credentials[:] = seed_users(str(directory), 2, 2, 4)
+    previous = os.getcwd()
+    os.chdir(directory)
+    patch = pytest.MonkeyPatch()
+    for name, value in {
+        "SEEME_LOG_LEVEL": "off", "SEEME_WS_PORT": "0", "SEEME_STORAGE": "json",
+        "SEEME_INGEST_RATE": "0", "SEEME_LOGIN_RATE": "0"
+    }.items():
+        patch.setenv(name, value)
+    sys.modules.pop("server", None)
+    import server as module
+    module.init_users()
+    module.restore_presence()
+    yield module
+    module.activity_log.close()
+    sys.modules.pop("server", None)
+    patch.undo()
+    os.chdir(previous)
+
+
+@pytest.fixture
+def client(server: Any) -> Any:
+    return server.app.test_client()
+
+
+def login(server: Any, client: Any, index: int = 0) -> str:
+    return client.post("/login", json=credentials[index]).get_json()["token"]
+
+
+def current_window(server: Any, index: int = 0) -> str:
+    with server.presence.locked(credentials[index]["user_id"]) as user:
+        return user.active_window
+
+
+# ========== Admission =========
+def test_throttled_uploads_get_429_with_retry_after(server: Any, client: Any, monkeypatch: Any) -> None:
+    token = login(server, client)
+    monkeypatch.setattr(server, "ingest_admission", AdmissionControl(100, 100, 0.5, 1))
+    headers = {server.TOKEN_HEADER: token}
+    assert client.post("/upload", json={"token": token, "active_window": "Editor"}, headers=headers).status_code == 200
+
+    response = client.post("/upload", json={"token": token, "active_window": "Editor"}, headers=headers)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+
+
+# ========== /login =========
+def test_login_answers_503_while_the_hash_pool_is_full(server: Any, client: Any, monkeypatch: Any) -> None:
+    pool = HashPool(1, 0)
+    release = Event()
+    blocker = pool.submit(release.wait, 5)
+    monkeypatch.setattr(server.EnhancedPasswordManager, "pool", pool)
+    monkeypatch.setattr(server.EnhancedPasswordManager, "cache", CredentialCache(60, 10))
+    try:
+        response = client.post("/login", json=credentials[1])
+        assert response.status_code == 503
+        assert response.get_json() == {"status": "error", "message": "Server busy, retry later"}
+    finally:
+        release.set()
+        blocker.result(5)
+    assert client.post("/login", json=credentials[1]).get_json()["status"] == "success"
+
+
+# ========== Assets =========
+@pytest.fixture
+def asset_store(server: Any, tmp_path: Any, monkeypatch: Any) -> AssetStore:
+    (tmp_path / "app.js").write_bytes(b"console.log('SeeMe');\n" * 50)
+    (tmp_path / "index.html").write_text('<script src="public/app.js"></script>', encoding="utf-8")
+    store = AssetStore(str(tmp_path))
+    store.load()
+    monkeypatch.setattr(server, "assets", store)
+    return store
+
+
+def test_hashed_assets_are_cached_forever_and_plain_ones_revalidated(server: Any, client: Any, asset_store: AssetStore) -> None:
+    script = asset_store.get("app.js")[0]
+    hashed = client.get(script.url)
+    assert hashed.headers["Cache-Control"] == f"public, max-age={server.ASSET_MAX_AGE}, immutable"
+    plain = client.get("/public/app.js")
+    assert plain.headers["Cache-Control"] == "no-cache"
+    assert hashed.get_data() == plain.get_data() == script.variants["identity"]
+    assert hashed.headers["Content-Type"].startswith("text/javascript")
+
+    home = client.get("/")
+    assert home.headers["Cache-Control"] == "no-cache"
+    assert script.url in home.get_data(as_text=True)
+    assert client.get("/public/missing.js").status_code == 404
+
+
+def test_assets_are_sent_in_the_best_accepted_encoding(client: Any, asset_store: AssetStore) -> None:
+    script = asset_store.get("app.js")[0]
+    script.variants["br"] = b"brotli stand-in"
+
+    gzipped = client.get(script.url, headers={"Accept-Encoding": "gzip, deflate"})
+    assert gzipped.headers["Content-Encoding"] == "gzip" and gzipped.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(gzipped.get_data()) == script.variants["identity"]
+
+    brotli = client.get(script.url, headers={"Accept-Encoding": "gzip, br"})
+    assert brotli.headers["Content-Encoding"] == "br" and brotli.get_data() == b"brotli stand-in"
+
+    plain = client.get(script.url, headers={"Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in plain.headers
+    assert len({response.headers["ETag"] for response in (gzipped, brotli, plain)}) == 3
+
+
+def test_asset_etag_gets_304_for_the_same_encoding_only(client: Any, asset_store: AssetStore) -> None:
+    url = asset_store.get("app.js")[0].url
+    etag = client.get(url, headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+    revalidated = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert revalidated.status_code == 304 and revalidated.get_data() == b""
+    assert revalidated.headers["ETag"] == etag and revalidated.headers["Vary"] == "Accept-Encoding"
+    # The identity body is a different representation
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+
+# ========== Binary uploads =========
+def test_binary_upload_resyncs_after_lost_titles(server: Any, client: Any, monkeypatch: Any) -> None:
+    token = login(server, client)
+    headers = {"Content-Type": WIRE_TYPE, server.TOKEN_HEADER: token}
+    encoder = SampleEncoder()
+
+    body, defined = encoder.encode([(server.time(), "Binary Editor")], server.time())
+    assert client.post("/upload", data=body, headers=headers).get_json()["status"] == "success"
+    encoder.confirm(defined)
+    assert current_window(server) == "Binary Editor"
+
+    # As after a server restart: the session's dictionary is gone
+    monkeypatch.setattr(server, "title_dictionaries", TitleDictionaries(server.title_dictionaries.max_sessions))
+    body, _ = encoder.encode([(server.time(), "Binary Editor")], server.time())
+    assert client.post("/upload", data=body, headers=headers).get_json()["resync_titles"] is True
+
+    encoder.forget()
+    body, defined = encoder.encode([(server.time(), "Binary Editor")], server.time())
+    assert client.post("/upload", data=body, headers=headers).get_json()["accepted"] == 1
+
+
+def test_binary_upload_rejects_malformed_bodies(server: Any, client: Any) -> None:
+    headers = {"Content-Type": WIRE_TYPE, server.TOKEN_HEADER: login(server, client)}
+    result = client.post("/upload/batch", data=b"SM", headers=headers).get_json()
+    assert result == {"status": "error", "message": "Truncated header"}
+
+
+@pytest.mark.parametrize("route", ["/upload", "/upload/batch"])
+@pytest.mark.parametrize("age", [float("nan"), float("inf")])
+def test_binary_upload_rejects_non_finite_ages(server: Any, client: Any, route: str, age: float) -> None:
+    headers = {"Content-Type": WIRE_TYPE, server.TOKEN_HEADER: login(server, client)}
+    before = current_window(server)
+    body = HEADER.pack(MAGIC, VERSION, 1, 7) + SAMPLE.pack(age, DEFINE) + LENGTH.pack(3) + b"NaN"
+    assert client.post(route, data=body, headers=headers).get_json() == {"status": "error", "message": "Bad sample time"}
+    assert current_window(server) == before
+    assert "NaN" not in client.get("/users/status").get_data(as_text=True)
+
+
+# ========== /upload =========
+def test_upload_updates_presence(server: Any, client: Any) -> None:
+    token = login(server, client)
+    response = client.post("/upload", json={"token": token, "active_window": "Editor"})
+    assert response.get_json()["status"] == "success"
+    assert current_window(server) == "Editor"
+
+
+@pytest.mark.parametrize("body", [
+    {"active_window": 123},
+    {"active_window": None},
+    {},
+    ["not", "an", "object"]
+])
+def test_upload_rejects_invalid_window(server: Any, client: Any, body: Any) -> None:
+    token = login(server, client)
+    client.post("/upload", json={"token": token, "active_window": "Before"})
+    if isinstance(body, dict):
+        body = {"token": token, **body}
+    response = client.post("/upload", json=body)
+    assert response.status_code == 400
+    assert current_window(server) == "Before"
+    # The user keeps working afterwards
+    assert client.post("/upload/heartbeat", headers={"X-SeeMe-Token": token}).status_code == 200
+
+
+# ========== /upload/heartbeat =========
+def heartbeat(server: Any, client: Any, token: Optional[str]) -> dict:
+    headers = {server.TOKEN_HEADER: token} if token is not None else {}
+    return client.post("/upload/heartbeat", headers=headers).get_json()
+
+
+def test_heartbeat_refreshes_a_known_user(server: Any, client: Any) -> None:
+    server.on_users_changed({"added": [{"id": "beating", "name": "beating", "password": ""}], "removed": [], "changed": []})
+    token = server.sessions.create("beating", "beating")
+    now = server.time()
+    server.ingest_samples("beating", [(now - 5, "Heartbeat Editor")])
+    server.expire_presence(now + server.ONLINE_TIMEOUT)
+    assert not server.presence.get("beating").online
+
+    assert heartbeat(server, client, token)["message"] == "Heartbeat received"
+    user = server.presence.get("beating")
+    assert user.online and user.active_window == "Heartbeat Editor" and user.update_time >= now
+    # Going offline and coming back are both in the history ring
+    entries = server.history.query("beating", now - 5, server.time() + 1)
+    assert [entry["active_window"] for entry in entries][-2:] == [None, "Heartbeat Editor"]
+
+
+def test_heartbeat_without_a_known_window_asks_for_a_full_upload(server: Any, client: Any) -> None:
+    server.on_users_changed({"added": [{"id": "unseen", "name": "unseen", "password": ""}], "removed": [], "changed": []})
+    token = server.sessions.create("unseen", "unseen")
+    result = heartbeat(server, client, token)
+    assert result["message"] == "Full upload required" and result["resync"] is True
+    assert server.presence.get("unseen").active_window == server.UNKNOWN_WINDOW
+
+
+def test_heartbeat_after_the_session_expired_is_refused(server: Any, client: Any, monkeypatch: Any) -> None:
+    clock = [1000.0]
+    monkeypatch.setattr(server, "sessions", SessionManager(60, lambda: clock[0]))
+    token = login(server, client)
+    assert heartbeat(server, client, token)["status"] == "success"
+
+    clock[0] += 60
+    before = server.presence.get(credentials[0]["user_id"]).update_time
+    assert heartbeat(server, client, token) == {"status": "error", "message": "User not logged in"}
+    assert server.presence.get(credentials[0]["user_id"]).update_time == before
+
+
+@pytest.mark.parametrize("token", [None, "", "forged-token"])
+def test_heartbeat_without_a_session_is_refused(server: Any, client: Any, token: Optional[str]) -> None:
+    version = server.presence.version
+    assert heartbeat(server, client, token) == {"status": "error", "message": "User not logged in"}
+    assert server.presence.version == version
+
+
+# ========== /upload/batch =========
+def test_batch_applies_samples_in_order(server: Any, client: Any) -> None:
+    # A user the other tests have not uploaded for, since older samples never replace newer ones
+    token = login(server, client, 1)
+    response = client.post("/upload/batch", json={"token": token, "sent_at": 100.0, "samples": [
+        {"time": 98.0, "active_window": "First"}, {"time": 99.0, "active_window": "Second"}
+    ]})
+    assert response.get_json()["accepted"] == 2
+    assert current_window(server, 1) == "Second"
+
+
+@pytest.mark.parametrize("body", [
+    {"sent_at": "yesterday", "samples": [{"time": 1.0, "active_window": "Batch"}]},
+    {"sent_at": 1.0, "samples": [{"time": "later", "active_window": "Batch"}]},
+    {"sent_at": 1.0, "samples": [{"active_window": "Batch"}]},
+    {"sent_at": 1.0, "samples": "none"}
+])
+def test_batch_rejects_invalid_data(server: Any, client: Any, body: dict) -> None:
+    token = login(server, client)
+    response = client.post("/upload/batch", json={"token": token, **body})
+    assert response.status_code == 400
+
+
+def test_batch_rejects_non_finite_times(server: Any, client: Any) -> None:
+    token = login(server, client)
+    response = client.post(
+        "/upload/batch", data=f'{{"token": "{token}", "sent_at": NaN, "samples": [{{"time": 1, "active_window": "x"}}]}}',
+        content_type="application/json"
+    )
+    assert response.status_code == 400
+
+
+# ========== Presence lifecycle =========
+def test_removed_user_loses_usage(server: Any) -> None:
+    server.on_users_changed({"added": [{"id": "temporary", "name": "temporary", "password": ""}], "removed": [], "changed": []})
+    server.ingest_samples("temporary", [(1000.0, "App - Editor"), (1005.0, "App - Editor")])
+    assert "temporary" in server.usage.dump()
+
+    server.on_users_changed({"added": [], "removed": ["temporary"], "changed": []})
+    assert "temporary" not in server.usage.dump()
+    server.ingest_samples("temporary", [(1010.0, "App - Editor")])
+    assert "temporary" not in server.usage.dump()
+
+
+def test_expire_presence_marks_silent_users_offline(server: Any) -> None:
+    server.on_users_changed({"added": [{"id": "silent", "name": "silent", "password": ""}], "removed": [], "changed": []})
+    now = server.time()
+    server.ingest_samples("silent", [(now, "Editor")])
+    assert server.presence.get("silent").online
+
+    server.expire_presence(now + server.ONLINE_TIMEOUT + 1)
+    assert not server.presence.get("silent").online
+
+
+# ========== /users/status =========
+def status_etag(server: Any) -> str:
+    return f'"{server.boot_id}-{server.presence.version}"'
+
+
+def test_status_answers_304_while_presence_is_unchanged(server: Any, client: Any) -> None:
+    first = client.get("/users/status")
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "no-cache"
+    assert first.headers["ETag"] == status_etag(server)
+    body = server.status_cache[1]
+
+    again = client.get("/users/status", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304 and again.get_data() == b""
+    assert again.headers["ETag"] == first.headers["ETag"]
+    # Without a validator the cached body is served as is, not rebuilt
+    assert client.get("/users/status").get_data() == first.get_data()
+    assert server.status_cache[1] is body
+
+
+def test_status_etag_changes_when_presence_changes(server: Any, client: Any) -> None:
+    token = login(server, client)
+    etag = client.get("/users/status").headers["ETag"]
+
+    client.post("/upload", json={"token": token, "active_window": "ETag Editor"})
+    changed = client.get("/users/status", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag and changed.headers["ETag"] == status_etag(server)
+    assert "ETag Editor" in changed.get_data(as_text=True)
+
+    # A heartbeat moves the update time, so it is a change too
+    etag = changed.headers["ETag"]
+    client.post("/upload/heartbeat", headers={server.TOKEN_HEADER: token})
+    assert client.get("/users/status", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_status_etag_from_another_boot_is_not_matched(server: Any, client: Any) -> None:
+    stale = f'"other-{server.presence.version}"'
+    assert client.get("/users/status", headers={"If-None-Match": stale}).status_code == 200
+
+
+# ========== /users/history =========
+def test_history_older_than_the_ring_comes_from_the_log(server: Any, client: Any) -> None:
+    # The log is in arrival order, so stay after everything earlier tests logged
+    base = server.time() + 1000
+    server.on_users_changed({"added": [{"id": "archived", "name": "archived", "password": ""}], "removed": [], "changed": []})
+    server.ingest_samples("archived", [(base, "Old"), (base + 10, "Older still"), (base + 20, "Recent")])
+    server.activity_log.flush()
+    # As after a restart: the ring only holds what came after the snapshot
+    server.history.remove("archived")
+    server.history.record("archived", base + 20, "Recent")
+    server.history.record("archived", base + 30, "Newest")
+
+    response = client.get(f"/users/history?user_id=archived&since={base - 50}&until={base + 100}").get_json()
+    assert [(entry["time"] - base, entry["active_window"]) for entry in response["data"]] == [
+        (0, "Old"), (10, "Older still"), (20, "Recent"), (30, "Newest")
+    ]
+
+    response = client.get(f"/users/history?user_id=archived&since={base + 5}&until={base + 45}&bucket=20").get_json()
+    assert [entry["active_window"] for entry in response["data"]] == ["Older still", "Newest"]
+
+
+
+def test_history_merges_the_logs_of_every_worker(server: Any, client: Any, tmp_path: Any, monkeypatch: Any) -> None:
+    base = server.time() + 2000
+    server.on_users_changed({"added": [{"id": "roaming", "name": "roaming", "password": ""}], "removed": [], "changed": []})
+    server.ingest_samples("roaming", [(base, "Here"), (base + 20, "Here again")])
+    server.activity_log.flush()
+    # Another serve.py worker received the samples in between
+    other = ActivityLog(str(tmp_path / "worker-1"), 1 << 20, 3600, 16)
+    other.open()
+    other.append({"time": base + 10, "user_id": "roaming", "active_window": "Elsewhere"})
+    other.append({"time": base + 15, "user_id": "someone else", "active_window": "Not mine"})
+    other.close()
+    monkeypatch.setattr(server, "SHARED_STATE", "shared_state.db")
+    monkeypatch.setattr(server, "LOG_ROOT", str(tmp_path))
+    server.history.remove("roaming")
+
+    response = client.get(f"/users/history?user_id=roaming&since={base - 5}&until={base + 30}").get_json()
+    assert [entry["active_window"] for entry in response["data"]] == ["Here", "Elsewhere", "Here again"]
+
+# ========== /users =========
+def test_users_pages_follow_the_cursor(server: Any, client: Any) -> None:
+    names: List[str] = []
+    cursor = ""
+    while True:
+        body = client.get("/users", query_string={"limit": 1, "cursor": cursor}).get_json()
+        assert body["status"] == "success" and len(body["data"]) <= 1
+        names += [user["user_name"] for user in body["data"]]
+        if body["next_cursor"] is None:
+            break
+        cursor = body["next_cursor"]
+    assert len(names) == len(server.directory)
+    assert names == sorted(names, key=str.lower)
+
+
+def test_users_prefix_and_invalid_queries(server: Any, client: Any) -> None:
+    name = credentials[0]["user_name"]
+    body = client.get("/users", query_string={"prefix": name.upper()}).get_json()
+    assert credentials[0]["user_id"] in [user["user_id"] for user in body["data"]]
+    assert all(user["user_name"].lower().startswith(name.lower()) for user in body["data"])
+
+    for query in ({"limit": 0}, {"limit": "many"}, {"cursor": "not a cursor"}):
+        assert client.get("/users", query_string=query).get_json()["status"] == "error"
@@ -0,0 +1,88 @@
+from typing import List
+
+from sessions import SessionManager
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now: float = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def tokens_in_order(manager: SessionManager) -> List[str]:
+    return list(manager._sessions)
+
+
+def test_sessions_expire_after_ttl_of_inactivity() -> None:
+    clock = Clock()
+    manager = SessionManager(60, clock)
+    token = manager.create("a", "alice")
+
+    clock.now += 59
+    session = manager.get(token)
+    assert session is not None and session.user_id == "a" and session.last_seen == clock.now
+
+    # Each get restarts the idle timer
+    clock.now += 59
+    assert manager.get(token) is not None
+    clock.now += 60
+    assert manager.get(token) is None
+    assert len(manager) == 0
+
+
+def test_get_moves_the_session_to_the_end_so_eviction_stops_early() -> None:
+    clock = Clock()
+    manager = SessionManager(60, clock)
+    first = manager.create("a", "alice")
+    clock.now += 10
+    second = manager.create("b", "bob")
+    clock.now += 10
+    third = manager.create("c", "carol")
+    assert tokens_in_order(manager) == [first, second, third]
+
+    clock.now += 10
+    manager.get(first)
+    assert tokens_in_order(manager) == [second, third, first]
+
+    # `second` was seen at 1010 and `third` at 1020: only `second` is past the ttl
+    clock.now = 1010 + 60
+    assert manager.get(first) is not None
+    assert tokens_in_order(manager) == [third, first]
+
+
+def test_expired_sessions_are_evicted_on_create() -> None:
+    clock = Clock()
+    manager = SessionManager(60, clock)
+    for user_id in ("a", "b", "c"):
+        manager.create(user_id, user_id)
+    clock.now += 60
+    fresh = manager.create("d", "dave")
+    assert tokens_in_order(manager) == [fresh]
+    assert manager._by_user == {"d": {fresh}}
+
+
+def test_revoke_ends_one_session_and_revoke_user_all_of_them() -> None:
+    manager = SessionManager(60, Clock())
+    phone = manager.create("a", "alice")
+    laptop = manager.create("a", "alice")
+    other = manager.create("b", "bob")
+
+    manager.revoke(phone)
+    assert manager.get(phone) is None and manager.get(laptop) is not None
+    manager.revoke(phone)
+
+    assert manager.revoke_user("a") == 1
+    assert manager.get(laptop) is None
+    assert manager.revoke_user("a") == 0
+    assert manager.get(other) is not None
+    assert manager._by_user == {"b": {other}}
+
+
+def test_missing_or_unknown_tokens_are_not_sessions() -> None:
+    manager = SessionManager(60, Clock())
+    manager.create("a", "alice")
+    assert manager.get(None) is None
+    assert manager.get("") is None
+    assert manager.get("not-a-token") is None
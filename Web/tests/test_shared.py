@@ -0,0 +1,148 @@
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+from time import monotonic, sleep
+from typing import Any, Callable, Dict, Iterator, List
+
+import pytest
+import requests
+
+import bench
+from shared import SharedStore, SharedPresence
+
+
+def rows(store: SharedStore) -> list:
+    return store.db().execute("SELECT user_id, active_window, update_time, worker FROM presence ORDER BY user_id").fetchall()
+
+
+def test_publish_is_buffered_until_flush(tmp_path: Any) -> None:
+    store = SharedStore(str(tmp_path / "shared.db"))
+    presence = SharedPresence(store, 1)
+    presence.publish("a", "Editor", 10.0)
+    presence.publish("a", "Browser", 11.0)
+    presence.publish("b", "Terminal", 12.0)
+    assert rows(store) == []
+
+    assert presence.flush() == 2
+    assert rows(store) == [("a", "Browser", 11.0, 1), ("b", "Terminal", 12.0, 1)]
+    assert presence.flush() == 0
+
+
+def test_flush_never_moves_time_backwards(tmp_path: Any) -> None:
+    store = SharedStore(str(tmp_path / "shared.db"))
+    first = SharedPresence(store, 1)
+    second = SharedPresence(store, 2)
+    first.publish("a", "Newer", 20.0)
+    first.flush()
+    second.publish("a", "Older", 10.0)
+    second.flush()
+    assert rows(store) == [("a", "Newer", 20.0, 1)]
+
+
+def test_other_workers_see_rows_after_the_last_seq(tmp_path: Any) -> None:
+    store = SharedStore(str(tmp_path / "shared.db"))
+    presence = SharedPresence(store, 1)
+    presence.publish("a", "Editor", 10.0)
+    presence.flush()
+    seq = presence.since(0)[-1][0]
+    presence.publish("b", "Browser", 11.0)
+    presence.flush()
+    assert [row[1] for row in presence.since(seq)] == ["b"]
+
+
+def test_failed_flush_is_retried(tmp_path: Any) -> None:
+    path = str(tmp_path / "shared.db")
+    store = SharedStore(path)
+    presence = SharedPresence(store, 1)
+    presence.publish("a", "Editor", 10.0)
+
+    blocker = sqlite3.connect(path, timeout=0, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    store.db().execute("PRAGMA busy_timeout = 0")
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            presence.flush()
+    finally:
+        blocker.execute("ROLLBACK")
+    assert len(presence) == 1
+    assert presence.flush() == 1
+
+
+# ========== Workers =========
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_worker(directory: str, index: int, port: int) -> subprocess.Popen:
+    # serve.py's worker entry point, but each on its own port so the test picks the worker
+    env: Dict[str, str] = dict(os.environ)
+    env.update({
+        "PYTHONPATH": bench.WEB_DIR, "SEEME_LOG_LEVEL": "off", "SEEME_STORAGE": "json", "SEEME_WS_PORT": "0",
+        "SEEME_SHARED_STATE": os.path.join(directory, "shared_state.db"), "SEEME_SHARED_SYNC_INTERVAL": "0.1",
+        "SEEME_LOGIN_RATE": "0", "SEEME_INGEST_RATE": "0"
+    })
+    code: str = f"import serve; serve.run_worker({index}, serve.bind('127.0.0.1', {port}), None, '127.0.0.1', {port})"
+    return subprocess.Popen([sys.executable, "-c", code], cwd=directory, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_for(condition: Callable[[], bool], seconds: float = 15) -> None:
+    deadline: float = monotonic() + seconds
+    while not condition():
+        assert monotonic() < deadline
+        sleep(0.05)
+
+
+def reachable(url: str) -> bool:
+    try:
+        return requests.get(f"{url}/users?limit=1", timeout=1).ok
+    except requests.RequestException:
+        return False
+
+
+@pytest.fixture(scope="module")
+def workers(tmp_path_factory: pytest.TempPathFactory) -> Iterator[Dict[str, Any]]:
+    directory: str = str(tmp_path_factory.mktemp("workers"))
+    credentials: List[bench.Credentials] = bench.seed_users(directory, 3, 1, 4)
+    SharedStore(os.path.join(directory, "shared_state.db"))
+    ports: List[int] = [free_port(), free_port()]
+    processes: List[subprocess.Popen] = [start_worker(directory, index, port) for index, port in enumerate(ports)]
+    urls: List[str] = [f"http://127.0.0.1:{port}" for port in ports]
+    try:
+        for url, process in zip(urls, processes):
+            wait_for(lambda: reachable(url) or process.poll() is not None, 60)
+            assert process.poll() is None
+        yield {"urls": urls, "user": credentials[0]}
+    finally:
+        for process in processes:
+            bench.stop_server(process)
+
+
+def status_entry(url: str, user_id: str) -> dict:
+    users: List[dict] = requests.get(f"{url}/users/status", timeout=5).json()["data"]
+    return next(user for user in users if user["user_id"] == user_id)
+
+
+def test_two_workers_converge_through_sync_shared(workers: Dict[str, Any]) -> None:
+    first, second = workers["urls"]
+    user: bench.Credentials = workers["user"]
+    token: str = requests.post(f"{first}/login", json=dict(user), timeout=30).json()["token"]
+
+    upload = requests.post(f"{first}/upload", json={"token": token, "active_window": "Editor"}, timeout=5)
+    assert upload.json()["status"] == "success" and upload.headers["X-SeeMe-Worker"] == "0"
+    wait_for(lambda: status_entry(second, user["user_id"])["active_window"] == "Editor")
+    assert status_entry(second, user["user_id"]) == status_entry(first, user["user_id"])
+
+    # The session is shared too: worker 1 accepts worker 0's token
+    upload = requests.post(f"{second}/upload", json={"token": token, "active_window": "Browser"}, timeout=5)
+    assert upload.json()["status"] == "success" and upload.headers["X-SeeMe-Worker"] == "1"
+    wait_for(lambda: status_entry(first, user["user_id"])["active_window"] == "Browser")
+    assert status_entry(first, user["user_id"]) == status_entry(second, user["user_id"])
+
+    # Equal presence, different ETags: each worker tags its own boot id and version
+    etags: List[str] = [requests.get(f"{url}/users/status", timeout=5).headers["ETag"] for url in (first, second)]
+    assert etags[0] != etags[1]
@@ -0,0 +1,92 @@
+import json
+from typing import Any, List
+
+import api
+from api import SqliteStorage, User, migrate_json_to_sqlite, export_sqlite_to_json
+
+
+def user(index: int, name: str = "") -> User:
+    return {"name": name or f"user{index}", "id": f"ID-{index}", "password": f"$2b$04$hash{index}"}
+
+
+def changes(storage: SqliteStorage) -> List[tuple]:
+    return storage._db().execute("SELECT user_id, kind FROM changes ORDER BY seq").fetchall()
+
+
+def test_json_to_sqlite_and_back_round_trips(tmp_path: Any) -> None:
+    users = [user(1), user(2, "名字"), user(3, "user1")]
+    source = tmp_path / "data.json"
+    source.write_text(json.dumps({"users": users}), encoding="utf-8")
+    db_path = str(tmp_path / "data.db")
+
+    assert migrate_json_to_sqlite(str(source), db_path) == 3
+    # Running the migration again only adds users it has not seen
+    assert migrate_json_to_sqlite(str(source), db_path) == 0
+    storage = SqliteStorage(db_path)
+    assert storage.get("ID-2") == users[1]
+    assert storage.by_name("user1") == [users[0], users[2]]
+
+    target = tmp_path / "export.json"
+    assert export_sqlite_to_json(db_path, str(target)) == 3
+    assert json.loads(target.read_text(encoding="utf-8")) == {"users": users}
+
+
+def test_poll_reports_writes_from_other_connections(tmp_path: Any) -> None:
+    path = str(tmp_path / "data.db")
+    reader = SqliteStorage(path)
+    writer = SqliteStorage(path)
+    writer.insert([user(1), user(2)])
+    assert reader.poll() == {"added": [user(1), user(2)], "removed": [], "changed": []}
+    assert reader.poll() == {"added": [], "removed": [], "changed": []}
+
+    writer.update(user(1, "renamed"))
+    writer.delete("ID-2")
+    # No row matched, so nothing is recorded
+    assert not writer.delete("ID-9")
+    assert reader.poll() == {"added": [], "removed": ["ID-2"], "changed": ["ID-1"]}
+
+    # A user added and removed between two polls is only reported removed
+    writer.insert([user(3)])
+    writer.delete("ID-3")
+    assert reader.poll() == {"added": [], "removed": ["ID-3"], "changed": []}
+
+
+def test_changes_are_pruned_once_every_poller_has_read_them(tmp_path: Any, monkeypatch: Any) -> None:
+    monkeypatch.setattr(api, "CHANGES_PRUNE_INTERVAL", 0)
+    path = str(tmp_path / "data.db")
+    first = SqliteStorage(path)
+    second = SqliteStorage(path)
+    first.poll()
+    second.poll()
+
+    first.insert([user(1), user(2)])
+    first.poll()
+    # `second` has not read them yet
+    assert changes(first) == [("ID-1", "added"), ("ID-2", "added")]
+    # The last poller to read them prunes them
+    assert second.poll()["added"] == [user(1), user(2)]
+    assert changes(first) == []
+
+    # Sequence numbers keep growing after the table empties
+    first.delete("ID-1")
+    assert second.poll() == {"added": [], "removed": ["ID-1"], "changed": []}
+    assert SqliteStorage(path).poll() == {"added": [], "removed": [], "changed": []}
+
+
+def test_absent_pollers_stop_holding_changes_back(tmp_path: Any, monkeypatch: Any) -> None:
+    monkeypatch.setattr(api, "CHANGES_PRUNE_INTERVAL", 0)
+    path = str(tmp_path / "data.db")
+    live = SqliteStorage(path)
+    closed = SqliteStorage(path)
+    crashed = SqliteStorage(path)
+    for storage in (live, closed, crashed):
+        storage.poll()
+    live.insert([user(1)])
+    live.poll()
+    assert len(changes(live)) == 1
+
+    closed.close()
+    assert live.prune() == 0
+    crashed._db().execute("UPDATE pollers SET seen = seen - ? WHERE id = ?", (api.CHANGES_RETENTION + 1, crashed._poller))
+    assert live.prune() == 1
+    assert changes(live) == []
@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+from usage import UsageAggregates, normalize_title, MAX_TITLE_LENGTH
+
+HOUR = 3600
+DAY = 86400
+
+
+def aggregates(top_k: int = 5, hours: int = 3, days: int = 2) -> UsageAggregates:
+    return UsageAggregates(max_gap=60, top_k=top_k, retention={"hour": hours, "day": days}, utc_offset=0)
+
+
+def seconds(usage: UsageAggregates, period: str, start: float) -> dict:
+    buckets = usage.summary("u", period, start, start + 1, 100)
+    return {entry["title"]: entry["seconds"] for entry in buckets[0]["titles"]} if buckets else {}
+
+
+@pytest.mark.parametrize("title, expected", [
+    ("main.py - Visual Studio Code", "Visual Studio Code"),
+    ("a - b  -  Mozilla   Firefox", "Mozilla Firefox"),
+    ("Arcaea", "Arcaea"),
+    ("Trailing - ", "Trailing -"),
+    ("x" * 500, "x" * MAX_TITLE_LENGTH),
+])
+def test_normalize_title(title: str, expected: str) -> None:
+    assert normalize_title(title) == expected
+
+
+def test_gaps_and_empty_intervals_are_not_credited() -> None:
+    usage = aggregates()
+    usage.record("u", "Editor", 100, 100)
+    usage.record("u", "Editor", 100, 50)
+    usage.record("u", "Editor", 100, 161)
+    assert len(usage) == 0 and usage.summary("u", "hour", 0, DAY, 10) == []
+
+    usage.record("u", "Editor", 100, 160)
+    assert seconds(usage, "hour", 0) == {"Editor": 60}
+
+
+def test_intervals_are_split_at_bucket_boundaries() -> None:
+    usage = aggregates()
+    usage.record("u", "doc - Editor", HOUR - 20, HOUR + 10)
+    assert seconds(usage, "hour", 0) == {"Editor": 20}
+    assert seconds(usage, "hour", HOUR) == {"Editor": 10}
+    assert seconds(usage, "day", 0) == {"Editor": 30}
+
+
+def test_buckets_follow_the_utc_offset() -> None:
+    usage = UsageAggregates(60, 5, {"hour": 3, "day": 2}, utc_offset=8 * HOUR)
+    assert usage.bucket_start("day", DAY - 8 * HOUR) == DAY - 8 * HOUR
+    assert usage.bucket_start("day", DAY - 8 * HOUR - 1) == -8 * HOUR
+
+
+def test_old_buckets_are_evicted_and_late_samples_dropped() -> None:
+    usage = aggregates(hours=2)
+    for hour in range(4):
+        usage.record("u", "Editor", hour * HOUR, hour * HOUR + 30)
+    assert [bucket["start"] for bucket in usage.summary("u", "hour", 0, 10 * HOUR, 10)] == [2 * HOUR, 3 * HOUR]
+
+    usage.record("u", "Editor", 0, 30)
+    assert [bucket["start"] for bucket in usage.summary("u", "hour", 0, 10 * HOUR, 10)] == [2 * HOUR, 3 * HOUR]
+
+
+def test_full_bucket_replaces_the_smallest_title() -> None:
+    usage = aggregates(top_k=2)
+    usage.record("u", "A", 0, 30)
+    usage.record("u", "B", 30, 40)
+    usage.record("u", "C", 40, 45)
+    # C inherits B's 10 seconds, so heavy titles are never under-counted
+    assert seconds(usage, "hour", 0) == {"A": 30, "C": 15}
+
+
+def test_summary_ranks_limits_and_filters_by_range() -> None:
+    usage = aggregates()
+    usage.record("u", "A", 0, 10)
+    usage.record("u", "B", 10, 40)
+    usage.record("u", "C", 40, 60)
+    usage.record("u", "A", HOUR, HOUR + 5)
+
+    buckets = usage.summary("u", "hour", 0, HOUR, 2)
+    assert buckets == [{
+        "start": 0, "total": 60,
+        "titles": [{"title": "B", "seconds": 30}, {"title": "C", "seconds": 20}]
+    }]
+    # `since` inside a bucket still includes that bucket
+    assert [bucket["start"] for bucket in usage.summary("u", "hour", HOUR - 1, 2 * HOUR, 2)] == [0, HOUR]
+    assert usage.summary("other", "hour", 0, HOUR, 2) == []
+
+
+def test_dump_load_round_trip_through_json() -> None:
+    usage = aggregates(hours=2)
+    usage.record("u", "Editor", 0, 30)
+    usage.record("u", "Browser", 2 * HOUR, 2 * HOUR + 20)
+    state = json.loads(json.dumps(usage.dump()))
+    state["u"]["week"] = [[0, {"Editor": 1}]]
+
+    restored = aggregates(hours=2)
+    restored.load(state)
+    assert restored.dump() == usage.dump()
+    assert restored.summary("u", "day", 0, DAY, 10) == usage.summary("u", "day", 0, DAY, 10)
+
+    # The newest bucket is restored too, so eviction carries on where it left off
+    restored.record("u", "Editor", 3 * HOUR, 3 * HOUR + 10)
+    assert [bucket["start"] for bucket in restored.summary("u", "hour", 0, DAY, 10)] == [2 * HOUR, 3 * HOUR]
+
+
+def test_remove_forgets_the_user() -> None:
+    usage = aggregates()
+    usage.record("u", "Editor", 0, 30)
+    usage.remove("u")
+    usage.remove("missing")
+    assert len(usage) == 0 and usage.dump() == {}
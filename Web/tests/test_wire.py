@@ -0,0 +1,148 @@
+import os
+import struct
+from importlib.util import spec_from_file_location, module_from_spec
+from typing import Any, List, Tuple
+
+import pytest
+
+import wire
+from wire import (
+    SampleEncoder, TitleDictionaries, WireError, UnknownTitle,
+    HEADER, SAMPLE, MAGIC, VERSION, DEFINE, MAX_TITLES, MAX_TITLE_BYTES
+)
+
+
+def load_client_wire() -> Any:
+    # The Windows client ships its own copy; both sit in modules named `wire`
+    path = os.path.join(os.path.dirname(__file__), "..", "..", "Windows", "wire.py")
+    spec = spec_from_file_location("client_wire", path)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+client_wire = load_client_wire()
+NOW = 1_000_000.0
+
+
+def round_trip(encoder: Any, dictionaries: TitleDictionaries, samples: List[Tuple[float, str]]) -> List[Tuple[float, str]]:
+    body, defined = encoder.encode(samples, NOW)
+    decoded = dictionaries.decode("session", body, NOW, 0xFFFF)
+    encoder.confirm(defined)
+    return decoded
+
+
+@pytest.mark.parametrize("encoder_class", [SampleEncoder, client_wire.SampleEncoder], ids=["web", "windows"])
+def test_samples_round_trip(encoder_class: Any) -> None:
+    encoder = encoder_class()
+    dictionaries = TitleDictionaries(8)
+    first = [(NOW - 3, "Editor"), (NOW - 2, "浏览器"), (NOW - 1, "Editor")]
+    second = [(NOW - 0.5, "Editor"), (NOW, "Terminal")]
+
+    assert [(pytest.approx(time, abs=1e-3), title) for time, title in first] == round_trip(encoder, dictionaries, first)
+    assert [(pytest.approx(time, abs=1e-3), title) for time, title in second] == round_trip(encoder, dictionaries, second)
+
+
+def test_both_encoders_produce_the_same_bytes() -> None:
+    web, windows = SampleEncoder(), client_wire.SampleEncoder()
+    windows.epoch = web.epoch
+    batches = [[(NOW - 2, "Editor"), (NOW - 1, "Browser")], [(NOW, "Editor"), (NOW, "Mail")]]
+    for batch in batches:
+        expected, defined = web.encode(batch, NOW)
+        assert windows.encode(batch, NOW) == (expected, defined)
+        web.confirm(defined)
+        windows.confirm(defined)
+    for name in ("CONTENT_TYPE", "MAGIC", "VERSION", "DEFINE", "MAX_TITLES", "MAX_TITLE_BYTES"):
+        assert getattr(client_wire, name) == getattr(wire, name)
+
+
+def test_known_titles_are_sent_as_ids_only() -> None:
+    encoder = SampleEncoder()
+    body, defined = encoder.encode([(NOW, "Editor")], NOW)
+    encoder.confirm(defined)
+    steady, defined = encoder.encode([(NOW, "Editor"), (NOW, "Editor")], NOW)
+    assert defined == [] and len(steady) == HEADER.size + 2 * SAMPLE.size
+
+
+def test_lost_dictionary_raises_unknown_title_until_resync() -> None:
+    encoder = SampleEncoder()
+    round_trip(encoder, TitleDictionaries(8), [(NOW, "Editor")])
+
+    # A restarted server (or another worker) has no dictionary for the session
+    fresh = TitleDictionaries(8)
+    body, defined = encoder.encode([(NOW, "Editor")], NOW)
+    with pytest.raises(UnknownTitle):
+        fresh.decode("session", body, NOW, 10)
+
+    encoder.forget()
+    assert round_trip(encoder, fresh, [(NOW, "Editor")]) == [(NOW, "Editor")]
+
+
+def test_unconfirmed_definitions_are_sent_again() -> None:
+    encoder = SampleEncoder()
+    encoder.encode([(NOW, "Editor")], NOW)
+    body, defined = encoder.encode([(NOW, "Editor")], NOW)
+    assert defined == [0]
+    assert TitleDictionaries(8).decode("session", body, NOW, 10) == [(NOW, "Editor")]
+
+
+def test_running_out_of_ids_starts_a_new_epoch() -> None:
+    encoder = SampleEncoder()
+    dictionaries = TitleDictionaries(8)
+    round_trip(encoder, dictionaries, [(NOW, f"Title {index}") for index in range(MAX_TITLES)])
+    epoch = encoder.epoch
+
+    body, defined = encoder.encode([(NOW, "Title 0"), (NOW, "One too many")], NOW)
+    assert encoder.epoch != epoch and defined == [0, 1]
+    assert dictionaries.decode("session", body, NOW, 10) == [(NOW, "Title 0"), (NOW, "One too many")]
+
+
+def test_sessions_are_dropped_least_recently_used_first() -> None:
+    dictionaries = TitleDictionaries(2)
+    encoders = {key: SampleEncoder() for key in ("a", "b", "c")}
+    for key in ("a", "b"):
+        dictionaries.decode(key, encoders[key].encode([(NOW, "Editor")], NOW)[0], NOW, 10)
+        encoders[key].confirm([0])
+    dictionaries.decode("a", encoders["a"].encode([(NOW, "Editor")], NOW)[0], NOW, 10)
+    dictionaries.decode("c", encoders["c"].encode([(NOW, "Editor")], NOW)[0], NOW, 10)
+
+    assert len(dictionaries) == 2
+    dictionaries.decode("a", encoders["a"].encode([(NOW, "Editor")], NOW)[0], NOW, 10)
+    with pytest.raises(UnknownTitle):
+        dictionaries.decode("b", encoders["b"].encode([(NOW, "Editor")], NOW)[0], NOW, 10)
+
+
+def test_long_titles_are_cut_to_fit() -> None:
+    encoder = SampleEncoder()
+    title = "字" * MAX_TITLE_BYTES
+    decoded = round_trip(encoder, TitleDictionaries(8), [(NOW, title)])
+    assert decoded == [(NOW, title[:MAX_TITLE_BYTES // 4])]
+
+
+def test_future_samples_are_clamped_to_now() -> None:
+    assert round_trip(SampleEncoder(), TitleDictionaries(8), [(NOW + 60, "Editor")]) == [(NOW, "Editor")]
+
+
+def encoded(samples: List[Tuple[float, str]]) -> bytes:
+    return SampleEncoder().encode(samples, NOW)[0]
+
+
+@pytest.mark.parametrize("body, message", [
+    (b"SM", "Truncated header"),
+    (HEADER.pack(b"XX", VERSION, 0, 1), "Unsupported format"),
+    (HEADER.pack(MAGIC, VERSION + 1, 0, 1), "Unsupported format"),
+    (HEADER.pack(MAGIC, VERSION, 11, 1), "At most 10"),
+    (encoded([(NOW, "Editor")])[:HEADER.size + 3], "Truncated sample"),
+    (encoded([(NOW, "Editor"), (NOW, "Mail")])[:-3], "Bad title"),
+    (encoded([(NOW, "Editor")]) + b"\0", "Trailing data"),
+    (HEADER.pack(MAGIC, VERSION, 1, 1) + SAMPLE.pack(0, DEFINE) + struct.pack("<H", 5) + b"\xff\xfe\xfd\xfc\xfb", "Truncated sample"),
+    (HEADER.pack(MAGIC, VERSION, 1, 1) + SAMPLE.pack(0, DEFINE | MAX_TITLES) + struct.pack("<H", 1) + b"x", "Bad title"),
+    (HEADER.pack(MAGIC, VERSION, 1, 1) + SAMPLE.pack(0, DEFINE) + struct.pack("<H", 9) + b"x", "Bad title"),
+    (HEADER.pack(MAGIC, VERSION, 1, 1) + SAMPLE.pack(float("nan"), DEFINE) + struct.pack("<H", 1) + b"x", "Bad sample time"),
+    (HEADER.pack(MAGIC, VERSION, 1, 1) + SAMPLE.pack(float("inf"), DEFINE) + struct.pack("<H", 1) + b"x", "Bad sample time"),
+    (HEADER.pack(MAGIC, VERSION, 1, 1) + SAMPLE.pack(float("-inf"), DEFINE) + struct.pack("<H", 1) + b"x", "Bad sample time"),
+])
+def test_malformed_bodies_raise_wire_error(body: bytes, message: str) -> None:
+    with pytest.raises(WireError, match=message) as error:
+        TitleDictionaries(8).decode("session", body, NOW, 10)
+    assert not isinstance(error.value, UnknownTitle)
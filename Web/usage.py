@@ -0,0 +1,163 @@
+from time import localtime
+from typing import Final, Optional, List, Dict, Tuple, TypedDict, Any
+
+
+# ========== Constants =========
+PERIODS: Final[Dict[str, int]] = {"hour": 3600, "day": 86400}
+TITLE_SEPARATOR: Final[str] = " - "
+MAX_TITLE_LENGTH: Final[int] = 128
+
+
+# ========== TypedDicts =========
+class TitleUsage(TypedDict):
+    title: str
+    seconds: float
+
+
+class UsageBucket(TypedDict):
+    start: float
+    total: float
+    titles: List[TitleUsage]
+
+
+# ========== Functions =========
+def normalize_title(title: str) -> str:
+    """
+    Reduce a window title to the application it belongs to.
+
+    Windows titles read "<document> - <application>", so the last part is
+    kept ("main.py - Visual Studio Code" -> "Visual Studio Code"); titles
+    without a separator are kept whole ("Arcaea").
+    """
+    title = " ".join(title.split())
+    if TITLE_SEPARATOR in title:
+        title = title.rsplit(TITLE_SEPARATOR, 1)[1] or title
+    return title[:MAX_TITLE_LENGTH]
+
+
+# ========== Classes =========
+class UserUsage:
+    """Seconds per title in each retained bucket, per period."""
+    __slots__ = ("buckets", "newest")
+
+    def __init__(self) -> None:
+        self.buckets: Dict[str, Dict[int, Dict[str, float]]] = {period: {} for period in PERIODS}
+        self.newest: Dict[str, int] = {period: 0 for period in PERIODS}
+
+
+class UsageAggregates:
+    """
+    Rolling time-in-application totals, updated as samples arrive.
+
+    `record` credits the time between two consecutive samples of a user to the
+    earlier sample's title, once per period, so an upload costs O(1) whatever
+    the history. Gaps longer than `max_gap` mean the client went quiet (it
+    sends nothing while the user is idle) and are not credited to anything.
+
+    Memory is bounded twice over: each user keeps only the newest `retention`
+    buckets per period, and each bucket keeps at most `top_k` titles using
+    the Space-Saving scheme. A new title arriving in a full bucket replaces
+    the smallest one and inherits its count, so totals of the heavy titles
+    are exact or slightly over, never under.
+
+    Not locked: the caller serializes access per user (server.py holds the
+    user's presence stripe) and takes every stripe for `dump`.
+    """
+    def __init__(self, max_gap: float, top_k: int, retention: Dict[str, int], utc_offset: Optional[int] = None) -> None:
+        self.max_gap: float = max_gap
+        self.top_k: int = top_k
+        self.retention: Dict[str, int] = retention
+        # Buckets are aligned to local time, so "day" means the local calendar day
+        self.utc_offset: int = localtime().tm_gmtoff if utc_offset is None else utc_offset
+        self._users: Dict[str, UserUsage] = {}
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def bucket_start(self, period: str, timestamp: float) -> int:
+        size: Final[int] = PERIODS[period]
+        return int((timestamp + self.utc_offset) // size) * size - self.utc_offset
+
+    def _credit(self, usage: UserUsage, period: str, start: int, title: str, seconds: float) -> None:
+        buckets: Final[Dict[int, Dict[str, float]]] = usage.buckets[period]
+        bucket: Optional[Dict[str, float]] = buckets.get(start)
+        if bucket is None:
+            horizon: Final[int] = (self.retention[period] - 1) * PERIODS[period]
+            if start > usage.newest[period]:
+                usage.newest[period] = start
+                # Runs once per new bucket, so eviction stays amortized O(1)
+                for expired in [key for key in buckets if key < start - horizon]:
+                    del buckets[expired]
+            elif start < usage.newest[period] - horizon:
+                return
+            bucket = {}
+            buckets[start] = bucket
+
+        if title in bucket or len(bucket) < self.top_k:
+            bucket[title] = bucket.get(title, 0.0) + seconds
+        else:
+            smallest: Final[str] = min(bucket, key=bucket.__getitem__)
+            bucket[title] = bucket.pop(smallest) + seconds
+
+    def record(self, user_id: str, title: str, since: float, until: float) -> None:
+        """Credit [since, until) to `title`, splitting it at bucket boundaries."""
+        if until <= since or until - since > self.max_gap:
+            return
+
+        usage: Optional[UserUsage] = self._users.get(user_id)
+        if usage is None:
+            usage = UserUsage()
+            self._users[user_id] = usage
+
+        title = normalize_title(title)
+        for period, size in PERIODS.items():
+            begin: float = since
+            while begin < until:
+                start: int = self.bucket_start(period, begin)
+                end: float = min(start + size, until)
+                self._credit(usage, period, start, title, end - begin)
+                begin = end
+
+    def remove(self, user_id: str) -> None:
+        self._users.pop(user_id, None)
+
+    def summary(self, user_id: str, period: str, since: float, until: float, limit: int) -> List[UsageBucket]:
+        """Top `limit` titles of every bucket overlapping [since, until), oldest first."""
+        usage: Final[Optional[UserUsage]] = self._users.get(user_id)
+        if usage is None:
+            return []
+
+        first: Final[int] = self.bucket_start(period, since)
+        result: Final[List[UsageBucket]] = []
+        for start, bucket in sorted(usage.buckets[period].items()):
+            if start < first or start >= until:
+                continue
+            ranked: List[Tuple[str, float]] = sorted(bucket.items(), key=lambda item: item[1], reverse=True)
+            result.append({
+                "start": start,
+                "total": round(sum(bucket.values()), 3),
+                "titles": [{"title": title, "seconds": round(seconds, 3)} for title, seconds in ranked[:limit]]
+            })
+        return result
+
+    # ---------- Snapshot ----------
+    def dump(self) -> Dict[str, Any]:
+        return {
+            user_id: {
+                period: [[start, bucket] for start, bucket in buckets.items()]
+                for period, buckets in usage.buckets.items()
+            }
+            for user_id, usage in self._users.items()
+        }
+
+    def load(self, state: Dict[str, Any]) -> None:
+        self._users.clear()
+        for user_id, periods in state.items():
+            usage: UserUsage = UserUsage()
+            for period, buckets in periods.items():
+                if period not in PERIODS:
+                    continue
+                for start, bucket in buckets:
+                    usage.buckets[period][int(start)] = {str(title): float(seconds) for title, seconds in bucket.items()}
+                usage.newest[period] = max(usage.buckets[period], default=0)
+            self._users[user_id] = usage
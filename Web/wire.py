@@ -0,0 +1,162 @@
+import math
+import struct
+import secrets
+from collections import OrderedDict
+from threading import Lock
+from typing import Final, Optional, List, Dict, Set, Tuple
+
+
+# ========== Constants =========
+# Compact binary sample format, sent as `Content-Type: application/x-seeme-samples`
+# with the session token in the X-SeeMe-Token header. Little-endian:
+#
+#     header   magic "SM" | version u8 | count u16 | epoch u32
+#     sample   age f32 | title u16
+#              [length u16 | UTF-8 title]   when title has the DEFINE bit
+#
+# `age` is how many seconds before sending the sample was taken, so no clock
+# needs to agree with the server's. `title` is an id into the session's title
+# dictionary for `epoch`: the first time a title is sent it carries DEFINE and
+# its text, afterwards only the id (a steady-state sample is 6 bytes). The
+# client owns the id assignment; a server that misses a definition (restart,
+# another serve.py worker) answers `resync_titles` and the client sends the
+# definitions again. A new epoch starts a new dictionary.
+CONTENT_TYPE: Final[str] = "application/x-seeme-samples"
+MAGIC: Final[bytes] = b"SM"
+VERSION: Final[int] = 1
+DEFINE: Final[int] = 0x8000
+# Ids per epoch; the client starts a new epoch when it runs out
+MAX_TITLES: Final[int] = 1024
+MAX_TITLE_BYTES: Final[int] = 4096
+
+HEADER: Final[struct.Struct] = struct.Struct("<2sBHI")
+SAMPLE: Final[struct.Struct] = struct.Struct("<fH")
+LENGTH: Final[struct.Struct] = struct.Struct("<H")
+
+
+# ========== Exceptions =========
+class WireError(ValueError):
+    pass
+
+
+class UnknownTitle(WireError):
+    pass
+
+
+# ========== Classes =========
+class TitleDictionaries:
+    """
+    Per-session title dictionaries, least recently used dropped first.
+
+    Decoding writes (time, title) tuples straight into the list handed to
+    ingest_samples; no per-sample dict is ever built.
+    """
+    def __init__(self, max_sessions: int) -> None:
+        self.max_sessions: int = max_sessions
+        self._sessions: OrderedDict[str, Tuple[int, Dict[int, str]]] = OrderedDict()
+        self._lock: Final[Lock] = Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _titles(self, key: str, epoch: int) -> Dict[int, str]:
+        with self._lock:
+            entry: Optional[Tuple[int, Dict[int, str]]] = self._sessions.get(key)
+            if entry is None or entry[0] != epoch:
+                entry = (epoch, {})
+                self._sessions[key] = entry
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(key)
+            return entry[1]
+
+    def decode(self, key: str, body: bytes, now: float, max_samples: int) -> List[Tuple[float, str]]:
+        try:
+            magic, version, count, epoch = HEADER.unpack_from(body, 0)
+        except struct.error:
+            raise WireError("Truncated header")
+        if magic != MAGIC or version != VERSION:
+            raise WireError("Unsupported format")
+        if count > max_samples:
+            raise WireError(f"At most {max_samples} samples per batch")
+
+        titles: Final[Dict[int, str]] = self._titles(key, epoch)
+        samples: Final[List[Tuple[float, str]]] = []
+        offset: int = HEADER.size
+        try:
+            for _ in range(count):
+                age, title_id = SAMPLE.unpack_from(body, offset)
+                offset += SAMPLE.size
+                # NaN would survive max() below and end up in the JSON presence feeds
+                if not math.isfinite(age):
+                    raise WireError("Bad sample time")
+                if title_id & DEFINE:
+                    (length,) = LENGTH.unpack_from(body, offset)
+                    offset += LENGTH.size
+                    if length > MAX_TITLE_BYTES or offset + length > len(body):
+                        raise WireError("Bad title")
+                    title: Optional[str] = body[offset:offset + length].decode('utf-8')
+                    offset += length
+                    title_id &= ~DEFINE
+                    if title_id >= MAX_TITLES:
+                        raise WireError("Bad title")
+                    titles[title_id] = title
+                else:
+                    title = titles.get(title_id)
+                    if title is None:
+                        raise UnknownTitle("Unknown title reference")
+                samples.append((now - max(age, 0.0), title))
+        except (struct.error, UnicodeDecodeError):
+            raise WireError("Truncated sample")
+        if offset != len(body):
+            raise WireError("Trailing data")
+        return samples
+
+
+class SampleEncoder:
+    """
+    Client side of the format (the Windows client carries its own copy).
+
+    `encode` returns the body and the ids it defined; `confirm` them once the
+    server accepted the body, `forget` everything the server is assumed to
+    know when it answers `resync_titles`.
+    """
+    def __init__(self) -> None:
+        self.epoch: int = secrets.randbits(32)
+        self._ids: Dict[str, int] = {}
+        self._known: Set[int] = set()
+
+    def _new_epoch(self) -> None:
+        self.epoch = secrets.randbits(32)
+        self._ids.clear()
+        self._known.clear()
+
+    def encode(self, samples: List[Tuple[float, str]], now: float) -> Tuple[bytes, List[int]]:
+        """`samples` are (time, title) pairs, oldest first."""
+        new_titles: Final[int] = len({title for _, title in samples if title not in self._ids})
+        if len(self._ids) + new_titles > MAX_TITLES:
+            self._new_epoch()
+
+        parts: Final[List[bytes]] = [HEADER.pack(MAGIC, VERSION, len(samples), self.epoch)]
+        defined: Final[List[int]] = []
+        for sample_time, title in samples:
+            title_id: Optional[int] = self._ids.get(title)
+            if title_id is None:
+                title_id = len(self._ids)
+                self._ids[title] = title_id
+            age: float = max(now - sample_time, 0.0)
+            if title_id in self._known or title_id in defined:
+                parts.append(SAMPLE.pack(age, title_id))
+            else:
+                # At most 4 bytes per character, so this stays under MAX_TITLE_BYTES
+                encoded: bytes = title[:MAX_TITLE_BYTES // 4].encode('utf-8')
+                parts.append(SAMPLE.pack(age, title_id | DEFINE) + LENGTH.pack(len(encoded)) + encoded)
+                defined.append(title_id)
+        return b"".join(parts), defined
+
+    def confirm(self, defined: List[int]) -> None:
+        self._known.update(defined)
+
+    def forget(self) -> None:
+        self._known.clear()
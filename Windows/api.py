@@ -1,15 +1,44 @@
+import os
 import ctypes
 from ctypes import wintypes
-from typing import Optional, TypedDict, Final
+from collections import deque
+from json import dumps as json_dumps, loads as json_loads
+from threading import Thread, Lock, Condition
+from time import time, monotonic
+from typing import Optional, TypedDict, Final, List, Deque, Callable, Union, Tuple, Any
 from configparser import ConfigParser
-from requests import post
+import requests
+from requests import Session, Response
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlsplit
+from scheduler import IDLE_THRESHOLD
+from wire import SampleEncoder, CONTENT_TYPE as WIRE_TYPE
+
+try:
+    from websockets.sync.client import connect as ws_connect
+except ImportError:
+    ws_connect = None
+
+
+# ========== Constants =========
+CONNECT_ERROR: Final[str] = "Connect Error"
+TOKEN_HEADER: Final[str] = "X-SeeMe-Token"
+NOT_LOGGED_IN: Final[str] = "User not logged in"
+THROTTLED: Final[str] = "Too many requests"
+# (connect, read) seconds
+REQUEST_TIMEOUT: Final[tuple] = (3.05, 10)
+# Seconds to stay on HTTP after the WebSocket channel failed
+CHANNEL_RETRY: Final[float] = 60
+# First line of the offline queue file: byte offset of the oldest queued sample
+QUEUE_HEAD: Final[str] = "#head {:016d}\n"
+QUEUE_HEAD_PREFIX: Final[bytes] = b"#head "
+QUEUE_HEAD_SIZE: Final[int] = len(QUEUE_HEAD.format(0))
 
 
 # ========== TypedDicts =========
 class UploadInfo(TypedDict):
-    user_id: str
-    user_name: str
-    user_password: str
+    token: str
     active_window: Optional[str]
 
 
@@ -19,6 +48,127 @@ class LoginInfo(TypedDict):
     user_password: str
 
 
+class Sample(TypedDict):
+    time: float
+    active_window: str
+
+
+class BatchUploadInfo(TypedDict):
+    token: str
+    sent_at: float
+    samples: List[Sample]
+
+
+# ========== Classes =========
+class OfflineQueue:
+    """
+    Bounded on-disk FIFO of samples taken while the server was unreachable.
+
+    Samples are kept in memory and mirrored to a JSON-lines file whose first
+    line holds the byte offset of the oldest queued sample. Pushes are always
+    appended, and `drop` after a successful upload only moves that offset, so
+    draining a backlog writes each sample a bounded number of times. Once the
+    queue is full the oldest samples are only evicted in memory. The file is
+    compacted when the dead bytes before the oldest queued sample outgrow the
+    queued ones, and loading it keeps the newest `max_samples`.
+    """
+    def __init__(self, path: str, max_samples: int) -> None:
+        self.path: str = path
+        self.max_samples: int = max_samples
+        self._samples: Deque[Sample] = deque(maxlen=max_samples)
+        # File offset of each queued sample's line, in step with _samples
+        self._starts: Deque[int] = deque(maxlen=max_samples)
+        self._size: int = 0
+        # Files written before the header existed are compacted on first use
+        self._header: bool = False
+
+        try:
+            with open(path, 'rb') as file:
+                first: bytes = file.readline()
+                offset: int = 0
+                if first.startswith(QUEUE_HEAD_PREFIX):
+                    self._header = True
+                    try:
+                        offset = max(int(first[len(QUEUE_HEAD_PREFIX):]), len(first))
+                    except ValueError:
+                        offset = len(first)
+                file.seek(offset)
+                for line in file:
+                    try:
+                        self._samples.append(json_loads(line))
+                        self._starts.append(offset)
+                    except ValueError:
+                        pass
+                    offset += len(line)
+            self._size = os.path.getsize(path)
+        except FileNotFoundError:
+            pass
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    @staticmethod
+    def _line(sample: Sample) -> bytes:
+        return (json_dumps(sample, ensure_ascii=False) + "\n").encode('utf-8')
+
+    def _rewrite(self) -> None:
+        temp_path: Final[str] = f"{self.path}.tmp"
+        starts: Final[List[int]] = []
+        offset: int = QUEUE_HEAD_SIZE
+        with open(temp_path, 'wb') as file:
+            file.write(QUEUE_HEAD.format(QUEUE_HEAD_SIZE).encode('ascii'))
+            for sample in self._samples:
+                line: bytes = OfflineQueue._line(sample)
+                file.write(line)
+                starts.append(offset)
+                offset += len(line)
+        os.replace(temp_path, self.path)
+        self._starts = deque(starts, maxlen=self.max_samples)
+        self._size = offset
+        self._header = True
+
+    def _compact(self) -> bool:
+        """Rewrite the file once its dead prefix is larger than the queued samples."""
+        head: Final[int] = self._starts[0] if self._starts else self._size
+        if self._header and head - QUEUE_HEAD_SIZE <= self._size - head:
+            return False
+        self._rewrite()
+        return True
+
+    def push(self, sample: Sample) -> None:
+        self._samples.append(sample)
+        if not self._header:
+            self._rewrite()
+            return
+
+        line: Final[bytes] = OfflineQueue._line(sample)
+        with open(self.path, 'ab') as file:
+            file.write(line)
+        self._starts.append(self._size)
+        self._size += len(line)
+        self._compact()
+
+    def peek(self, count: int) -> List[Sample]:
+        return [self._samples[i] for i in range(min(count, len(self._samples)))]
+
+    def drop(self, count: int) -> None:
+        for _ in range(min(count, len(self._samples))):
+            self._samples.popleft()
+            self._starts.popleft()
+
+        if not self._samples:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self._size = 0
+            self._header = False
+        elif not self._compact():
+            # Fixed width, so the head is overwritten in place
+            with open(self.path, 'r+b') as file:
+                file.write(QUEUE_HEAD.format(self._starts[0]).encode('ascii'))
+
+
 # ========== Functions =========
 class LASTINPUTINFO(ctypes.Structure):
     _fields_ = [
@@ -27,14 +177,23 @@ class LASTINPUTINFO(ctypes.Structure):
     ]
 
 
+_libraries: Optional[Tuple[Any, Any]] = None
+
+
+def _windll() -> Tuple[Any, Any]:
+    # user32 and kernel32, loaded on first use and then reused by every tick
+    global _libraries
+    if _libraries is None:
+        _libraries = (ctypes.WinDLL('user32', use_last_error=True), ctypes.WinDLL('kernel32', use_last_error=True))
+    return _libraries
+
+
 def get_idle_time() -> float:
-    
+    user32, kernel32 = _windll()
+
     last_input_info: LASTINPUTINFO = LASTINPUTINFO()
     last_input_info.cbSize = ctypes.sizeof(LASTINPUTINFO)
-    
-    user32: ctypes.WinDLL = ctypes.WinDLL('user32', use_last_error=True)
-    kernel32: ctypes.WinDLL = ctypes.WinDLL('kernel32', use_last_error=True)
-    
+
     if user32.GetLastInputInfo(ctypes.byref(last_input_info)):
         current_time: int = kernel32.GetTickCount()
         idle_time_ms: int = current_time - last_input_info.dwTime
@@ -42,29 +201,52 @@ def get_idle_time() -> float:
     return 0.0
 
 
-def get_active_window_title() -> Optional[str]:
-    if get_idle_time() > 10: return None
-
+def get_foreground_title() -> Optional[str]:
     try:
-        user32: ctypes.WinDLL = ctypes.WinDLL('user32', use_last_error=True)
+        user32: Final[Any] = _windll()[0]
         h_wnd: int = user32.GetForegroundWindow()
-        
+
         if not h_wnd:
             return None
-            
+
         length: int = user32.GetWindowTextLengthW(h_wnd)
         if length <= 0:
             return None
-            
+
         buffer: ctypes.Array[ctypes.c_wchar] = ctypes.create_unicode_buffer(length + 1)
         user32.GetWindowTextW(h_wnd, buffer, length + 1)
         return buffer.value if buffer.value else None
-        
+
     except Exception:
         return None
 
 
-def login_web(user_id: str, user_name: str, user_password: str, server_url: str) -> dict:
+def probe_window() -> Tuple[Optional[str], float]:
+    """(foreground title or None, idle seconds): the SampleScheduler probe."""
+    idle: Final[float] = get_idle_time()
+    return (None if idle > IDLE_THRESHOLD else get_foreground_title()), idle
+
+
+def get_active_window_title() -> Optional[str]:
+    return probe_window()[0]
+
+
+def _post(http: Optional[Session], url: str, **kwargs: Any) -> Response:
+    return (http or requests).post(url, timeout=REQUEST_TIMEOUT, **kwargs)
+
+
+def _result(response: Response) -> dict:
+    # 429 from the server's admission control: wait Retry-After seconds
+    if response.status_code == 429:
+        try:
+            retry_after: float = float(response.headers.get("Retry-After", "1"))
+        except ValueError:
+            retry_after = 1.0
+        return {"status": "error", "message": THROTTLED, "retry_after": retry_after}
+    return response.json()
+
+
+def login_web(user_id: str, user_name: str, user_password: str, server_url: str, http: Optional[Session] = None) -> dict:
     try:
         login_info: Final[LoginInfo] = {
             "user_id": user_id,
@@ -76,29 +258,399 @@ def login_web(user_id: str, user_name: str, user_password: str, server_url: str)
             "Content-Type": "application/json"
         }
 
-        response = post(f"{server_url}/login", json=login_info, headers=headers)
-        return response.json()
+        response = _post(http, f"{server_url}/login", json=login_info, headers=headers)
+        return _result(response)
     except Exception as e:
-        return {"status": "error", "message": f"Connect Error: {str(e)}"}
+        return {"status": "error", "message": f"{CONNECT_ERROR}: {str(e)}"}
 
 
-def upload_info(user_id: str, user_name: str, user_password: str, active_window: str, server_url: str) -> dict:
+def upload_wire(token: str, samples: List[Sample], server_url: str, encoder: SampleEncoder, route: str = "/upload/batch",
+                http: Optional[Session] = None) -> dict:
+    """Binary upload (see wire.py); sends the title definitions again if the server lost them."""
+    try:
+        pairs: Final[List[Tuple[float, str]]] = [(sample["time"], sample["active_window"]) for sample in samples]
+        headers: Final[dict] = {
+            "Content-Type": WIRE_TYPE,
+            TOKEN_HEADER: token
+        }
+
+        result: dict = {}
+        for _ in range(2):
+            body, defined = encoder.encode(pairs, time())
+            result = _result(_post(http, f"{server_url}{route}", data=body, headers=headers))
+            if result.get("status") == "success":
+                encoder.confirm(defined)
+            if not result.get("resync_titles"):
+                break
+            encoder.forget()
+        return result
+    except Exception as e:
+        return {"status": "error", "message": f"{CONNECT_ERROR}: {str(e)}"}
+
+
+def upload_info(token: str, active_window: str, server_url: str, http: Optional[Session] = None,
+                encoder: Optional[SampleEncoder] = None) -> dict:
+    if encoder is not None:
+        return upload_wire(token, [{"time": time(), "active_window": active_window}], server_url, encoder, "/upload", http)
     try:
         upload_info: Final[UploadInfo] = {
-            "user_id": user_id,
-            "user_name": user_name,
-            "user_password": user_password,
+            "token": token,
             "active_window": active_window
         }
 
+        # The header lets the server rate-limit the session before parsing the body
         headers: Final[dict] = {
-            "Content-Type": "application/json"
+            "Content-Type": "application/json",
+            TOKEN_HEADER: token
+        }
+
+        response = _post(http, f"{server_url}/upload", json=upload_info, headers=headers)
+        return _result(response)
+    except Exception as e:
+        return {"status": "error", "message": f"{CONNECT_ERROR}: {str(e)}"}
+
+
+def upload_batch(token: str, samples: List[Sample], server_url: str, http: Optional[Session] = None,
+                 encoder: Optional[SampleEncoder] = None) -> dict:
+    if encoder is not None:
+        return upload_wire(token, samples, server_url, encoder, "/upload/batch", http)
+    try:
+        batch_info: Final[BatchUploadInfo] = {
+            "token": token,
+            "sent_at": time(),
+            "samples": samples
+        }
+
+        headers: Final[dict] = {
+            "Content-Type": "application/json",
+            TOKEN_HEADER: token
         }
 
-        response = post(f"{server_url}/upload", json=upload_info, headers=headers)
-        return response.json()
+        response = _post(http, f"{server_url}/upload/batch", json=batch_info, headers=headers)
+        return _result(response)
+    except Exception as e:
+        return {"status": "error", "message": f"{CONNECT_ERROR}: {str(e)}"}
+
+
+def send_heartbeat(token: str, server_url: str, http: Optional[Session] = None) -> dict:
+    try:
+        response = _post(http, f"{server_url}/upload/heartbeat", headers={TOKEN_HEADER: token})
+        return _result(response)
     except Exception as e:
-        return {"status": "error", "message": f"Connect Error: {str(e)}"}
+        return {"status": "error", "message": f"{CONNECT_ERROR}: {str(e)}"}
+
+
+def is_connect_error(result: dict) -> bool:
+    return result.get("status") != "success" and str(result.get("message", "")).startswith(CONNECT_ERROR)
+
+
+def is_throttled(result: dict) -> bool:
+    return result.get("status") != "success" and "retry_after" in result
+
+
+def drain_queue(token: str, queue: OfflineQueue, server_url: str, batch_size: int = 500, http: Optional[Session] = None,
+                encoder: Optional[SampleEncoder] = None) -> dict:
+    """Upload queued samples oldest first; stops at the first failed batch."""
+    result: dict = {"status": "success", "message": "Queue empty"}
+    while len(queue):
+        batch: List[Sample] = queue.peek(batch_size)
+        result = upload_batch(token, batch, server_url, http, encoder)
+        if result.get("status") != "success":
+            break
+        queue.drop(len(batch))
+    return result
+
+
+def deliver_sample(token: str, sample: Sample, queue: OfflineQueue, server_url: str, changed: bool = True, http: Optional[Session] = None,
+                   encoder: Optional[SampleEncoder] = None) -> dict:
+    """
+    Send one sample, parking it in the offline queue if the server can't be
+    reached or asks the client to slow down.
+
+    An unchanged window is only announced with a bodiless heartbeat; the caller
+    must send a full sample again when the result carries `resync`. With an
+    `encoder` samples go out in the binary format instead of JSON.
+    """
+    if len(queue):
+        # Keep ordering: the new sample goes behind the backlog
+        queue.push(sample)
+        return drain_queue(token, queue, server_url, http=http, encoder=encoder)
+
+    result: Final[dict] = (
+        upload_info(token, sample["active_window"], server_url, http, encoder) if changed
+        else send_heartbeat(token, server_url, http)
+    )
+    if is_connect_error(result) or is_throttled(result):
+        queue.push(sample)
+    return result
+
+
+# ========== Ingest Channel =========
+def channel_url(server_url: str, ws_port: Any) -> Optional[str]:
+    """WebSocket URL of the server's ingest channel, if it advertised one at login."""
+    if ws_connect is None or not isinstance(ws_port, int) or ws_port <= 0:
+        return None
+    parts: Final[Any] = urlsplit(server_url)
+    if not parts.hostname:
+        return None
+    scheme: Final[str] = "wss" if parts.scheme == "https" else "ws"
+    host: Final[str] = f"[{parts.hostname}]" if ":" in parts.hostname else parts.hostname
+    return f"{scheme}://{host}:{ws_port}/"
+
+
+class IngestChannel:
+    """
+    Persistent WebSocket connection to the server's ingest channel.
+
+    Authenticates once with the session token; afterwards every sample is a
+    small JSON frame answered with the same result object as the HTTP
+    endpoints. Any failure raises, and the caller falls back to HTTP.
+    """
+    def __init__(self, url: str, token: str) -> None:
+        self.url: str = url
+        self.token: str = token
+        self._connection: Any = None
+
+    def open(self) -> dict:
+        assert ws_connect is not None
+        self._connection = ws_connect(self.url, open_timeout=REQUEST_TIMEOUT[0], close_timeout=1)
+        result: Final[dict] = self._request({"type": "auth", "token": self.token})
+        if result.get("status") != "success":
+            self.close()
+        return result
+
+    def _request(self, frame: dict) -> dict:
+        self._connection.send(json_dumps(frame, ensure_ascii=False))
+        return json_loads(self._connection.recv(timeout=REQUEST_TIMEOUT[1]))
+
+    def upload(self, active_window: str) -> dict:
+        return self._request({"type": "upload", "active_window": active_window})
+
+    def heartbeat(self) -> dict:
+        return self._request({"type": "heartbeat"})
+
+    def close(self) -> None:
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+
+# ========== Uploader =========
+class Uploader:
+    """
+    Background worker that owns all network traffic of the client.
+
+    The sampler hands samples over through a bounded queue and never waits on
+    the network; when the queue is full the oldest pending sample is dropped.
+    The worker keeps one pooled keep-alive Session with explicit timeouts and
+    connect retries, logs in (again) whenever the server asks for it, backs
+    off exponentially while the server is unreachable and for the server's
+    Retry-After when it answers 429 (samples go to the offline queue
+    meanwhile), uses the server's WebSocket ingest channel
+    instead of one POST per sample when the server offers one and falls back
+    to HTTP whenever it fails, posts samples in the compact binary format
+    when the server accepts it, and reports every outcome through `on_result`,
+    called from the worker thread as on_result(kind, result).
+    """
+    LOGIN: Final[str] = "login"
+    UPLOAD: Final[str] = "upload"
+
+    def __init__(self, server_url: str, user_id: str, user_name: str, user_password: str,
+                 offline_queue: OfflineQueue, on_result: Callable[[str, dict], None],
+                 max_pending: int = 256, max_backoff: float = 30.0) -> None:
+        self.offline_queue: OfflineQueue = offline_queue
+        self.on_result: Callable[[str, dict], None] = on_result
+        self.max_backoff: float = max_backoff
+        self.token: Optional[str] = None
+
+        self._credentials_lock: Final[Lock] = Lock()
+        self.configure(server_url, user_id, user_name, user_password)
+
+        self.max_pending: int = max_pending
+        self._jobs: Deque[Union[str, Sample, None]] = deque()
+        self._jobs_ready: Final[Condition] = Condition()
+        self._thread: Optional[Thread] = None
+        self._last_sent_window: Optional[str] = None
+        self._backoff: float = 0.0
+        self._retry_at: float = 0.0
+        self._throttled: bool = False
+        self._channel_url: Optional[str] = None
+        self._channel: Optional[IngestChannel] = None
+        self._channel_retry_at: float = 0.0
+        self._encoder: Optional[SampleEncoder] = None
+
+        # 429s are not retried here: Retry-After is honoured by parking samples instead
+        retry: Final[Retry] = Retry(
+            total=2, connect=2, read=0, status=0, backoff_factor=0.3, allowed_methods=None,
+            respect_retry_after_header=False
+        )
+        adapter: Final[HTTPAdapter] = HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=retry)
+        self.http: Final[Session] = Session()
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+
+    def configure(self, server_url: str, user_id: str, user_name: str, user_password: str) -> None:
+        with self._credentials_lock:
+            self.server_url: str = server_url
+            self.user_id: str = user_id
+            self.user_name: str = user_name
+            self.user_password: str = user_password
+
+    # ---------- Sampler side ----------
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = Thread(target=self._run, name="uploader", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._put(None)
+            self._thread.join(timeout=REQUEST_TIMEOUT[0] + REQUEST_TIMEOUT[1])
+            self._thread = None
+        self._close_channel()
+        self.http.close()
+
+    def _put(self, job: Union[str, Sample, None]) -> None:
+        with self._jobs_ready:
+            if len(self._jobs) >= self.max_pending:
+                # Only samples are dropped; a login or stop request always gets through
+                for index, pending in enumerate(self._jobs):
+                    if isinstance(pending, dict):
+                        del self._jobs[index]
+                        break
+            self._jobs.append(job)
+            self._jobs_ready.notify()
+
+    def request_login(self) -> None:
+        self._put(Uploader.LOGIN)
+
+    def submit(self, sample: Sample) -> None:
+        self._put(sample)
+
+    # ---------- Worker side ----------
+    def _run(self) -> None:
+        while True:
+            with self._jobs_ready:
+                while not self._jobs:
+                    self._jobs_ready.wait()
+                job: Union[str, Sample, None] = self._jobs.popleft()
+            if job is None:
+                return
+            try:
+                if job == Uploader.LOGIN:
+                    self.on_result(Uploader.LOGIN, self._login())
+                else:
+                    self.on_result(Uploader.UPLOAD, self._upload(job))
+            except Exception as e:
+                self.on_result(Uploader.UPLOAD, {"status": "error", "message": f"Uploader error: {str(e)}"})
+
+    def _note_connectivity(self, result: dict) -> None:
+        self._throttled = is_throttled(result)
+        if self._throttled:
+            self._backoff = 0.0
+            self._retry_at = monotonic() + float(result["retry_after"])
+        elif is_connect_error(result):
+            self._backoff = min(max(self._backoff * 2, 1.0), self.max_backoff)
+            self._retry_at = monotonic() + self._backoff
+        else:
+            self._backoff = 0.0
+            self._retry_at = 0.0
+
+    def _login(self) -> dict:
+        with self._credentials_lock:
+            credentials: Final[tuple] = (self.user_id, self.user_name, self.user_password, self.server_url)
+        result: Final[dict] = login_web(*credentials, http=self.http)
+        self._note_connectivity(result)
+        self.token = result.get("token") if result.get("status") == "success" else None
+        self._last_sent_window = None
+        # A new token needs a new channel; the server says at login whether it has one
+        self._close_channel()
+        self._channel_url = channel_url(credentials[3], result.get("ws_port")) if self.token else None
+        # Title ids belong to the session, so a new token starts a new dictionary
+        self._encoder = SampleEncoder() if self.token and WIRE_TYPE in result.get("wire_formats", ()) else None
+        return result
+
+    def _close_channel(self) -> None:
+        if self._channel is not None:
+            self._channel.close()
+            self._channel = None
+
+    def _open_channel(self) -> Optional[IngestChannel]:
+        if self._channel is not None:
+            return self._channel
+        if self._channel_url is None or self.token is None or monotonic() < self._channel_retry_at:
+            return None
+        channel: Final[IngestChannel] = IngestChannel(self._channel_url, self.token)
+        try:
+            if channel.open().get("status") != "success":
+                self._channel_retry_at = monotonic() + CHANNEL_RETRY
+                return None
+        except Exception:
+            channel.close()
+            self._channel_retry_at = monotonic() + CHANNEL_RETRY
+            return None
+        self._channel = channel
+        return channel
+
+    def _deliver_channel(self, sample: Sample, changed: bool) -> Optional[dict]:
+        # None means "use HTTP": no channel, or it just broke
+        if len(self.offline_queue):
+            return None
+        channel: Final[Optional[IngestChannel]] = self._open_channel()
+        if channel is None:
+            return None
+        try:
+            result: Final[dict] = channel.upload(sample["active_window"]) if changed else channel.heartbeat()
+        except Exception:
+            self._close_channel()
+            self._channel_retry_at = monotonic() + CHANNEL_RETRY
+            return None
+        if result.get("message") == NOT_LOGGED_IN:
+            self._close_channel()
+        elif is_throttled(result):
+            self.offline_queue.push(sample)
+        return result
+
+    def _upload(self, sample: Sample) -> dict:
+        if monotonic() < self._retry_at:
+            self.offline_queue.push(sample)
+            self._last_sent_window = None
+            if self._throttled:
+                return {"status": "error", "message": f"{THROTTLED}, retrying in {self._retry_at - monotonic():.0f}s"}
+            return {"status": "error", "message": f"{CONNECT_ERROR}: server unreachable, retrying in {self._backoff:.0f}s"}
+
+        if self.token is None:
+            login_result: Final[dict] = self._login()
+            self.on_result(Uploader.LOGIN, login_result)
+            if self.token is None:
+                if is_connect_error(login_result) or is_throttled(login_result):
+                    self.offline_queue.push(sample)
+                return login_result
+
+        result: dict = self._deliver(sample)
+        if result.get("message") == NOT_LOGGED_IN:
+            # Session expired on the server: log in again and retry once
+            self.on_result(Uploader.LOGIN, self._login())
+            if self.token is not None:
+                result = self._deliver(sample)
+        return result
+
+    def _deliver(self, sample: Sample) -> dict:
+        changed: Final[bool] = sample["active_window"] != self._last_sent_window
+        result: Final[dict] = self._deliver_channel(sample, changed) or deliver_sample(
+            self.token or "", sample, self.offline_queue, self.server_url, changed, self.http, self._encoder
+        )
+        self._note_connectivity(result)
+
+        # Only a confirmed full upload lets the next unchanged sample be a heartbeat
+        if result.get("status") == "success" and not result.get("resync"):
+            self._last_sent_window = sample["active_window"]
+        else:
+            self._last_sent_window = None
+        return result
 
 
 # ========== Test Code =========
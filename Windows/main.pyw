@@ -1,18 +1,86 @@
 import sys
 import api
+import logging
+from scheduler import SampleScheduler
 import configparser
-from typing import Final, Optional, Dict, Any
-from threading import Timer
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from threading import Lock
+from typing import Final, Optional, Dict, List, Deque, Any
 from datetime import datetime
+from time import time
 from pathlib import Path
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                             QHBoxLayout, QLabel, QPushButton, QTextEdit, 
+                             QHBoxLayout, QLabel, QPushButton, 
                              QGroupBox, QSystemTrayIcon, QMenu, QAction, QStyle,
                              QTabWidget, QLineEdit, QSpinBox, QFormLayout,
-                             QMessageBox, QFileDialog)
+                             QMessageBox, QFileDialog, QListView, QAbstractItemView)
+from PyQt5.QtCore import Qt, QObject, QTimer, QAbstractListModel, QModelIndex, pyqtSignal
 from PyQt5.QtGui import QIcon, QFont
 
 
+# Log view refresh period (~30 frames per second)
+LOG_FLUSH_MS: Final[int] = 33
+
+
+class UploadBridge(QObject):
+    """Carries Uploader results from its worker thread to the GUI thread"""
+    result = pyqtSignal(str, object)
+
+
+class LogModel(QAbstractListModel):
+    """
+    The newest `capacity` log lines, for a QListView.
+
+    `append` may be called from any thread and only queues the line. `flush`
+    runs on the GUI thread from a timer, so however fast lines arrive the view
+    is updated at most once per frame, with one insert (and one removal of
+    the oldest lines once the ring is full).
+    """
+    def __init__(self, capacity: int, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self.capacity: int = max(capacity, 1)
+        self._lines: Deque[str] = deque()
+        self._pending: List[str] = []
+        self._pending_lock: Final[Lock] = Lock()
+
+    def append(self, line: str) -> None:
+        with self._pending_lock:
+            self._pending.append(line)
+
+    def flush(self) -> None:
+        with self._pending_lock:
+            lines: Final[List[str]] = self._pending
+            self._pending = []
+        if not lines:
+            return
+
+        if len(lines) >= self.capacity:
+            self.beginResetModel()
+            self._lines = deque(lines[-self.capacity:])
+            self.endResetModel()
+            return
+
+        overflow: Final[int] = len(self._lines) + len(lines) - self.capacity
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self._lines.popleft()
+            self.endRemoveRows()
+
+        self.beginInsertRows(QModelIndex(), len(self._lines), len(self._lines) + len(lines) - 1)
+        self._lines.extend(lines)
+        self.endInsertRows()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._lines)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if role == Qt.DisplayRole and index.isValid():
+            return self._lines[index.row()]
+        return None
+
+
 class ActiveWindowMonitor(QMainWindow):
     def __init__(self) -> None:
         super().__init__()
@@ -20,11 +88,38 @@ class ActiveWindowMonitor(QMainWindow):
         # Load configuration
         self.config_path: Final[Path] = Path("config.ini")
         self.load_config()
-        
-        self.timer: Optional[Timer] = None
+
+        # Bounded on-screen log, full history in rotating files
+        self.log_model: LogModel = LogModel(self.LOG_LINES, self)
+        self.log_file: logging.Logger = logging.getLogger("seeme.client")
+        self.log_file.setLevel(logging.INFO)
+        self.log_file.propagate = False
+        try:
+            handler: Final[RotatingFileHandler] = RotatingFileHandler(
+                self.LOG_FILE, maxBytes=self.LOG_FILE_BYTES, backupCount=self.LOG_FILE_BACKUPS, encoding='utf-8'
+            )
+            self.log_file.addHandler(handler)
+        except OSError as e:
+            self.log_model.append(f"Unable to open log file {self.LOG_FILE}: {e}")
+        
+        # Each tick schedules the next one, after the delay the scheduler picks
+        self.scheduler: SampleScheduler = SampleScheduler(self.MIN_SEND_GAP / 1000, self.MAX_SEND_GAP / 1000, api.probe_window)
+        self.timer: QTimer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.get_active_window_title)
         self.is_monitoring: bool = False
         self.last_upload_status: str = ""
         
+        # Network I/O runs on the uploader's thread, results come back as signals
+        self.offline_queue: api.OfflineQueue = api.OfflineQueue("offline_queue.jsonl", self.OFFLINE_QUEUE_SIZE)
+        self.upload_bridge: UploadBridge = UploadBridge(self)
+        self.upload_bridge.result.connect(self.on_upload_result)
+        self.uploader: api.Uploader = api.Uploader(
+            self.SERVER_URL, self.USER_ID, self.USER_NAME, self.USER_PASSWORD,
+            self.offline_queue, self.upload_bridge.result.emit
+        )
+        self.uploader.start()
+        
         self.init_ui()
         self.init_tray_icon()
         
@@ -48,7 +143,17 @@ class ActiveWindowMonitor(QMainWindow):
             self.USER_ID: str = self.config.get('Server', 'USER_ID', fallback='YOUR_USER_ID')
             self.USER_NAME: str = self.config.get('Server', 'USER_NAME', fallback='YOUR_USER_NAME')
             self.USER_PASSWORD: str = self.config.get('Server', 'USER_PASSWORD', fallback='YOUR_USER_PASSWORD')
-            self.SEND_GAP: int = self.config.getint('Send', 'SEND_GAP', fallback=2000)
+            # Older configs only have SEND_GAP, which becomes the fastest rate
+            self.MIN_SEND_GAP: int = self.config.getint(
+                'Send', 'MIN_SEND_GAP', fallback=self.config.getint('Send', 'SEND_GAP', fallback=1000)
+            )
+            self.MAX_SEND_GAP: int = max(self.config.getint('Send', 'MAX_SEND_GAP', fallback=8000), self.MIN_SEND_GAP)
+            self.OFFLINE_QUEUE_SIZE: int = self.config.getint('Send', 'OFFLINE_QUEUE_SIZE', fallback=10000)
+            # Lines kept on screen, and the size-capped log files on disk
+            self.LOG_LINES: int = self.config.getint('Log', 'LOG_LINES', fallback=5000)
+            self.LOG_FILE: str = self.config.get('Log', 'LOG_FILE', fallback='client.log')
+            self.LOG_FILE_BYTES: int = self.config.getint('Log', 'LOG_FILE_BYTES', fallback=1048576)
+            self.LOG_FILE_BACKUPS: int = self.config.getint('Log', 'LOG_FILE_BACKUPS', fallback=5)
                 
         except Exception as e:
             QMessageBox.warning(self, "Configuration Loading Error", f"Unable to load configuration file: {e}")
@@ -57,7 +162,13 @@ class ActiveWindowMonitor(QMainWindow):
             self.USER_ID = 'YOUR_USER_ID'
             self.USER_NAME = 'YOUR_USER_NAME'
             self.USER_PASSWORD = 'YOUR_USER_PASSWORD'
-            self.SEND_GAP = 2000
+            self.MIN_SEND_GAP = 1000
+            self.MAX_SEND_GAP = 8000
+            self.OFFLINE_QUEUE_SIZE = 10000
+            self.LOG_LINES = 5000
+            self.LOG_FILE = 'client.log'
+            self.LOG_FILE_BYTES = 1048576
+            self.LOG_FILE_BACKUPS = 5
         
     def create_default_config(self) -> None:
         """Create default INI configuration file"""
@@ -68,7 +179,15 @@ class ActiveWindowMonitor(QMainWindow):
             'USER_PASSWORD': 'YOUR_USER_PASSWORD'
         }
         self.config['Send'] = {
-            'SEND_GAP': '2000'
+            'MIN_SEND_GAP': '1000',
+            'MAX_SEND_GAP': '8000',
+            'OFFLINE_QUEUE_SIZE': '10000'
+        }
+        self.config['Log'] = {
+            'LOG_LINES': '5000',
+            'LOG_FILE': 'client.log',
+            'LOG_FILE_BYTES': '1048576',
+            'LOG_FILE_BACKUPS': '5'
         }
         self.save_config()
         
@@ -118,7 +237,7 @@ class ActiveWindowMonitor(QMainWindow):
         self.user_id_label: QLabel = QLabel(f"User ID: {self.USER_ID}")
         self.user_name_label: QLabel = QLabel(f"Username: {self.USER_NAME}")
         self.server_url_label: QLabel = QLabel(f"Server URL: {self.SERVER_URL}")
-        self.send_gap_label: QLabel = QLabel(f"Send Interval: {self.SEND_GAP} ms")
+        self.send_gap_label: QLabel = QLabel(f"Send Interval: {self.MIN_SEND_GAP}-{self.MAX_SEND_GAP} ms")
         
         CONFIG_LAYOUT.addWidget(self.user_id_label)
         CONFIG_LAYOUT.addWidget(self.user_name_label)
@@ -160,12 +279,20 @@ class ActiveWindowMonitor(QMainWindow):
         LOG_GROUP: Final[QGroupBox] = QGroupBox("Log")
         LOG_LAYOUT: Final[QVBoxLayout] = QVBoxLayout()
         
-        self.log_text: QTextEdit = QTextEdit()
-        self.log_text.setReadOnly(True)
+        # Uniform row heights let the view lay out only the visible rows
+        self.log_view: QListView = QListView()
+        self.log_view.setModel(self.log_model)
+        self.log_view.setUniformItemSizes(True)
+        self.log_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.log_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
         FONT: Final[QFont] = QFont("Microsoft YaHei", 10)
-        self.log_text.setFont(FONT)
+        self.log_view.setFont(FONT)
+
+        self.log_flush_timer: QTimer = QTimer(self)
+        self.log_flush_timer.timeout.connect(self.flush_log)
+        self.log_flush_timer.start(LOG_FLUSH_MS)
         
-        LOG_LAYOUT.addWidget(self.log_text)
+        LOG_LAYOUT.addWidget(self.log_view)
         LOG_GROUP.setLayout(LOG_LAYOUT)
         
         # Add to main layout
@@ -185,7 +312,7 @@ class ActiveWindowMonitor(QMainWindow):
         self.add_log("Application initialized")
         self.add_log(f"User: {self.USER_NAME} ({self.USER_ID})")
         self.add_log(f"Server: {self.SERVER_URL}")
-        self.add_log(f"Send Interval: {self.SEND_GAP} ms")
+        self.add_log(f"Send Interval: {self.MIN_SEND_GAP}-{self.MAX_SEND_GAP} ms")
         
     def init_config_tab(self) -> None:
         """Initialize configuration editing tab"""
@@ -211,12 +338,18 @@ class ActiveWindowMonitor(QMainWindow):
         SEND_GROUP: Final[QGroupBox] = QGroupBox("Send Configuration")
         SEND_LAYOUT: Final[QFormLayout] = QFormLayout()
         
-        self.send_gap_spin: QSpinBox = QSpinBox()
-        self.send_gap_spin.setRange(100, 60000)  # 100ms to 60s
-        self.send_gap_spin.setValue(self.SEND_GAP)
-        self.send_gap_spin.setSuffix(" ms")
+        self.min_send_gap_spin: QSpinBox = QSpinBox()
+        self.min_send_gap_spin.setRange(100, 60000)  # 100ms to 60s
+        self.min_send_gap_spin.setValue(self.MIN_SEND_GAP)
+        self.min_send_gap_spin.setSuffix(" ms")
+
+        self.max_send_gap_spin: QSpinBox = QSpinBox()
+        self.max_send_gap_spin.setRange(100, 60000)
+        self.max_send_gap_spin.setValue(self.MAX_SEND_GAP)
+        self.max_send_gap_spin.setSuffix(" ms")
         
-        SEND_LAYOUT.addRow("Send Interval:", self.send_gap_spin)
+        SEND_LAYOUT.addRow("Min Send Interval:", self.min_send_gap_spin)
+        SEND_LAYOUT.addRow("Max Send Interval:", self.max_send_gap_spin)
         SEND_GROUP.setLayout(SEND_LAYOUT)
         
         # Configuration action buttons
@@ -280,37 +413,32 @@ class ActiveWindowMonitor(QMainWindow):
                 self.show()
                 self.activateWindow()
                 
+    def apply_config(self) -> None:
+        self.uploader.configure(self.SERVER_URL, self.USER_ID, self.USER_NAME, self.USER_PASSWORD)
+        self.scheduler.configure(self.MIN_SEND_GAP / 1000, self.MAX_SEND_GAP / 1000)
+
     def login(self) -> None:
         self.add_log("Logging in...")
-        login_results: Final[Dict[str, Any]] = api.login_web(
-            self.USER_ID, self.USER_NAME, self.USER_PASSWORD, self.SERVER_URL
-        )
-        
+        self.uploader.request_login()
+
+    def on_upload_result(self, kind: str, results: Dict[str, Any]) -> None:
+        if kind == api.Uploader.LOGIN:
+            self.on_login_result(results)
+        else:
+            self.on_sample_result(results)
+
+    def on_login_result(self, login_results: Dict[str, Any]) -> None:
         if login_results["status"] == "success":
             self.login_status_label.setText("Login Status: Logged In")
             self.add_log("Login successful")
-            self.start_button.setEnabled(True)
+            self.start_button.setEnabled(not self.is_monitoring)
         else:
             self.login_status_label.setText("Login Status: Failed")
             self.add_log(f"Login failed: {login_results['message']}")
             self.start_button.setEnabled(False)
-            
-    def get_active_window_title(self) -> None:
-        active_window: Final[Optional[str]] = api.get_active_window_title()
 
-        if not active_window:
-            self.add_log(f"[Active window] No active window found.")
-            self.timer = Timer(self.SEND_GAP / 1000, self.get_active_window_title)
-            self.timer.start()
-            return
-        
-        self.add_log(f"[Active window] {active_window}")
-        
-        upload_results: Final[Dict[str, Any]] = api.upload_info(
-            self.USER_ID, self.USER_NAME, self.USER_PASSWORD, 
-            active_window, self.SERVER_URL
-        )
-        
+    def on_sample_result(self, upload_results: Dict[str, Any]) -> None:
+        self.scheduler.hint(upload_results.get("next_interval"))
         current_time: Final[str] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         if upload_results["status"] == "success":
             self.last_upload_status = "Success"
@@ -318,12 +446,22 @@ class ActiveWindowMonitor(QMainWindow):
         else:
             self.last_upload_status = f"Failed: {upload_results['message']}"
             self.add_log(f"[Upload] Upload failed at {current_time}: {upload_results['message']}")
+            if len(self.offline_queue):
+                self.add_log(f"[Upload] {len(self.offline_queue)} samples queued until the server is reachable")
             
         self.last_upload_label.setText(f"Last Upload: {current_time} ({self.last_upload_status})")
             
+    def get_active_window_title(self) -> None:
+        active_window, delay = self.scheduler.tick()
         if self.is_monitoring:
-            self.timer = Timer(self.SEND_GAP / 1000, self.get_active_window_title)
-            self.timer.start()
+            self.timer.start(int(delay * 1000))
+
+        if not active_window:
+            self.add_log(f"[Active window] No active window found.")
+            return
+        
+        self.add_log(f"[Active window] {active_window}")
+        self.uploader.submit({"time": time(), "active_window": active_window})
             
     def start_monitoring(self) -> None:
         self.is_monitoring = True
@@ -341,12 +479,12 @@ class ActiveWindowMonitor(QMainWindow):
         self.stop_button.setEnabled(False)
         self.add_log("Stopped monitoring active window")
         
-        if self.timer:
-            self.timer.cancel()
+        self.timer.stop()
             
     def refresh_config(self) -> None:
         """Refresh configuration display"""
         self.load_config()
+        self.apply_config()
         self.update_config_display()
         self.add_log("Configuration refreshed")
         
@@ -355,7 +493,7 @@ class ActiveWindowMonitor(QMainWindow):
         self.user_id_label.setText(f"User ID: {self.USER_ID}")
         self.user_name_label.setText(f"Username: {self.USER_NAME}")
         self.server_url_label.setText(f"Server URL: {self.SERVER_URL}")
-        self.send_gap_label.setText(f"Send Interval: {self.SEND_GAP} ms")
+        self.send_gap_label.setText(f"Send Interval: {self.MIN_SEND_GAP}-{self.MAX_SEND_GAP} ms")
         
     def save_config_changes(self) -> None:
         """Save configuration changes"""
@@ -364,12 +502,15 @@ class ActiveWindowMonitor(QMainWindow):
         self.config['Server']['USER_ID'] = self.user_id_edit.text()
         self.config['Server']['USER_NAME'] = self.user_name_edit.text()
         self.config['Server']['USER_PASSWORD'] = self.user_password_edit.text()
-        self.config['Send']['SEND_GAP'] = str(self.send_gap_spin.value())
+        self.config['Send']['MIN_SEND_GAP'] = str(self.min_send_gap_spin.value())
+        self.config['Send']['MAX_SEND_GAP'] = str(self.max_send_gap_spin.value())
+        self.config.remove_option('Send', 'SEND_GAP')
         
         # Save to file
         if self.save_config():
             # Reload configuration
             self.load_config()
+            self.apply_config()
             self.update_config_display()
             self.add_log("Configuration saved and applied")
             QMessageBox.information(self, "Success", "Configuration saved and applied")
@@ -380,7 +521,8 @@ class ActiveWindowMonitor(QMainWindow):
         self.user_id_edit.setText(self.USER_ID)
         self.user_name_edit.setText(self.USER_NAME)
         self.user_password_edit.setText(self.USER_PASSWORD)
-        self.send_gap_spin.setValue(self.SEND_GAP)
+        self.min_send_gap_spin.setValue(self.MIN_SEND_GAP)
+        self.max_send_gap_spin.setValue(self.MAX_SEND_GAP)
         self.add_log("Configuration form reset")
         
     def load_config_from_file(self) -> None:
@@ -403,6 +545,7 @@ class ActiveWindowMonitor(QMainWindow):
                 
                 if self.save_config():
                     self.load_config()
+                    self.apply_config()
                     self.reset_config_form()
                     self.update_config_display()
                     self.add_log(f"Configuration loaded from file: {file_path}")
@@ -426,11 +569,22 @@ class ActiveWindowMonitor(QMainWindow):
                 QMessageBox.warning(self, "Error", f"Failed to export configuration: {e}")
         
     def add_log(self, message: str) -> None:
+        # Safe from any thread: the view picks the line up on its next flush
         timestamp: Final[str] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.log_text.append(f"[{timestamp}] {message}")
+        line: Final[str] = f"[{timestamp}] {message}"
+        self.log_model.append(line)
+        self.log_file.info(line)
+
+    def flush_log(self) -> None:
+        # Keep following new lines only while the view is scrolled to the bottom
+        follow: Final[bool] = self.log_view.verticalScrollBar().value() >= self.log_view.verticalScrollBar().maximum()
+        self.log_model.flush()
+        if follow:
+            self.log_view.scrollToBottom()
         
     def close_application(self) -> None:
         self.stop_monitoring()
+        self.uploader.stop()
         self.tray_icon.hide()
         QApplication.quit()
         
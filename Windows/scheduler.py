@@ -0,0 +1,66 @@
+from time import monotonic
+from typing import Final, Optional, Tuple, Callable
+
+
+# ========== Constants =========
+# Matches the client's idle cut-off: past this many seconds nothing is sent
+IDLE_THRESHOLD: Final[float] = 10
+# While the title is stable, wait this fraction of how long it has been stable
+STABLE_RATIO: Final[float] = 0.5
+
+Probe = Callable[[], Tuple[Optional[str], float]]
+
+
+# ========== Classes =========
+class SampleScheduler:
+    """
+    Adaptive sampling policy, free of any OS or Qt dependency.
+
+    `probe()` returns (active window title or None, idle seconds) and `clock()`
+    returns monotonic seconds; both are injectable so the policy can be driven
+    by fakes. Each `tick` samples once and returns the title to send (None
+    while idle) and the delay before the next tick:
+
+    - right after the title changes: `min_interval`
+    - while it stays the same: half the time it has been stable, so a title
+      that has not changed for a while is looked at less and less often
+    - while the user is idle: `max_interval`
+
+    A hint from the server (`hint`) is a lower bound on the delay. The result
+    always stays within [min_interval, max_interval].
+    """
+    def __init__(self, min_interval: float, max_interval: float,
+                 probe: Probe, clock: Callable[[], float] = monotonic) -> None:
+        self.probe: Probe = probe
+        self.clock: Callable[[], float] = clock
+        self.configure(min_interval, max_interval)
+        self._title: Optional[str] = None
+        self._changed_at: float = clock()
+        self._hint: float = 0.0
+
+    def configure(self, min_interval: float, max_interval: float) -> None:
+        self.min_interval: float = max(min_interval, 0.05)
+        self.max_interval: float = max(max_interval, self.min_interval)
+
+    def hint(self, interval: Optional[float]) -> None:
+        """The server's `next_interval`; None or 0 clears it."""
+        self._hint = float(interval or 0.0)
+
+    def _clamp(self, interval: float) -> float:
+        return min(max(interval, self._hint, self.min_interval), self.max_interval)
+
+    def tick(self) -> Tuple[Optional[str], float]:
+        title, idle = self.probe()
+        now: Final[float] = self.clock()
+
+        if title is None or idle > IDLE_THRESHOLD:
+            self._title = None
+            self._changed_at = now
+            return None, self._clamp(self.max_interval)
+
+        if title != self._title:
+            self._title = title
+            self._changed_at = now
+            return title, self._clamp(self.min_interval)
+
+        return title, self._clamp(STABLE_RATIO * (now - self._changed_at))
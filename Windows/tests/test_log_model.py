@@ -0,0 +1,98 @@
+import os
+from importlib.machinery import SourceFileLoader
+from importlib.util import spec_from_loader, module_from_spec
+from threading import Thread
+from typing import Any, List
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pytest
+
+pytest.importorskip("PyQt5")
+from PyQt5.QtCore import QModelIndex, Qt
+from PyQt5.QtWidgets import QApplication
+
+
+def load_main() -> Any:
+    # main.pyw is a script; the .pyw suffix needs an explicit source loader
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "main.pyw")
+    loader = SourceFileLoader("client_main", path)
+    module = module_from_spec(spec_from_loader("client_main", loader))
+    loader.exec_module(module)
+    return module
+
+
+LogModel = load_main().LogModel
+
+
+@pytest.fixture(scope="module")
+def qt_app() -> QApplication:
+    return QApplication.instance() or QApplication([])
+
+
+def record(model: Any) -> List[tuple]:
+    events: List[tuple] = []
+    model.modelReset.connect(lambda: events.append(("reset",)))
+    model.rowsInserted.connect(lambda parent, first, last: events.append(("inserted", first, last)))
+    model.rowsRemoved.connect(lambda parent, first, last: events.append(("removed", first, last)))
+    return events
+
+
+def lines(model: Any) -> List[str]:
+    return [model.data(model.index(row), Qt.DisplayRole) for row in range(model.rowCount())]
+
+
+def test_lines_are_queued_until_flush(qt_app: QApplication) -> None:
+    model = LogModel(5)
+    events = record(model)
+    model.append("one")
+    model.append("two")
+    assert model.rowCount() == 0 and events == []
+
+    model.flush()
+    assert lines(model) == ["one", "two"]
+    assert events == [("inserted", 0, 1)]
+    model.flush()
+    assert events == [("inserted", 0, 1)]
+
+
+def test_full_ring_removes_the_oldest_rows_then_inserts(qt_app: QApplication) -> None:
+    model = LogModel(5)
+    for index in range(4):
+        model.append(f"line {index}")
+    model.flush()
+    events = record(model)
+
+    for index in range(4, 7):
+        model.append(f"line {index}")
+    model.flush()
+    assert events == [("removed", 0, 1), ("inserted", 2, 4)]
+    assert lines(model) == [f"line {index}" for index in range(2, 7)]
+
+
+def test_a_burst_larger_than_capacity_resets_to_its_tail(qt_app: QApplication) -> None:
+    model = LogModel(3)
+    model.append("old")
+    model.flush()
+    events = record(model)
+
+    for index in range(10):
+        model.append(f"burst {index}")
+    model.flush()
+    assert events == [("reset",)]
+    assert lines(model) == ["burst 7", "burst 8", "burst 9"]
+
+
+def test_append_from_other_threads_loses_nothing(qt_app: QApplication) -> None:
+    model = LogModel(10000)
+    threads = [Thread(target=lambda worker=worker: [model.append(f"{worker}:{index}") for index in range(500)])
+               for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    model.flush()
+    assert model.rowCount() == 2000
+    assert model.rowCount(model.index(0)) == 0
+    assert model.data(QModelIndex(), Qt.DisplayRole) is None
+    assert model.data(model.index(0), Qt.ToolTipRole) is None
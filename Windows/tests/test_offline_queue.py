@@ -0,0 +1,102 @@
+import os
+from typing import Any, List
+
+import api
+from api import OfflineQueue, QUEUE_HEAD_SIZE
+
+
+def samples_in_file(path: str) -> int:
+    with open(path, encoding="utf-8") as file:
+        return sum(1 for line in file if not line.startswith("#"))
+
+
+def sample(index: int) -> dict:
+    return {"time": float(index), "active_window": f"window {index:03}"}
+
+
+def test_full_queue_appends_and_compacts_once_dead_lines_dominate(tmp_path: Any) -> None:
+    path = str(tmp_path / "queue.jsonl")
+    queue = OfflineQueue(path, 10)
+    for index in range(20):
+        queue.push(sample(index))
+    # Ten evicted lines and ten queued ones, all the same size
+    assert len(queue) == 10
+    assert samples_in_file(path) == 20
+
+    queue.push(sample(20))
+    assert samples_in_file(path) == 10
+    assert queue.peek(1) == [sample(11)]
+
+
+def test_reload_keeps_newest_samples(tmp_path: Any) -> None:
+    path = str(tmp_path / "queue.jsonl")
+    queue = OfflineQueue(path, 10)
+    for index in range(15):
+        queue.push(sample(index))
+
+    reloaded = OfflineQueue(path, 10)
+    assert reloaded.peek(10) == [sample(index) for index in range(5, 15)]
+    for index in range(15, 20):
+        reloaded.push(sample(index))
+    assert reloaded.peek(10) == [sample(index) for index in range(10, 20)]
+
+
+def test_drop_moves_the_head_and_empty_queue_removes_file(tmp_path: Any) -> None:
+    path = str(tmp_path / "queue.jsonl")
+    queue = OfflineQueue(path, 10)
+    for index in range(10):
+        queue.push(sample(index))
+    size = os.path.getsize(path)
+
+    queue.drop(3)
+    assert os.path.getsize(path) == size
+    assert OfflineQueue(path, 10).peek(10) == [sample(index) for index in range(3, 10)]
+
+    queue.drop(3)
+    # More dead bytes than queued ones now, so the file was compacted
+    assert samples_in_file(path) == 4
+    assert OfflineQueue(path, 10).peek(10) == [sample(index) for index in range(6, 10)]
+
+    queue.drop(4)
+    assert not os.path.exists(path)
+    queue.push(sample(10))
+    assert OfflineQueue(path, 10).peek(10) == [sample(10)]
+
+
+def test_files_without_a_head_are_still_read(tmp_path: Any) -> None:
+    path = tmp_path / "queue.jsonl"
+    path.write_text('{"time": 1.0, "active_window": "a"}\nnot json\n{"time": 2.0, "active_window": "b"}\n', encoding="utf-8")
+    queue = OfflineQueue(str(path), 10)
+    assert queue.peek(10) == [{"time": 1.0, "active_window": "a"}, {"time": 2.0, "active_window": "b"}]
+
+    queue.drop(1)
+    assert OfflineQueue(str(path), 10).peek(10) == [{"time": 2.0, "active_window": "b"}]
+
+
+def test_draining_a_large_queue_writes_linear_bytes(tmp_path: Any, monkeypatch: Any) -> None:
+    path = str(tmp_path / "queue.jsonl")
+    total = 20000
+    queue = OfflineQueue(path, total)
+    for index in range(total):
+        queue.push(sample(index))
+    appended = os.path.getsize(path) - QUEUE_HEAD_SIZE
+
+    rewritten: List[int] = []
+    rewrite = OfflineQueue._rewrite
+
+    def counting_rewrite(self: OfflineQueue) -> None:
+        rewrite(self)
+        rewritten.append(self._size)
+
+    monkeypatch.setattr(api.OfflineQueue, "_rewrite", counting_rewrite)
+    drained: List[dict] = []
+    while len(queue):
+        drained += queue.peek(500)
+        queue.drop(500)
+        if len(queue) == total // 2:
+            assert OfflineQueue(path, total).peek(total) == [sample(index) for index in range(total // 2, total)]
+
+    assert drained == [sample(index) for index in range(total)]
+    # Each compaction copies less than half of what is left, so all of them together stay under one full copy
+    assert sum(rewritten) < appended
+    assert not os.path.exists(path)
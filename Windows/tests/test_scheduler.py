@@ -0,0 +1,88 @@
+from typing import Optional, Tuple
+
+from scheduler import SampleScheduler, IDLE_THRESHOLD
+
+
+class FakeDesktop:
+    """Both injectables of SampleScheduler: a settable clock and window probe."""
+    def __init__(self) -> None:
+        self.now: float = 1000.0
+        self.title: Optional[str] = "Editor"
+        self.idle: float = 0.0
+
+    def clock(self) -> float:
+        return self.now
+
+    def probe(self) -> Tuple[Optional[str], float]:
+        return self.title, self.idle
+
+
+def make_scheduler(desktop: FakeDesktop, min_interval: float = 1, max_interval: float = 8) -> SampleScheduler:
+    return SampleScheduler(min_interval, max_interval, desktop.probe, desktop.clock)
+
+
+def run(scheduler: SampleScheduler, desktop: FakeDesktop, ticks: int) -> list:
+    """Follow the scheduler's own delays for `ticks` ticks."""
+    delays: list = []
+    for _ in range(ticks):
+        _, delay = scheduler.tick()
+        delays.append(delay)
+        desktop.now += delay
+    return delays
+
+
+def test_stable_title_backs_off_to_max() -> None:
+    desktop = FakeDesktop()
+    scheduler = make_scheduler(desktop)
+    delays = run(scheduler, desktop, 10)
+    assert delays[0] == 1
+    assert delays == sorted(delays)
+    assert delays[-1] == 8
+
+
+def test_title_change_resets_to_min() -> None:
+    desktop = FakeDesktop()
+    scheduler = make_scheduler(desktop)
+    run(scheduler, desktop, 10)
+    desktop.title = "Browser"
+    assert scheduler.tick() == ("Browser", 1)
+    desktop.now += 1
+    assert scheduler.tick() == ("Browser", 1)
+    desktop.now += 6
+    assert scheduler.tick() == ("Browser", 3.5)
+
+
+def test_idle_user_is_sampled_at_max_and_not_sent() -> None:
+    desktop = FakeDesktop()
+    scheduler = make_scheduler(desktop)
+    desktop.idle = IDLE_THRESHOLD + 1
+    assert scheduler.tick() == (None, 8)
+    desktop.idle = 0
+    assert scheduler.tick() == ("Editor", 1)
+
+
+def test_no_window_counts_as_idle() -> None:
+    desktop = FakeDesktop()
+    desktop.title = None
+    assert make_scheduler(desktop).tick() == (None, 8)
+
+
+def test_server_hint_is_a_lower_bound_within_max() -> None:
+    desktop = FakeDesktop()
+    scheduler = make_scheduler(desktop)
+    scheduler.hint(4)
+    assert scheduler.tick() == ("Editor", 4)
+    scheduler.hint(60)
+    assert scheduler.tick()[1] == 8
+    scheduler.hint(None)
+    desktop.title = "Browser"
+    assert scheduler.tick()[1] == 1
+
+
+def test_configure_clamps_bounds() -> None:
+    desktop = FakeDesktop()
+    scheduler = make_scheduler(desktop, min_interval=0, max_interval=-1)
+    assert scheduler.min_interval == 0.05
+    assert scheduler.max_interval == 0.05
+    scheduler.configure(2, 5)
+    assert run(scheduler, desktop, 12)[-1] == 5
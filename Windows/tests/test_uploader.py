@@ -0,0 +1,167 @@
+import os
+import socket
+import subprocess
+import sys
+from importlib.util import spec_from_file_location, module_from_spec
+from threading import Condition
+from time import time, monotonic, sleep
+from typing import Any, Callable, Iterator, List, Tuple
+
+import pytest
+import requests
+
+from api import Uploader, OfflineQueue, CONNECT_ERROR, THROTTLED
+
+pytest.importorskip("flask")
+pytest.importorskip("bcrypt")
+
+WEB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Web")
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def load_bench() -> Any:
+    # Web/bench.py seeds data.json; loaded by path since the client has its own `api`
+    spec = spec_from_file_location("web_bench", os.path.join(WEB_DIR, "bench.py"))
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def live_server(tmp_path_factory: pytest.TempPathFactory) -> Iterator[Tuple[str, List[dict]]]:
+    """The Web server on a real port: two ingest requests per session, then one per second."""
+    bench = load_bench()
+    directory = str(tmp_path_factory.mktemp("live"))
+    credentials = bench.seed_users(directory, 3, 3, 4)
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": WEB_DIR, "SEEME_LOG_LEVEL": "off", "SEEME_STORAGE": "json", "SEEME_LOGIN_RATE": "0",
+        "SEEME_INGEST_RATE": "1000", "SEEME_SESSION_RATE": "1", "SEEME_SESSION_BURST": "2"
+    })
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(WEB_DIR, "serve.py"), "--host", "127.0.0.1", "--port", str(port),
+         "--workers", "1", "--ws-port", "0"],
+        cwd=directory, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = monotonic() + 60
+        while True:
+            try:
+                if requests.get(f"{url}/users?limit=1", timeout=1).ok:
+                    break
+            except requests.RequestException:
+                pass
+            if process.poll() is not None or monotonic() > deadline:
+                pytest.fail("Server did not come up")
+            sleep(0.2)
+        yield url, credentials
+    finally:
+        bench.stop_server(process)
+
+
+class Results:
+    """on_result sink the test can wait on."""
+    def __init__(self) -> None:
+        self.items: List[Tuple[str, dict]] = []
+        self._changed = Condition()
+
+    def __call__(self, kind: str, result: dict) -> None:
+        with self._changed:
+            self.items.append((kind, result))
+            self._changed.notify_all()
+
+    def after(self, submit: Callable[[], None], kind: str = Uploader.UPLOAD) -> dict:
+        """Run `submit`, then wait for the first result of `kind` it produced."""
+        with self._changed:
+            seen = len(self.items)
+        submit()
+        with self._changed:
+            assert self._changed.wait_for(lambda: any(item[0] == kind for item in self.items[seen:]), 15)
+            return next(result for item_kind, result in self.items[seen:] if item_kind == kind)
+
+
+def sample(window: str) -> dict:
+    return {"time": time(), "active_window": window}
+
+
+def window_on_server(url: str, user_id: str) -> str:
+    users = requests.get(f"{url}/users/status", timeout=5).json()["data"]
+    return next(user["active_window"] for user in users if user["user_id"] == user_id)
+
+
+def test_login_upload_throttle_and_retry(live_server: Tuple[str, List[dict]], tmp_path: Any) -> None:
+    url, credentials = live_server
+    user = credentials[0]
+    results = Results()
+    queue = OfflineQueue(str(tmp_path / "queue.jsonl"), 100)
+    uploader = Uploader(url, user["user_id"], user["user_name"], user["user_password"], queue, results)
+    uploader.start()
+    try:
+        assert results.after(uploader.request_login, Uploader.LOGIN)["status"] == "success"
+
+        assert results.after(lambda: uploader.submit(sample("Editor")))["status"] == "success"
+        assert results.after(lambda: uploader.submit(sample("Browser")))["status"] == "success"
+
+        # The session's burst of two is used up: 429, and the sample waits in the offline queue
+        throttled = results.after(lambda: uploader.submit(sample("Terminal")))
+        assert throttled["message"] == THROTTLED and throttled["retry_after"] >= 1
+        assert len(queue) == 1
+
+        # Before Retry-After has passed nothing is sent at all
+        assert results.after(lambda: uploader.submit(sample("Mail")))["status"] == "error"
+        assert len(queue) == 2
+
+        sleep(throttled["retry_after"] + 0.2)
+        assert results.after(lambda: uploader.submit(sample("Music")))["status"] == "success"
+        assert len(queue) == 0
+        assert window_on_server(url, user["user_id"]) == "Music"
+
+        # Every request went over the same pooled keep-alive connection
+        pools = uploader.http.get_adapter(url).poolmanager.pools
+        assert [pools[key].num_connections for key in pools.keys()] == [1]
+    finally:
+        uploader.stop()
+
+
+def test_backs_off_while_unreachable_then_catches_up(live_server: Tuple[str, List[dict]], tmp_path: Any) -> None:
+    url, credentials = live_server
+    user = credentials[1]
+    results = Results()
+    queue = OfflineQueue(str(tmp_path / "queue.jsonl"), 100)
+    uploader = Uploader(f"http://127.0.0.1:{free_port()}", user["user_id"], user["user_name"], user["user_password"],
+                        queue, results)
+    uploader.start()
+    try:
+        first = results.after(lambda: uploader.submit(sample("Offline 1")))
+        assert first["message"].startswith(CONNECT_ERROR)
+        waiting = results.after(lambda: uploader.submit(sample("Offline 2")))
+        assert "retrying in 1s" in waiting["message"]
+        assert len(queue) == 2
+
+        uploader.configure(url, user["user_id"], user["user_name"], user["user_password"])
+        sleep(1.1)
+        assert results.after(lambda: uploader.submit(sample("Online")))["status"] == "success"
+        assert len(queue) == 0
+        assert window_on_server(url, user["user_id"]) == "Online"
+    finally:
+        uploader.stop()
+
+
+def test_full_job_queue_drops_samples_but_never_login(tmp_path: Any) -> None:
+    queue = OfflineQueue(str(tmp_path / "queue.jsonl"), 10)
+    uploader = Uploader("http://127.0.0.1:9", "id", "name", "password", queue, Results(), max_pending=2)
+    try:
+        uploader.request_login()
+        uploader.submit(sample("First"))
+        uploader.submit(sample("Second"))
+        uploader.submit(sample("Third"))
+        assert [job if isinstance(job, str) else job["active_window"] for job in uploader._jobs] == [Uploader.LOGIN, "Third"]
+    finally:
+        uploader.stop()
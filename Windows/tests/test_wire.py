@@ -0,0 +1,75 @@
+import os
+from importlib.util import spec_from_file_location, module_from_spec
+from typing import Any, List, Tuple
+
+import pytest
+
+import wire
+from wire import SampleEncoder, HEADER, SAMPLE, MAX_TITLES
+
+
+def load_server_wire() -> Any:
+    # The server's decoder lives in Web/wire.py, a module also named `wire`
+    path = os.path.join(os.path.dirname(__file__), "..", "..", "Web", "wire.py")
+    spec = spec_from_file_location("server_wire", path)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+server_wire = load_server_wire()
+NOW = 1_000_000.0
+
+
+def send(encoder: SampleEncoder, dictionaries: Any, samples: List[Tuple[float, str]]) -> List[Tuple[float, str]]:
+    body, defined = encoder.encode(samples, NOW)
+    decoded = dictionaries.decode("session", body, NOW, 0xFFFF)
+    encoder.confirm(defined)
+    return decoded
+
+
+def test_constants_match_the_server() -> None:
+    for name in ("CONTENT_TYPE", "MAGIC", "VERSION", "DEFINE", "MAX_TITLES", "MAX_TITLE_BYTES"):
+        assert getattr(wire, name) == getattr(server_wire, name)
+    for name in ("HEADER", "SAMPLE", "LENGTH"):
+        assert getattr(wire, name).format == getattr(server_wire, name).format
+
+
+def test_server_decodes_what_the_client_encodes() -> None:
+    encoder = SampleEncoder()
+    dictionaries = server_wire.TitleDictionaries(8)
+    first = [(NOW - 2, "main.py - Visual Studio Code"), (NOW - 1, "浏览器"), (NOW - 0.5, "main.py - Visual Studio Code")]
+    assert send(encoder, dictionaries, first) == [(pytest.approx(time, abs=1e-3), title) for time, title in first]
+
+    # Known titles travel as ids only
+    body, defined = encoder.encode([(NOW, "浏览器"), (NOW, "浏览器")], NOW)
+    assert defined == [] and len(body) == HEADER.size + 2 * SAMPLE.size
+    assert dictionaries.decode("session", body, NOW, 10) == [(NOW, "浏览器"), (NOW, "浏览器")]
+
+
+def test_client_encodes_the_same_bytes_as_the_server_copy() -> None:
+    client, reference = SampleEncoder(), server_wire.SampleEncoder()
+    client.epoch = reference.epoch
+    for batch in ([(NOW - 2, "Editor"), (NOW - 1, "Browser")], [(NOW, "Editor"), (NOW, "Mail")]):
+        body, defined = client.encode(batch, NOW)
+        assert reference.encode(batch, NOW) == (body, defined)
+        client.confirm(defined)
+        reference.confirm(defined)
+
+
+def test_forget_resends_definitions_after_resync() -> None:
+    encoder = SampleEncoder()
+    send(encoder, server_wire.TitleDictionaries(8), [(NOW, "Editor")])
+
+    restarted = server_wire.TitleDictionaries(8)
+    with pytest.raises(server_wire.UnknownTitle):
+        restarted.decode("session", encoder.encode([(NOW, "Editor")], NOW)[0], NOW, 10)
+    encoder.forget()
+    assert send(encoder, restarted, [(NOW, "Editor")]) == [(NOW, "Editor")]
+
+
+def test_new_epoch_is_decoded_as_a_fresh_dictionary() -> None:
+    encoder = SampleEncoder()
+    dictionaries = server_wire.TitleDictionaries(8)
+    send(encoder, dictionaries, [(NOW, f"Title {index}") for index in range(MAX_TITLES)])
+    assert send(encoder, dictionaries, [(NOW, "Title 5"), (NOW, "One too many")]) == [(NOW, "Title 5"), (NOW, "One too many")]
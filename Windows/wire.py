@@ -0,0 +1,80 @@
+import struct
+import secrets
+from typing import Final, Optional, List, Dict, Set, Tuple
+
+
+# ========== Constants =========
+# Compact binary sample format, sent as `Content-Type: application/x-seeme-samples`
+# with the session token in the X-SeeMe-Token header. Little-endian:
+#
+#     header   magic "SM" | version u8 | count u16 | epoch u32
+#     sample   age f32 | title u16
+#              [length u16 | UTF-8 title]   when title has the DEFINE bit
+#
+# `age` is how many seconds before sending the sample was taken, so no clock
+# needs to agree with the server's. `title` is an id into the session's title
+# dictionary for `epoch`: the first time a title is sent it carries DEFINE and
+# its text, afterwards only the id (a steady-state sample is 6 bytes). The
+# client owns the id assignment; a server that misses a definition (restart,
+# another serve.py worker) answers `resync_titles` and the client sends the
+# definitions again. A new epoch starts a new dictionary.
+CONTENT_TYPE: Final[str] = "application/x-seeme-samples"
+MAGIC: Final[bytes] = b"SM"
+VERSION: Final[int] = 1
+DEFINE: Final[int] = 0x8000
+# Ids per epoch; the client starts a new epoch when it runs out
+MAX_TITLES: Final[int] = 1024
+MAX_TITLE_BYTES: Final[int] = 4096
+
+HEADER: Final[struct.Struct] = struct.Struct("<2sBHI")
+SAMPLE: Final[struct.Struct] = struct.Struct("<fH")
+LENGTH: Final[struct.Struct] = struct.Struct("<H")
+
+
+# ========== Classes =========
+class SampleEncoder:
+    """
+    Title ids for one session (the server's decoder is in Web/wire.py).
+
+    `encode` returns the body and the ids it defined; `confirm` them once the
+    server accepted the body, `forget` everything the server is assumed to
+    know when it answers `resync_titles`.
+    """
+    def __init__(self) -> None:
+        self.epoch: int = secrets.randbits(32)
+        self._ids: Dict[str, int] = {}
+        self._known: Set[int] = set()
+
+    def _new_epoch(self) -> None:
+        self.epoch = secrets.randbits(32)
+        self._ids.clear()
+        self._known.clear()
+
+    def encode(self, samples: List[Tuple[float, str]], now: float) -> Tuple[bytes, List[int]]:
+        """`samples` are (time, title) pairs, oldest first."""
+        new_titles: Final[int] = len({title for _, title in samples if title not in self._ids})
+        if len(self._ids) + new_titles > MAX_TITLES:
+            self._new_epoch()
+
+        parts: Final[List[bytes]] = [HEADER.pack(MAGIC, VERSION, len(samples), self.epoch)]
+        defined: Final[List[int]] = []
+        for sample_time, title in samples:
+            title_id: Optional[int] = self._ids.get(title)
+            if title_id is None:
+                title_id = len(self._ids)
+                self._ids[title] = title_id
+            age: float = max(now - sample_time, 0.0)
+            if title_id in self._known or title_id in defined:
+                parts.append(SAMPLE.pack(age, title_id))
+            else:
+                # At most 4 bytes per character, so this stays under MAX_TITLE_BYTES
+                encoded: bytes = title[:MAX_TITLE_BYTES // 4].encode('utf-8')
+                parts.append(SAMPLE.pack(age, title_id | DEFINE) + LENGTH.pack(len(encoded)) + encoded)
+                defined.append(title_id)
+        return b"".join(parts), defined
+
+    def confirm(self, defined: List[int]) -> None:
+        self._known.update(defined)
+
+    def forget(self) -> None:
+        self._known.clear()